@@ -1,65 +1,331 @@
 """
 数据库配置模块
 管理 GaussDB/PostGIS 数据库连接配置
-使用 psycopg2 进行连接
+异步路径使用 asyncpg 连接池，psycopg2 连接池作为同步回退
 """
 import os
+import re
+import ssl
+import socket
+import hashlib
+import time
+import asyncio
 import logging
-from typing import Dict, Any, Optional
-from dotenv import load_dotenv
-import psycopg2
-from psycopg2 import pool
+import threading
+import weakref
+from collections import Counter
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass
+from functools import cached_property, lru_cache, wraps
+from urllib.parse import quote
+from typing import TYPE_CHECKING, Dict, Any, Optional, Sequence, Set, Union
+import asyncpg
 
-# 加载环境变量
-load_dotenv()
+if TYPE_CHECKING:
+    from psycopg2 import pool
 
 logger = logging.getLogger(__name__)
 
 
+@dataclass(frozen=True)
+class _DBSettings:
+    """从环境变量解析出的数据库配置(只读)"""
+    host: str
+    port: int
+    database: str
+    user: str
+    password: str
+    sslmode: str
+    use_asyncpg: bool
+    pgbouncer_host: Optional[str]
+    pgbouncer_port: int
+    ssl_ca: Optional[str]
+    pool_min_size: int
+    pool_max_size: int
+    jit: bool
+    work_mem: Optional[str]
+    bulk_timeout: float
+
+
+@lru_cache(maxsize=1)
+def _ensure_dotenv() -> None:
+    """加载 .env 文件，整个进程只执行一次"""
+    from dotenv import load_dotenv
+    load_dotenv(override=False)
+
+
+@lru_cache(maxsize=1)
+def _load_settings() -> _DBSettings:
+    """
+    读取并缓存数据库相关环境变量
+    
+    Returns:
+        数据库配置
+    """
+    _ensure_dotenv()
+    return _DBSettings(
+        host=os.getenv("POSTGIS_HOST", "localhost"),
+        port=int(os.getenv("POSTGIS_PORT", "5432")),
+        database=os.getenv("POSTGIS_DATABASE", "gis_database"),
+        user=os.getenv("POSTGIS_USER", "postgres"),
+        password=os.getenv("POSTGIS_PASSWORD", ""),
+        sslmode=os.getenv("POSTGIS_SSLMODE", "prefer"),
+        # 是否使用 asyncpg 连接池(设置 USE_ASYNCPG=false 回退到 psycopg2)
+        use_asyncpg=os.getenv("USE_ASYNCPG", "true").lower() == "true",
+        # 设置后通过 PgBouncer(事务池模式)连接数据库
+        pgbouncer_host=os.getenv("POSTGIS_PGBOUNCER_HOST") or None,
+        pgbouncer_port=int(os.getenv("POSTGIS_PGBOUNCER_PORT", "6432")),
+        # 可选的 CA 证书路径，用于校验服务端证书
+        ssl_ca=os.getenv("POSTGIS_SSL_CA") or None,
+        # asyncpg 连接池大小
+        pool_min_size=int(os.getenv("POSTGIS_POOL_MIN_SIZE", "10")),
+        pool_max_size=int(os.getenv("POSTGIS_POOL_MAX_SIZE", "50")),
+        # 工具查询大多在毫秒级，JIT 编译时间往往超过执行时间，默认关闭
+        jit=os.getenv("POSTGIS_JIT", "false").lower() == "true",
+        work_mem=os.getenv("POSTGIS_WORK_MEM", "64MB") or None,
+        # 建索引、COPY 导入等批量操作的客户端超时(秒)，普通查询使用连接池的 60 秒
+        bulk_timeout=float(os.getenv("POSTGIS_BULK_TIMEOUT", "3600")),
+    )
+
+
+# psycopg2 风格的 %s 占位符(不匹配转义的 %%s)
+_PLACEHOLDER_RE = re.compile(r"(?<!%)%s")
+
+
+def _ttl_cache(ttl: float):
+    """
+    按实例缓存无参方法的返回值，ttl 秒后过期
+    
+    Args:
+        ttl: 缓存有效期(秒)
+    """
+    def decorator(func):
+        cache: "weakref.WeakKeyDictionary[Any, tuple]" = weakref.WeakKeyDictionary()
+        
+        @wraps(func)
+        def wrapper(self):
+            now = time.monotonic()
+            cached = cache.get(self)
+            if cached is not None and cached[0] > now:
+                return cached[1]
+            value = func(self)
+            cache[self] = (now + ttl, value)
+            return value
+        
+        return wrapper
+    return decorator
+
+
+def _install_uvloop() -> None:
+    """
+    安装 uvloop 事件循环策略(设置 POSTGIS_USE_UVLOOP=0 关闭)
+    
+    uvloop 不支持 Windows，未安装时保持默认事件循环
+    """
+    _ensure_dotenv()
+    if os.getenv("POSTGIS_USE_UVLOOP", "1") != "1":
+        return
+    try:
+        import uvloop
+    except ImportError:
+        return
+    uvloop.install()
+    logger.debug("已启用 uvloop 事件循环")
+
+
+_install_uvloop()
+
+
+# 主机名解析结果缓存: host -> (过期时间, IP 地址)
+_HOSTADDR_TTL = 60.0
+_hostaddr_cache: Dict[str, tuple] = {}
+
+
+def _resolve_hostaddr(host: str) -> Optional[str]:
+    """
+    解析主机名并缓存 60 秒，供 libpq 的 hostaddr 参数使用
+    
+    Args:
+        host: 主机名
+        
+    Returns:
+        IP 地址；Unix socket 路径或解析失败时返回 None
+    """
+    if not host or host.startswith("/"):
+        return None
+    
+    now = time.monotonic()
+    cached = _hostaddr_cache.get(host)
+    if cached is not None and cached[0] > now:
+        return cached[1]
+    
+    try:
+        addr = socket.gethostbyname(host)
+    except OSError as e:
+        logger.warning("解析数据库主机 %s 失败，将由 libpq 自行解析: %s", host, e)
+        return None
+    _hostaddr_cache[host] = (now + _HOSTADDR_TTL, addr)
+    return addr
+
+
+def _is_live(conn) -> bool:
+    """
+    纯客户端检查 psycopg2 连接是否可用，不产生网络往返
+    
+    Args:
+        conn: psycopg2 连接
+        
+    Returns:
+        连接未关闭且处于空闲事务状态时返回 True
+    """
+    from psycopg2.extensions import TRANSACTION_STATUS_IDLE
+    return conn.closed == 0 and conn.info.transaction_status == TRANSACTION_STATUS_IDLE
+
+
+# 最近一次网络错误后的这段时间内，借出连接时额外执行 SELECT 1 探活
+_NETWORK_ERROR_PROBE_WINDOW = 30.0
+
+
+async def _ping_connection(conn: asyncpg.Connection) -> None:
+    """借出连接前探活，PgBouncer 事务池模式下不保留长期会话状态"""
+    await conn.execute("SELECT 1")
+
+
+class _SpatialConnection(asyncpg.Connection):
+    """带有预编译语句表的 asyncpg 连接，语句随连接一同释放"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.prepared_statements: Dict[str, Any] = {}
+
+
 class DatabaseConfig:
     """数据库配置类"""
     
     def __init__(self):
         """初始化数据库配置"""
-        self.host = os.getenv("POSTGIS_HOST", "localhost")
-        self.port = int(os.getenv("POSTGIS_PORT", "5432"))
-        self.database = os.getenv("POSTGIS_DATABASE", "gis_database")
-        self.user = os.getenv("POSTGIS_USER", "postgres")
-        self.password = os.getenv("POSTGIS_PASSWORD", "")
-        self.sslmode = os.getenv("POSTGIS_SSLMODE", "prefer")
+        settings = _load_settings()
+        self.host = settings.host
+        self.port = settings.port
+        self.database = settings.database
+        self.user = settings.user
+        self.password = settings.password
+        self.sslmode = settings.sslmode
+        self.use_asyncpg = settings.use_asyncpg
+        self.pgbouncer_host = settings.pgbouncer_host
+        self.pgbouncer_port = settings.pgbouncer_port
+        self.ssl_ca = settings.ssl_ca
+        self.pool_min_size = settings.pool_min_size
+        self.pool_max_size = settings.pool_max_size
+        self.jit = settings.jit
+        self.work_mem = settings.work_mem
+        self.bulk_timeout = settings.bulk_timeout
+        
+        # 实际连接目标: 配置了 PgBouncer 时连接 PgBouncer，TLS 在 PgBouncer 处终止
+        if self.use_pgbouncer:
+            self.connect_host = self.pgbouncer_host
+            self.connect_port = self.pgbouncer_port
+            self.connect_sslmode = "disable"
+        else:
+            self.connect_host = self.host
+            self.connect_port = self.port
+            self.connect_sslmode = self.sslmode
         
         # 连接池
-        self._connection_pool: Optional[pool.SimpleConnectionPool] = None
+        self._connection_pool: Optional["pool.ThreadedConnectionPool"] = None
+        self._async_pool: Optional[asyncpg.Pool] = None
         self._is_connected = False
+        
+        # 防止并发首次调用时重复创建连接池
+        self._init_lock = threading.Lock()
+        # asyncio.Lock 绑定事件循环，首次使用时再创建
+        self._async_init_lock: Optional[asyncio.Lock] = None
+        
+        # 最近一次观察到网络错误的时间(time.monotonic)
+        self._last_network_error = float("-inf")
+        
+        # 连接池使用统计: acquired / released / errors / queries
+        self._stats: Counter = Counter()
+        
+        # psycopg2 连接上已 PREPARE 的语句名
+        self._prepared: "weakref.WeakKeyDictionary[Any, Set[str]]" = weakref.WeakKeyDictionary()
+        
+        # 固定SQL模板: 名称 -> SQL，asyncpg 新建连接时统一预编译
+        self._statement_templates: Dict[str, str] = {}
+    
+    @property
+    def use_pgbouncer(self) -> bool:
+        """是否通过 PgBouncer 连接"""
+        return self.pgbouncer_host is not None
     
     def get_connection_dict(self) -> Dict[str, Any]:
         """
         获取数据库连接字典
         
+        包含 libpq TCP keepalive 参数，使被 NAT/防火墙静默断开的空闲连接
+        能在有限时间内被发现。tcp_user_timeout 需要 Linux >= 2.6.37。
+        
+        主机名解析结果缓存 60 秒并作为 hostaddr 传入，连接池扩容时 libpq
+        不再逐个连接查询 DNS；host 保留用于 TLS 主机名校验。解析失败时省略 hostaddr。
+        
         Returns:
             包含连接参数的字典
         """
-        return {
-            "host": self.host,
-            "port": self.port,
+        params = {
+            "host": self.connect_host,
+            "port": self.connect_port,
             "database": self.database,
             "user": self.user,
             "password": self.password,
+            "keepalives": 1,
+            "keepalives_idle": 30,
+            "keepalives_interval": 10,
+            "keepalives_count": 3,
+            "tcp_user_timeout": 15000,
         }
+        hostaddr = _resolve_hostaddr(self.connect_host)
+        if hostaddr is not None:
+            params["hostaddr"] = hostaddr
+        return params
     
-    def get_connection_string(self) -> str:
+    def _build_dsn(self) -> str:
         """
-        获取数据库连接字符串
+        构建 PostgreSQL DSN
+        
+        application_name 用于在 pg_stat_activity 中区分本服务的连接
         
         Returns:
             PostgreSQL 连接字符串
         """
         return (
-            f"postgresql://{self.user}:{self.password}@"
-            f"{self.host}:{self.port}/{self.database}"
-            f"?sslmode={self.sslmode}"
+            f"postgresql://{quote(self.user, safe='')}:{quote(self.password, safe='')}@"
+            f"{self.connect_host}:{self.connect_port}/{self.database}"
+            f"?sslmode={self.connect_sslmode}&application_name=postgis_mcp"
         )
     
+    @cached_property
+    def connection_string(self) -> str:
+        """
+        PostgreSQL 连接字符串(每个实例只构建一次)
+        
+        凭据变更时应重新创建 DatabaseConfig 实例
+        """
+        return self._build_dsn()
+    
+    @cached_property
+    def async_connection_string(self) -> str:
+        """asyncpg 连接字符串，与同步连接字符串共用同一个 DSN"""
+        return self.connection_string
+    
+    def get_connection_string(self) -> str:
+        """
+        获取数据库连接字符串
+        
+        Returns:
+            PostgreSQL 连接字符串
+        """
+        return self.connection_string
+    
     def get_async_connection_string(self) -> str:
         """
         获取异步数据库连接字符串
@@ -67,41 +333,243 @@ class DatabaseConfig:
         Returns:
             asyncpg 连接字符串
         """
-        # asyncpg 需要明确指定 sslmode 参数
-        return (
-            f"postgresql://{self.user}:{self.password}@"
-            f"{self.host}:{self.port}/{self.database}"
-            f"?sslmode={self.sslmode}"
-        )
-
+        return self.async_connection_string
+    
+    @cached_property
+    def ssl_context(self) -> Union[ssl.SSLContext, str, bool]:
+        """
+        将 libpq 的 sslmode 转换为 asyncpg 可接受的 ssl 参数
+        
+        SSLContext 每个实例只创建一次，连接池扩容时的新连接共用同一个上下文
+        
+        Returns:
+            SSLContext、'prefer' 或 False
+        """
+        mode = self.connect_sslmode.lower()
+        if mode == "disable":
+            return False
+        if mode in ("allow", "prefer"):
+            # asyncpg 原生支持 prefer: 优先 TLS，失败时回退明文
+            return "prefer"
+        
+        ctx = ssl.create_default_context(cafile=self.ssl_ca)
+        if mode == "require":
+            ctx.check_hostname = False
+            ctx.verify_mode = ssl.CERT_NONE
+        elif mode == "verify-ca":
+            ctx.check_hostname = False
+        return ctx
+    
+    async def get_async_pool(
+        self,
+        min_conn: Optional[int] = None,
+        max_conn: Optional[int] = None
+    ) -> asyncpg.Pool:
+        """
+        获取 asyncpg 连接池，首次调用时创建
+        
+        Args:
+            min_conn: 最小连接数，默认取 POSTGIS_POOL_MIN_SIZE
+            max_conn: 最大连接数，默认取 POSTGIS_POOL_MAX_SIZE
+            
+        Returns:
+            asyncpg 连接池
+        """
+        if self._async_pool is not None:
+            return self._async_pool
+        
+        min_conn = self.pool_min_size if min_conn is None else min_conn
+        max_conn = self.pool_max_size if max_conn is None else max_conn
+        
+        if self._async_init_lock is None:
+            self._async_init_lock = asyncio.Lock()
+        
+        async with self._async_init_lock:
+            if self._async_pool is not None:
+                return self._async_pool
+            try:
+                pool_kwargs: Dict[str, Any] = {}
+                if self.use_pgbouncer:
+                    # 事务池模式下服务端会话不固定，禁用预编译语句缓存并在借出时探活
+                    pool_kwargs["statement_cache_size"] = 0
+                    pool_kwargs["setup"] = _ping_connection
+                else:
+                    # asyncpg 按连接自动预编译并缓存语句，避免重复解析和规划
+                    pool_kwargs["statement_cache_size"] = 2048
+                    pool_kwargs["max_cached_statement_lifetime"] = 300
+                    # 新建连接时预编译已登记的固定SQL模板
+                    pool_kwargs["connection_class"] = _SpatialConnection
+                    pool_kwargs["init"] = self._prepare_templates
+                    # 服务端 TCP keepalive，PgBouncer 默认不接受这些启动参数
+                    pool_kwargs["server_settings"] = {
+                        "application_name": "postgis_mcp",
+                        "tcp_keepalives_idle": "30",
+                        "tcp_keepalives_interval": "10",
+                        "tcp_keepalives_count": "3",
+                        # 需要 JIT 的重分析查询可在事务内 SET LOCAL jit = on
+                        "jit": "on" if self.jit else "off",
+                    }
+                    if self.work_mem:
+                        pool_kwargs["server_settings"]["work_mem"] = self.work_mem
+                
+                self._async_pool = await asyncpg.create_pool(
+                    host=self.connect_host,
+                    port=self.connect_port,
+                    user=self.user,
+                    password=self.password,
+                    database=self.database,
+                    ssl=self.ssl_context,
+                    min_size=min_conn,
+                    max_size=max_conn,
+                    max_queries=50000,
+                    max_inactive_connection_lifetime=300,
+                    command_timeout=60,
+                    timeout=5,
+                    **pool_kwargs
+                )
+                logger.info("asyncpg 连接池初始化成功 min=%d max=%d", min_conn, max_conn)
+            except Exception as e:
+                logger.error("初始化 asyncpg 连接池失败: %s", e)
+                raise
+        return self._async_pool
+    
+    def register_statement(self, name: str, sql: str):
+        """
+        登记固定SQL模板，连接池中的每个连接在创建时预编译一次
+        
+        Args:
+            name: 模板名称
+            sql: 使用 $n 占位符的 SQL
+        """
+        self._statement_templates[name] = sql
+    
+    async def _prepare_templates(self, conn: _SpatialConnection):
+        """连接池 init 回调: 在新连接上预编译全部已登记的模板"""
+        for name, sql in self._statement_templates.items():
+            try:
+                conn.prepared_statements[name] = await conn.prepare(sql)
+            except asyncpg.PostgresError as e:
+                # 例如尚未安装 PostGIS，首次使用时再准备并报告错误
+                logger.warning("预编译语句 %s 失败: %s", name, e)
+    
+    async def run_statement(self, conn, name: str, *args, method: str = "fetch"):
+        """
+        使用连接上预编译好的模板执行查询
+        
+        PgBouncer 事务池模式下不能跨事务保留预编译语句，直接按SQL执行
+        
+        Args:
+            conn: 从 acquire() 借出的连接
+            name: register_statement 登记的模板名称
+            *args: 查询参数
+            method: fetch / fetchrow / fetchval
+            
+        Returns:
+            对应方法的查询结果
+        """
+        sql = self._statement_templates[name]
+        self._stats["queries"] += 1
+        statements = getattr(conn, "prepared_statements", None)
+        if statements is None:
+            return await getattr(conn, method)(sql, *args)
+        
+        statement = statements.get(name)
+        if statement is None:
+            # 连接创建后才登记的模板
+            statement = statements[name] = await conn.prepare(sql)
+        return await getattr(statement, method)(*args)
+    
+    @asynccontextmanager
+    async def acquire(self):
+        """
+        从 asyncpg 连接池借出连接，退出上下文时自动归还
+        
+        用法:
+            async with db_config.acquire() as conn:
+                await conn.fetch(...)
+        """
+        async_pool = await self.get_async_pool()
+        async with async_pool.acquire() as conn:
+            self._stats["acquired"] += 1
+            try:
+                yield conn
+            except Exception:
+                self._stats["errors"] += 1
+                raise
+            finally:
+                self._stats["released"] += 1
+    
+    def async_connection(self):
+        """acquire() 的别名，与同步的 connection() 对应"""
+        return self.acquire()
+    
+    async def close_async_pool(self):
+        """关闭 asyncpg 连接池"""
+        if self._async_pool is not None:
+            await self._async_pool.close()
+            self._async_pool = None
+            self._async_init_lock = None
+            logger.info("asyncpg 连接池已关闭")
+    
+    async def async_test_connection(self) -> bool:
+        """
+        通过 asyncpg 连接池测试数据库连接
+        
+        Returns:
+            连接是否成功
+        """
+        try:
+            async with self.acquire() as conn:
+                await conn.fetchval("SELECT 1")
+            logger.info("数据库连接测试成功")
+            return True
+        except Exception as e:
+            logger.error("数据库连接测试失败: %s", e)
+            return False
 
     def initialize_pool(self, min_conn: int = 1, max_conn: int = 10):
         """
-        初始化连接池
+        初始化线程安全的 psycopg2 连接池
         
         Args:
             min_conn: 最小连接数
             max_conn: 最大连接数
         """
-        try:
-            if self._connection_pool is None:
-                self._connection_pool = psycopg2.pool.SimpleConnectionPool(
+        if self._connection_pool is not None:
+            return
+        
+        # psycopg2 仅用于同步回退路径，按需导入以缩短启动时间
+        import psycopg2.pool
+        
+        with self._init_lock:
+            if self._connection_pool is not None:
+                return
+            try:
+                ssl_kwargs: Dict[str, Any] = {"sslmode": self.connect_sslmode}
+                if self.ssl_ca and not self.use_pgbouncer:
+                    # 显式指定 CA 文件，使 libpq 复用其证书缓存
+                    ssl_kwargs["sslrootcert"] = self.ssl_ca
+                
+                self._connection_pool = psycopg2.pool.ThreadedConnectionPool(
                     min_conn,
                     max_conn,
                     **self.get_connection_dict(),
-                    sslmode=self.sslmode
+                    **ssl_kwargs
                 )
+                # 连接池完全建立后再标记为已连接
                 self._is_connected = True
-                logger.info("数据库连接池初始化成功")
-        except Exception as e:
-            logger.error(f"初始化连接池失败: {str(e)}")
-            self._is_connected = False
-            raise
+                logger.info("数据库连接池初始化成功 min=%d max=%d", min_conn, max_conn)
+            except Exception as e:
+                logger.error("初始化连接池失败: %s", e)
+                self._is_connected = False
+                raise
     
     def get_connection(self):
         """
         从连接池获取连接
         
+        已不推荐直接使用，请改用 connection() 上下文管理器以避免连接泄漏
+        
         Returns:
             数据库连接对象
         """
@@ -109,52 +577,238 @@ class DatabaseConfig:
             logger.warning("连接池未初始化，正在初始化...")
             self.initialize_pool()
         
+        import psycopg2
+        
         try:
             conn = self._connection_pool.getconn()
+            # 借出前先做客户端检查，只有最近出现过网络错误时才执行 SELECT 1 探活
+            if not _is_live(conn):
+                logger.warning("检测到失效连接，已丢弃并重新获取")
+                self._connection_pool.putconn(conn, close=True)
+                conn = self._connection_pool.getconn()
+            elif time.monotonic() - self._last_network_error < _NETWORK_ERROR_PROBE_WINDOW:
+                try:
+                    with conn.cursor() as cursor:
+                        cursor.execute("SELECT 1")
+                    conn.rollback()
+                except (psycopg2.OperationalError, psycopg2.InterfaceError):
+                    self._last_network_error = time.monotonic()
+                    logger.warning("检测到失效连接，已丢弃并重新获取")
+                    self._connection_pool.putconn(conn, close=True)
+                    conn = self._connection_pool.getconn()
+            self._stats["acquired"] += 1
             return conn
         except Exception as e:
-            logger.error(f"获取数据库连接失败: {str(e)}")
+            self._stats["errors"] += 1
+            logger.error("获取数据库连接失败: %s", e)
             raise
     
     def return_connection(self, conn):
         """
         归还连接到连接池
         
+        已不推荐直接使用，请改用 connection() 上下文管理器
+        
         Args:
             conn: 数据库连接对象
         """
         if self._connection_pool is not None:
-            self._connection_pool.putconn(conn)
+            # 已断开的连接直接丢弃，不放回连接池
+            self._connection_pool.putconn(conn, close=bool(conn.closed))
+            self._stats["released"] += 1
+    
+    @contextmanager
+    def connection(self):
+        """
+        从 psycopg2 连接池借出连接，退出上下文时(包括异常)自动归还
+        
+        用法:
+            with db_config.connection() as conn:
+                ...
+        """
+        import psycopg2
+        
+        conn = self.get_connection()
+        try:
+            yield conn
+        except (psycopg2.OperationalError, psycopg2.InterfaceError):
+            self._last_network_error = time.monotonic()
+            raise
+        finally:
+            self.return_connection(conn)
+    
+    def execute_prepared(self, conn, sql: str, params: Sequence[Any] = ()):
+        """
+        以 PREPARE/EXECUTE 方式在 psycopg2 连接上执行查询
+        
+        语句按 SQL 文本在每个连接上只准备一次，后续调用跳过解析和规划。
+        PgBouncer 事务池模式下预编译语句不可用，直接执行。
+        
+        Args:
+            conn: psycopg2 连接
+            sql: 使用 %s 占位符的 SQL
+            params: 查询参数
+            
+        Returns:
+            已执行的游标
+        """
+        cursor = conn.cursor()
+        if self.use_pgbouncer:
+            cursor.execute(sql, params)
+            return cursor
+        
+        name = "p_" + hashlib.sha1(sql.encode("utf-8")).hexdigest()[:16]
+        prepared = self._prepared.setdefault(conn, set())
+        if name not in prepared:
+            counter = iter(range(1, len(params) + 1))
+            server_sql = _PLACEHOLDER_RE.sub(lambda _: f"${next(counter)}", sql)
+            cursor.execute(f"PREPARE {name} AS {server_sql}")
+            prepared.add(name)
+        
+        self._stats["queries"] += 1
+        if params:
+            cursor.execute(f"EXECUTE {name} ({', '.join(['%s'] * len(params))})", params)
+        else:
+            cursor.execute(f"EXECUTE {name}")
+        return cursor
+    
+    def execute_batch(self, sql: str, params_list: Sequence[Sequence[Any]], page_size: int = 100):
+        """
+        在 psycopg2 连接池上批量执行同一条语句
+        
+        每 page_size 组参数拼接为一次请求发送，减少网络往返
+        
+        Args:
+            sql: 使用 %s 占位符的 SQL
+            params_list: 参数列表
+            page_size: 每次往返发送的语句数
+        """
+        from psycopg2.extras import execute_batch
+        
+        with self.connection() as conn:
+            with conn.cursor() as cursor:
+                execute_batch(cursor, sql, params_list, page_size=page_size)
+            conn.commit()
+        self._stats["queries"] += len(params_list)
+    
+    async def execute_many(self, sql: str, args_list: Sequence[Sequence[Any]]):
+        """
+        在 asyncpg 连接池上批量执行同一条语句
+        
+        asyncpg 的 executemany 以流水线方式发送各组参数，
+        整批只需约一次网络往返，并在同一事务内执行
+        
+        Args:
+            sql: 使用 $n 占位符的 SQL
+            args_list: 参数列表
+        """
+        async with self.acquire() as conn:
+            async with conn.transaction():
+                await conn.executemany(sql, args_list)
+        self._stats["queries"] += len(args_list)
     
     def close_all_connections(self):
-        """关闭所有连接"""
+        """
+        关闭所有连接
+        
+        应在创建连接池的线程中调用
+        """
         if self._connection_pool is not None:
             self._connection_pool.closeall()
             self._is_connected = False
             logger.info("所有数据库连接已关闭")
+        if self._async_pool is not None:
+            # 事件循环可能已经结束，这里同步终止 asyncpg 连接池
+            self._async_pool.terminate()
+            self._async_pool = None
+            self._async_init_lock = None
+            logger.info("asyncpg 连接池已终止")
+    
+    def get_stats(self) -> Dict[str, Any]:
+        """
+        获取连接池统计信息，用于调整 min_conn/max_conn
+        
+        Returns:
+            包含连接池大小、空闲/使用中连接数和累计计数的字典
+        """
+        stats: Dict[str, Any] = {
+            "acquired": self._stats["acquired"],
+            "released": self._stats["released"],
+            "queries_executed": self._stats["queries"],
+            "errors": self._stats["errors"],
+        }
+        
+        if self._async_pool is not None:
+            size = self._async_pool.get_size()
+            free = self._async_pool.get_idle_size()
+            stats["async_pool"] = {
+                "size": size,
+                "free": free,
+                "in_use": size - free,
+                "min_size": self._async_pool.get_min_size(),
+                "max_size": self._async_pool.get_max_size(),
+            }
+        
+        if self._connection_pool is not None:
+            sync_pool = self._connection_pool
+            with sync_pool._lock:
+                free = len(sync_pool._pool)
+                in_use = len(sync_pool._used)
+            stats["sync_pool"] = {
+                "size": free + in_use,
+                "free": free,
+                "in_use": in_use,
+                "min_size": sync_pool.minconn,
+                "max_size": sync_pool.maxconn,
+            }
+        
+        return stats
+    
+    async def health_check(self) -> Dict[str, Any]:
+        """
+        健康检查: 执行一次 SELECT 1 并附带连接池统计
+        
+        Returns:
+            健康状态字典
+        """
+        start = time.monotonic()
+        try:
+            async with self.acquire() as conn:
+                await conn.fetchval("SELECT 1")
+            healthy = True
+            error = None
+        except Exception as e:
+            healthy = False
+            error = str(e)
+        
+        return {
+            "healthy": healthy,
+            "latency_ms": round((time.monotonic() - start) * 1000, 2),
+            "error": error,
+            "stats": self.get_stats(),
+        }
     
     @property
     def is_connected(self) -> bool:
         """检查是否已连接"""
         return self._is_connected
     
+    @_ttl_cache(ttl=5)
     def test_connection(self) -> bool:
         """
-        测试数据库连接
+        测试数据库连接，结果缓存 5 秒
         
         Returns:
             连接是否成功
         """
         try:
-            conn = self.get_connection()
-            cursor = conn.cursor()
-            cursor.execute("SELECT 1")
-            cursor.close()
-            self.return_connection(conn)
+            with self.connection() as conn:
+                with conn.cursor() as cursor:
+                    cursor.execute("SELECT 1")
             logger.info("数据库连接测试成功")
             return True
         except Exception as e:
-            logger.error(f"数据库连接测试失败: {str(e)}")
+            logger.error("数据库连接测试失败: %s", e)
             return False
 
 
@@ -3,15 +3,23 @@ PostGIS MCP 服务器主入口
 使用 FastMCP 框架封装 PostGIS 工具
 """
 import asyncio
+import functools
+import json
 import logging
+import re
 import sys
 import os
 from pathlib import Path
-from typing import Dict, Any, List, Optional
+from contextlib import asynccontextmanager
+from typing import Dict, Any, List, Optional, AsyncIterator
 from mcp.server import FastMCP
 import subprocess
-import time
-import requests
+import aiohttp
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
 
 # 添加项目根目录到Python路径
 project_root = Path(__file__).parent.parent
@@ -37,6 +45,7 @@ from src.tools import (
     calculate_length,
     transform_geometry,
     simplify_geometry,
+    batch_geometry_ops,
     calculate_distance,
     check_intersection,
     check_containment,
@@ -55,32 +64,163 @@ from src.tools import (
     list_spatial_tables,
     get_table_spatial_info,
     create_spatial_index,
+    create_spatial_indexes,
     analyze_table,
     vacuum_table,
+    get_maintenance_status,
+    subdivide_table,
     get_spatial_extent,
     check_geometry_validity,
+    get_table_overview,
     import_shapefile,
     import_geojson,
     import_geotiff,
     import_png_as_georeferenced,
     list_supported_formats,
 )
+from src.tools.cache import catalog_cache
+from src.tools.validation import validate_wkt, validate_wkt_list
 from src.tools.text_to_sql import (
+    prefetch_sql,
     parse_nl_query,
     execute_generated_sql,
 )
 from src.tools.vanna_mcp_adapter import (
     get_vanna_mcp_adapter,
+    close_vanna_mcp_adapter,
     VANNA_AVAILABLE,
 )
 
+# Vanna 适配器在进程内只创建一次，各工具共享其 HTTP 会话和初始化状态
+vanna_adapter = get_vanna_mcp_adapter()
+
+async def prefetch_spatial_catalog(schema: str = "public"):
+    """
+    预取指定模式的空间表列表和各表空间信息到元数据缓存
+    
+    Args:
+        schema: 数据库模式名
+    """
+    try:
+        tables = await list_spatial_tables(schema)
+        await asyncio.gather(
+            *[get_table_spatial_info(t["table"], schema) for t in tables],
+            return_exceptions=True
+        )
+        logger.info(f"已预取 {schema} 模式 {len(tables)} 个空间表的元数据")
+    except Exception as e:
+        logger.warning(f"预取空间元数据失败: {str(e)}")
+
+
+# 连接池和 Vanna 适配器的持有者计数。streamable HTTP 模式下 FastMCP 为每个会话
+# 各执行一次 server_lifespan，应用级生命周期另持有一份，只有最后一个持有者退出时才关闭
+_resource_holders = 0
+_prefetch_task: Optional[asyncio.Task] = None
+
+
+@asynccontextmanager
+async def shared_resources() -> AsyncIterator[None]:
+    """
+    持有进程内共享的连接池和 Vanna 适配器
+    
+    第一个持有者进入时预热 asyncpg 连接池并预取空间元数据，
+    最后一个持有者退出时关闭 Vanna 适配器和连接池
+    """
+    global _resource_holders, _prefetch_task
+    _resource_holders += 1
+    if _resource_holders == 1 and db_config.use_asyncpg:
+        try:
+            await db_config.get_async_pool()
+            # 后台预取 public 模式的空间元数据，与服务器启动并行
+            _prefetch_task = asyncio.create_task(prefetch_spatial_catalog("public"))
+        except Exception as e:
+            logger.warning(f"预热数据库连接池失败，将在首次请求时重试: {str(e)}")
+    try:
+        yield
+    finally:
+        _resource_holders -= 1
+        if _resource_holders == 0:
+            if _prefetch_task is not None and not _prefetch_task.done():
+                _prefetch_task.cancel()
+            _prefetch_task = None
+            await close_vanna_mcp_adapter()
+            await db_config.close_async_pool()
+
+
+@asynccontextmanager
+async def server_lifespan(server: FastMCP) -> AsyncIterator[Dict[str, Any]]:
+    """
+    MCP 服务器(会话)生命周期: 持有共享资源直到会话结束
+    
+    stdio 模式下整个进程只有一个会话；streamable HTTP 模式下应用级生命周期
+    始终持有共享资源，会话结束不会关闭其他会话仍在使用的连接池
+    
+    Args:
+        server: FastMCP 服务器实例
+    """
+    async with shared_resources():
+        yield {}
+
+
+def safe_tool(message: str):
+    """
+    统一包装工具的返回结构
+    
+    工具函数只需返回结果字典，成功时合并到 {"success": True} 中；
+    抛出异常时记录日志并返回 {"success": False, "error": ...}。
+    结果字典中自带的 success 字段优先
+    
+    Args:
+        message: 失败时的日志信息
+    """
+    def decorator(func):
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as e:
+                logger.exception("%s: %s", message, e)
+                return {"success": False, "error": str(e)}
+            return {"success": True, **result}
+        
+        return wrapper
+    return decorator
+
+
+# 未安装 Vanna 时所有 Vanna 工具共用的返回值(只读，不要修改)
+_VANNA_UNAVAILABLE = {"success": False, "error": "Vanna AI未安装"}
+
+
+def vanna_tool(message: str):
+    """
+    Vanna 工具装饰器: 未安装 Vanna 时直接返回错误，其余行为同 safe_tool
+    
+    VANNA_AVAILABLE 在导入时即已确定，因此在装饰时选定包装函数，
+    调用时不再多套一层检查
+    
+    Args:
+        message: 失败时的日志信息
+    """
+    def decorator(func):
+        if VANNA_AVAILABLE:
+            return safe_tool(message)(func)
+        
+        @functools.wraps(func)
+        async def unavailable(*args, **kwargs):
+            return _VANNA_UNAVAILABLE
+        
+        return unavailable
+    return decorator
+
+
 # 初始化 FastMCP 服务器
-mcp = FastMCP("PostGIS MCP Server")
+mcp = FastMCP("PostGIS MCP Server", lifespan=server_lifespan)
 
 
 # ============= 空间查询工具 =============
 
 @mcp.tool()
+@safe_tool("查询附近要素失败")
 async def query_nearby(
     longitude: float,
     latitude: float,
@@ -103,24 +243,17 @@ async def query_nearby(
     Returns:
         查询结果字典，包含要素列表和距离信息
     """
-    try:
-        results = await query_nearby_features(
-            longitude, latitude, radius, table_name, geometry_column, limit
-        )
-        return {
-            "success": True,
-            "count": len(results),
-            "features": results
-        }
-    except Exception as e:
-        logger.error(f"查询附近要素失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    results = await query_nearby_features(
+        longitude, latitude, radius, table_name, geometry_column, limit
+    )
+    return {
+        "count": len(results),
+        "features": results
+    }
 
 
 @mcp.tool()
+@safe_tool("查询边界框内要素失败")
 async def query_bbox(
     min_x: float,
     min_y: float,
@@ -145,24 +278,17 @@ async def query_bbox(
     Returns:
         查询结果字典，包含边界框内的要素列表
     """
-    try:
-        results = await query_within_bbox(
-            min_x, min_y, max_x, max_y, table_name, geometry_column, limit
-        )
-        return {
-            "success": True,
-            "count": len(results),
-            "features": results
-        }
-    except Exception as e:
-        logger.error(f"查询边界框内要素失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    results = await query_within_bbox(
+        min_x, min_y, max_x, max_y, table_name, geometry_column, limit
+    )
+    return {
+        "count": len(results),
+        "features": results
+    }
 
 
 @mcp.tool()
+@safe_tool("根据属性查询要素失败")
 async def query_attribute(
     table_name: str,
     attribute_name: str,
@@ -183,30 +309,26 @@ async def query_attribute(
     Returns:
         查询结果字典，包含匹配的要素列表
     """
-    try:
-        results = await query_by_attribute(
-            table_name, attribute_name, attribute_value, geometry_column, limit
-        )
-        return {
-            "success": True,
-            "count": len(results),
-            "features": results
-        }
-    except Exception as e:
-        logger.error(f"根据属性查询要素失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    results = await query_by_attribute(
+        table_name, attribute_name, attribute_value, geometry_column, limit
+    )
+    return {
+        "count": len(results),
+        "features": results
+    }
 
 
 # ============= 几何操作工具 =============
 
 @mcp.tool()
+@safe_tool("创建缓冲区失败")
 async def buffer_geometry(
     geometry_wkt: str,
     distance: float,
-    srid: int = 4326
+    srid: int = 4326,
+    strategy: str = "auto",
+    pre_simplify_tolerance: float = None,
+    geometry_format: str = "wkt"
 ) -> Dict[str, Any]:
     """
     创建几何缓冲区
@@ -215,25 +337,24 @@ async def buffer_geometry(
         geometry_wkt: WKT格式的几何对象
         distance: 缓冲距离（米）
         srid: 空间参考系统ID，默认4326（WGS84）
+        strategy: 缓冲策略，默认 auto 按几何复杂度自动选择；
+                  也可指定 plain(直接缓冲)、union(分段缓冲后合并，适合复杂线；点、面按 plain 处理)、
+                  repeated(多次小距离缓冲，适合距离远大于几何尺寸的情况)
+        pre_simplify_tolerance: 缓冲前的简化容差（米），默认在顶点数超过5000时自动简化，
+                                设置为0表示不简化
+        geometry_format: 输出几何格式，wkt(默认)、twkb(base64 编码，体积更小) 或 ewkb(十六进制，无损)
         
     Returns:
-        包含缓冲区几何和面积信息的字典
+        包含缓冲区几何、面积信息和所用策略的字典
     """
-    try:
-        result = await create_buffer(geometry_wkt, distance, srid)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"创建缓冲区失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    validate_wkt(geometry_wkt)
+    return await create_buffer(
+        geometry_wkt, distance, srid, strategy, pre_simplify_tolerance, geometry_format
+    )
 
 
 @mcp.tool()
+@safe_tool("计算面积失败")
 async def get_area(
     geometry_wkt: str,
     srid: int = 4326
@@ -248,21 +369,12 @@ async def get_area(
     Returns:
         包含面积信息的字典（平方米和平方公里）
     """
-    try:
-        result = await calculate_area(geometry_wkt, srid)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"计算面积失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    validate_wkt(geometry_wkt)
+    return await calculate_area(geometry_wkt, srid)
 
 
 @mcp.tool()
+@safe_tool("计算长度失败")
 async def get_length(
     geometry_wkt: str,
     srid: int = 4326
@@ -277,21 +389,12 @@ async def get_length(
     Returns:
         包含长度信息的字典（米和公里）
     """
-    try:
-        result = await calculate_length(geometry_wkt, srid)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"计算长度失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    validate_wkt(geometry_wkt)
+    return await calculate_length(geometry_wkt, srid)
 
 
 @mcp.tool()
+@safe_tool("坐标系统转换失败")
 async def transform_coords(
     geometry_wkt: str,
     from_srid: int,
@@ -308,54 +411,70 @@ async def transform_coords(
     Returns:
         包含转换后几何的字典
     """
-    try:
-        result = await transform_geometry(geometry_wkt, from_srid, to_srid)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"坐标系统转换失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    validate_wkt(geometry_wkt)
+    return await transform_geometry(geometry_wkt, from_srid, to_srid)
 
 
 @mcp.tool()
+@safe_tool("简化几何失败")
 async def simplify_geom(
     geometry_wkt: str,
     tolerance: float,
-    srid: int = 4326
+    srid: int = 4326,
+    algorithm: str = "dp",
+    geometry_format: str = "wkt"
 ) -> Dict[str, Any]:
     """
     简化几何对象
     
     Args:
         geometry_wkt: WKT格式的几何对象
-        tolerance: 简化容差
+        tolerance: 简化容差(vw 算法为面积容差)
         srid: 空间参考系统ID，默认4326（WGS84）
+        algorithm: 简化算法，dp(Douglas-Peucker，默认)、
+                   vw(Visvalingam-Whyatt，同等顶点数下更好地保持形状)、
+                   preserve_topology(保持拓扑有效)
+        geometry_format: 输出几何格式，wkt(默认)、twkb(base64 编码，体积更小) 或 ewkb(十六进制，无损)
         
     Returns:
         包含简化后几何和统计信息的字典
     """
-    try:
-        result = await simplify_geometry(geometry_wkt, tolerance, srid)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"简化几何失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    validate_wkt(geometry_wkt)
+    return await simplify_geometry(
+        geometry_wkt, tolerance, srid, algorithm, geometry_format
+    )
+
+
+@mcp.tool()
+@safe_tool("批量几何计算失败")
+async def geometry_metrics(
+    geometry_wkt: str,
+    ops: List[str] = None,
+    srid: int = 4326
+) -> Dict[str, Any]:
+    """
+    一次性计算几何对象的多个属性(单次数据库往返)
+    
+    需要同时获取面积、长度、中心点等信息时，优先使用此工具代替多次调用
+    get_area / get_length / get_centroid
+    
+    Args:
+        geometry_wkt: WKT格式的几何对象
+        ops: 操作列表，可选 area, length, perimeter, centroid, envelope,
+             npoints, geometry_type, is_valid，默认 ["area", "length", "centroid"]
+        srid: 空间参考系统ID，默认4326（WGS84）
+        
+    Returns:
+        包含各项计算结果的字典（面积为平方米，长度为米）
+    """
+    validate_wkt(geometry_wkt)
+    return await batch_geometry_ops(geometry_wkt, ops, srid)
 
 
 # ============= 空间分析工具 =============
 
 @mcp.tool()
+@safe_tool("计算距离失败")
 async def measure_distance(
     geom1_wkt: str,
     geom2_wkt: str,
@@ -372,25 +491,18 @@ async def measure_distance(
     Returns:
         包含距离信息的字典（米和公里）
     """
-    try:
-        result = await calculate_distance(geom1_wkt, geom2_wkt, srid)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"计算距离失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    validate_wkt(geom1_wkt)
+    validate_wkt(geom2_wkt)
+    return await calculate_distance(geom1_wkt, geom2_wkt, srid)
 
 
 @mcp.tool()
+@safe_tool("相交检查失败")
 async def test_intersection(
     geom1_wkt: str,
     geom2_wkt: str,
-    srid: int = 4326
+    srid: int = 4326,
+    pre_simplify_tolerance: float = None
 ) -> Dict[str, Any]:
     """
     检查两个几何对象是否相交
@@ -399,25 +511,20 @@ async def test_intersection(
         geom1_wkt: 第一个几何对象的WKT格式
         geom2_wkt: 第二个几何对象的WKT格式
         srid: 空间参考系统ID，默认4326（WGS84）
+        pre_simplify_tolerance: 计算前的简化容差(坐标单位)，用于顶点很多的几何，默认不简化
         
     Returns:
         包含相交信息和相交几何的字典
     """
-    try:
-        result = await check_intersection(geom1_wkt, geom2_wkt, srid)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"相交检查失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    validate_wkt(geom1_wkt)
+    validate_wkt(geom2_wkt)
+    return await check_intersection(
+        geom1_wkt, geom2_wkt, srid, pre_simplify_tolerance
+    )
 
 
 @mcp.tool()
+@safe_tool("包含关系检查失败")
 async def test_containment(
     container_wkt: str,
     contained_wkt: str,
@@ -434,24 +541,17 @@ async def test_containment(
     Returns:
         包含包含关系信息的字典
     """
-    try:
-        result = await check_containment(container_wkt, contained_wkt, srid)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"包含关系检查失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    validate_wkt(container_wkt)
+    validate_wkt(contained_wkt)
+    return await check_containment(container_wkt, contained_wkt, srid)
 
 
 @mcp.tool()
+@safe_tool("合并几何对象失败")
 async def union_geoms(
     geometries_wkt: List[str],
-    srid: int = 4326
+    srid: int = 4326,
+    pre_simplify_tolerance: float = None
 ) -> Dict[str, Any]:
     """
     合并多个几何对象
@@ -459,25 +559,17 @@ async def union_geoms(
     Args:
         geometries_wkt: WKT格式的几何对象列表
         srid: 空间参考系统ID，默认4326（WGS84）
+        pre_simplify_tolerance: 合并前的简化容差(坐标单位)，用于顶点很多的几何，默认不简化
         
     Returns:
         包含合并后几何和面积信息的字典
     """
-    try:
-        result = await union_geometries(geometries_wkt, srid)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"合并几何对象失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    validate_wkt_list(geometries_wkt)
+    return await union_geometries(geometries_wkt, srid, pre_simplify_tolerance)
 
 
 @mcp.tool()
+@safe_tool("计算质心失败")
 async def get_centroid(
     geometry_wkt: str,
     srid: int = 4326
@@ -492,23 +584,14 @@ async def get_centroid(
     Returns:
         包含质心坐标的字典
     """
-    try:
-        result = await calculate_centroid(geometry_wkt, srid)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"计算质心失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    validate_wkt(geometry_wkt)
+    return await calculate_centroid(geometry_wkt, srid)
 
 
 # ============= 数据库管理工具 =============
 
 @mcp.tool()
+@safe_tool("获取 PostGIS 版本失败")
 async def postgis_version() -> Dict[str, Any]:
     """
     获取 PostGIS 版本信息
@@ -516,21 +599,11 @@ async def postgis_version() -> Dict[str, Any]:
     Returns:
         包含 PostGIS 各组件版本信息的字典
     """
-    try:
-        result = await get_postgis_version()
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"获取 PostGIS 版本失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await get_postgis_version()
 
 
 @mcp.tool()
+@safe_tool("列出扩展失败")
 async def list_extensions() -> Dict[str, Any]:
     """
     列出数据库中已安装的所有扩展
@@ -538,22 +611,15 @@ async def list_extensions() -> Dict[str, Any]:
     Returns:
         已安装扩展列表
     """
-    try:
-        extensions = await list_installed_extensions()
-        return {
-            "success": True,
-            "count": len(extensions),
-            "extensions": extensions
-        }
-    except Exception as e:
-        logger.error(f"列出扩展失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    extensions = await list_installed_extensions()
+    return {
+        "count": len(extensions),
+        "extensions": extensions
+    }
 
 
 @mcp.tool()
+@safe_tool("发现空间表失败")
 async def discover_spatial_tables(schema: str = "public") -> Dict[str, Any]:
     """
     发现包含空间字段的表
@@ -564,26 +630,20 @@ async def discover_spatial_tables(schema: str = "public") -> Dict[str, Any]:
     Returns:
         包含空间字段的表列表
     """
-    try:
-        tables = await list_spatial_tables(schema)
-        return {
-            "success": True,
-            "schema": schema,
-            "count": len(tables),
-            "tables": tables
-        }
-    except Exception as e:
-        logger.error(f"发现空间表失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    tables = await list_spatial_tables(schema)
+    return {
+        "schema": schema,
+        "count": len(tables),
+        "tables": tables
+    }
 
 
 @mcp.tool()
+@safe_tool("获取表信息失败")
 async def table_info(
     table_name: str,
-    schema: str = "public"
+    schema: str = "public",
+    exact: bool = False
 ) -> Dict[str, Any]:
     """
     获取表的详细空间信息
@@ -591,57 +651,116 @@ async def table_info(
     Args:
         table_name: 表名
         schema: 模式名，默认为 'public'
+        exact: 是否精确统计行数(大表上较慢)，默认只返回估计值 row_count_estimate
         
     Returns:
         表的详细空间信息，包括几何列、索引和统计信息
     """
-    try:
-        info = await get_table_spatial_info(table_name, schema)
-        return {
-            "success": True,
-            **info
-        }
-    except Exception as e:
-        logger.error(f"获取表信息失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await get_table_spatial_info(table_name, schema, exact)
 
 
 @mcp.tool()
+@safe_tool("创建索引失败")
 async def create_index(
     table_name: str,
     geometry_column: str = "geom",
     schema: str = "public",
-    index_name: str = None
+    index_name: str = None,
+    index_type: str = None,
+    extra_columns: List[str] = None,
+    partial_where: List[Dict[str, Any]] = None,
+    knn: bool = True,
+    geography_index: bool = False
 ) -> Dict[str, Any]:
     """
-    为空间列创建 GIST 索引
+    为空间列创建空间索引
     
     Args:
         table_name: 表名
         geometry_column: 几何列名，默认为 'geom'
         schema: 模式名，默认为 'public'
         index_name: 索引名称，如果不提供则自动生成
+        index_type: 索引类型 gist / spgist / brin，不提供时默认 gist，
+                    knn=False 时点、面表使用 spgist；按时间顺序追加写入的大表可使用 brin
+        extra_columns: 与几何列组成复合索引的前导列，如 ["category"]
+                       (GiST 复合索引需要 btree_gist 扩展)
+        partial_where: 部分索引条件列表(AND 连接)，每项包含 column、op、value，
+                       如 [{"column": "active", "op": "=", "value": true}]；
+                       op 可选 = <> < <= > >= IN IS NULL IS NOT NULL
+        knn: 表是否需要 find_nearest 等最近邻查询(SP-GiST 不支持)，默认是
+        geography_index: 几何列为 EPSG:4326 等地理坐标系时，是否额外创建 (geom::geography)
+                         表达式 GiST 索引以加速按米计算的距离查询；会再扫描一次全表，默认否
         
     Returns:
         索引创建结果
     """
-    try:
-        result = await create_spatial_index(
-            table_name, geometry_column, schema, index_name
-        )
-        return result
-    except Exception as e:
-        logger.error(f"创建索引失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    result = await create_spatial_index(
+        table_name, geometry_column, schema, index_name, index_type,
+        extra_columns, partial_where, knn=knn, geography_index=geography_index
+    )
+    catalog_cache.invalidate(schema, table_name)
+    return result
 
 
 @mcp.tool()
+@safe_tool("批量创建索引失败")
+async def create_indexes(
+    specs: List[Dict[str, Any]],
+    concurrently: bool = True
+) -> Dict[str, Any]:
+    """
+    并发批量创建空间索引
+    
+    Args:
+        specs: 索引定义列表，每项包含 table_name，可选 geometry_column、schema、
+               index_name、index_type、extra_columns、partial_where、knn、geography_index
+               例如 [{"table_name": "roads"}, {"table_name": "pois", "index_type": "gist"}]
+        concurrently: 是否使用 CREATE INDEX CONCURRENTLY(不阻塞写入)，默认是
+        
+    Returns:
+        每个索引的创建结果
+    """
+    results = await create_spatial_indexes(specs, concurrently)
+    for spec in specs:
+        catalog_cache.invalidate(spec.get("schema", "public"), spec.get("table_name"))
+    return {
+        "count": len(results),
+        "created": sum(1 for r in results if r.get("success")),
+        "results": results
+    }
+
+
+@mcp.tool()
+@safe_tool("拆分表失败")
+async def subdivide(
+    table_name: str,
+    geometry_column: str = "geom",
+    schema: str = "public",
+    id_column: str = "id",
+    max_vertices: int = 256
+) -> Dict[str, Any]:
+    """
+    用 ST_Subdivide 将大而复杂的几何拆分到 <table>_subdiv 辅助表并建立索引
+    
+    之后可在 join_spatial 中使用 use_subdivided=True，显著减少大多边形的候选数量
+    
+    Args:
+        table_name: 表名
+        geometry_column: 几何列名
+        schema: 模式名
+        id_column: 源表主键列
+        max_vertices: 每块的最大顶点数
+        
+    Returns:
+        拆分结果
+    """
+    result = await subdivide_table(table_name, geometry_column, schema, id_column, max_vertices)
+    catalog_cache.invalidate(schema)
+    return result
+
+
+@mcp.tool()
+@safe_tool("分析表失败")
 async def analyze(
     table_name: str,
     schema: str = "public"
@@ -649,25 +768,20 @@ async def analyze(
     """
     分析表以更新统计信息
     
+    分析在后台执行，返回任务ID，使用 maintenance_status 查询结果
+    
     Args:
         table_name: 表名
         schema: 模式名，默认为 'public'
         
     Returns:
-        分析结果
+        任务信息
     """
-    try:
-        result = await analyze_table(table_name, schema)
-        return result
-    except Exception as e:
-        logger.error(f"分析表失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await analyze_table(table_name, schema)
 
 
 @mcp.tool()
+@safe_tool("清理表失败")
 async def vacuum(
     table_name: str,
     schema: str = "public",
@@ -676,97 +790,127 @@ async def vacuum(
     """
     清理表以回收空间
     
+    清理在后台执行，返回任务ID，使用 maintenance_status 查询结果
+    
     Args:
         table_name: 表名
         schema: 模式名，默认为 'public'
         full: 是否执行完全清理
         
     Returns:
-        清理结果
+        任务信息
     """
-    try:
-        result = await vacuum_table(table_name, schema, full)
-        return result
-    except Exception as e:
-        logger.error(f"清理表失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await vacuum_table(table_name, schema, full)
+
+
+@mcp.tool()
+@safe_tool("查询维护任务失败")
+async def maintenance_status(job_id: str) -> Dict[str, Any]:
+    """
+    查询 analyze / vacuum 后台任务的状态
+    
+    Args:
+        job_id: analyze 或 vacuum 返回的任务ID
+        
+    Returns:
+        任务状态(queued / running / succeeded / failed)及出错信息
+    """
+    return get_maintenance_status(job_id)
 
 
 @mcp.tool()
+@safe_tool("获取空间范围失败")
 async def spatial_extent(
     table_name: str,
     geometry_column: str = "geom",
-    schema: str = "public"
+    schema: str = "public",
+    exact: bool = False
 ) -> Dict[str, Any]:
     """
     获取表的空间范围
     
+    默认返回基于统计信息的估计范围和要素数量，不扫描表
+    
     Args:
         table_name: 表名
         geometry_column: 几何列名
         schema: 模式名
+        exact: 是否扫描全表计算精确范围
         
     Returns:
         表的空间范围信息
     """
-    try:
-        result = await get_spatial_extent(table_name, geometry_column, schema)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"获取空间范围失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await get_spatial_extent(table_name, geometry_column, schema, exact)
 
 
 @mcp.tool()
+@safe_tool("检查几何有效性失败")
 async def validate_geometries(
     table_name: str,
     geometry_column: str = "geom",
-    schema: str = "public"
+    schema: str = "public",
+    sample_percent: float = None,
+    fresh: bool = False
 ) -> Dict[str, Any]:
     """
     检查表中几何对象的有效性
     
+    全表检查的结果会缓存一段时间，返回的 cached / as_of 标明是否来自缓存及统计时间
+    
     Args:
         table_name: 表名
         geometry_column: 几何列名
         schema: 模式名
+        sample_percent: 抽样百分比(0-100]，大表可用于快速估计；不提供时检查全表
+        fresh: 是否忽略缓存重新检查(修复几何后复查时使用)，默认否
         
     Returns:
         几何有效性检查结果
     """
-    try:
-        result = await check_geometry_validity(table_name, geometry_column, schema)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"检查几何有效性失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await check_geometry_validity(
+        table_name, geometry_column, schema, sample_percent, fresh
+    )
+
+
+@mcp.tool()
+@safe_tool("获取表空间概况失败")
+async def table_overview(
+    table_name: str,
+    geometry_column: str = "geom",
+    schema: str = "public"
+) -> Dict[str, Any]:
+    """
+    一次扫描同时获取表的空间范围和几何有效性
+    
+    同时需要两项统计时优先使用本工具，比分别调用 spatial_extent 和
+    validate_geometries 少扫描一次表
+    
+    Args:
+        table_name: 表名
+        geometry_column: 几何列名
+        schema: 模式名
+        
+    Returns:
+        包含 extent(空间范围)和 validity(几何有效性)的结果
+    """
+    return await get_table_overview(table_name, geometry_column, schema)
 
 
 # ============= 高级空间分析工具 =============
 
 @mcp.tool()
+@safe_tool("空间连接失败")
 async def join_spatial(
     table1: str,
     table2: str,
     geom_col1: str = "geom",
     geom_col2: str = "geom",
     join_type: str = "intersects",
-    schema: str = "public"
+    schema: str = "public",
+    columns1: List[str] = None,
+    columns2: List[str] = None,
+    use_subdivided: bool = False,
+    id_col2: str = "id"
 ) -> Dict[str, Any]:
     """
     执行空间连接操作
@@ -778,28 +922,27 @@ async def join_spatial(
         geom_col2: 第二个表的几何列名
         join_type: 连接类型 (intersects, contains, within, touches, overlaps)
         schema: 模式名
+        columns1: 第一个表需要返回的列，不提供时返回全部列
+        columns2: 第二个表需要返回的列，不提供时返回全部列
+        use_subdivided: 通过 subdivide 生成的第二个表的拆分表筛选候选(仅 intersects)，
+                        适用于第二个表是大而复杂的多边形
+        id_col2: 第二个表的主键列，use_subdivided 时使用
         
     Returns:
-        空间连接结果
-    """
-    try:
-        results = await spatial_join(
-            table1, table2, geom_col1, geom_col2, join_type, schema
-        )
-        return {
-            "success": True,
-            "count": len(results),
-            "results": results
-        }
-    except Exception as e:
-        logger.error(f"空间连接失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+        空间连接结果，每条结果的 t1 / t2 分别为两张表的行
+    """
+    results = await spatial_join(
+        table1, table2, geom_col1, geom_col2, join_type, schema, columns1, columns2,
+        use_subdivided, id_col2
+    )
+    return {
+        "count": len(results),
+        "results": results
+    }
 
 
 @mcp.tool()
+@safe_tool("最近邻查询失败")
 async def find_nearest(
     point_wkt: str,
     table_name: str,
@@ -824,24 +967,18 @@ async def find_nearest(
     Returns:
         最近邻居列表
     """
-    try:
-        neighbors = await nearest_neighbor(
-            point_wkt, table_name, geometry_column, k, max_distance, schema, srid
-        )
-        return {
-            "success": True,
-            "count": len(neighbors),
-            "neighbors": neighbors
-        }
-    except Exception as e:
-        logger.error(f"最近邻查询失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    validate_wkt(point_wkt)
+    neighbors = await nearest_neighbor(
+        point_wkt, table_name, geometry_column, k, max_distance, schema, srid
+    )
+    return {
+        "count": len(neighbors),
+        "neighbors": neighbors
+    }
 
 
 @mcp.tool()
+@safe_tool("空间聚类失败")
 async def cluster_spatial(
     table_name: str,
     geometry_column: str = "geom",
@@ -862,27 +999,18 @@ async def cluster_spatial(
     Returns:
         聚类结果
     """
-    try:
-        result = await spatial_cluster(
-            table_name, geometry_column, distance, min_points, schema
-        )
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"空间聚类失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await spatial_cluster(
+        table_name, geometry_column, distance, min_points, schema
+    )
 
 
 @mcp.tool()
+@safe_tool("计算凸包失败")
 async def compute_convex_hull(
     table_name: str,
     geometry_column: str = "geom",
-    schema: str = "public"
+    schema: str = "public",
+    pre_simplify_tolerance: float = None
 ) -> Dict[str, Any]:
     """
     计算表中所有几何对象的凸包
@@ -891,29 +1019,23 @@ async def compute_convex_hull(
         table_name: 表名
         geometry_column: 几何列名
         schema: 模式名
+        pre_simplify_tolerance: 计算前的简化容差(坐标单位)，默认不简化
         
     Returns:
         凸包信息
     """
-    try:
-        result = await convex_hull(table_name, geometry_column, schema)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"计算凸包失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await convex_hull(
+        table_name, geometry_column, schema, pre_simplify_tolerance
+    )
 
 
 @mcp.tool()
+@safe_tool("生成 Voronoi 多边形失败")
 async def generate_voronoi(
     table_name: str,
     geometry_column: str = "geom",
-    schema: str = "public"
+    schema: str = "public",
+    geometry_format: str = "geojson"
 ) -> Dict[str, Any]:
     """
     生成 Voronoi 多边形
@@ -922,26 +1044,20 @@ async def generate_voronoi(
         table_name: 表名
         geometry_column: 几何列名
         schema: 模式名
+        geometry_format: 多边形输出格式 geojson(默认) / wkt / twkb / ewkb(十六进制)
         
     Returns:
         Voronoi 多边形列表
     """
-    try:
-        polygons = await voronoi_polygons(table_name, geometry_column, schema)
-        return {
-            "success": True,
-            "count": len(polygons),
-            "polygons": polygons
-        }
-    except Exception as e:
-        logger.error(f"生成 Voronoi 多边形失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    polygons = await voronoi_polygons(table_name, geometry_column, schema, geometry_format)
+    return {
+        "count": len(polygons),
+        "polygons": polygons
+    }
 
 
 @mcp.tool()
+@safe_tool("线段插值失败")
 async def interpolate_line(
     line_wkt: str,
     fraction: float,
@@ -958,21 +1074,12 @@ async def interpolate_line(
     Returns:
         插值点信息
     """
-    try:
-        result = await line_interpolate(line_wkt, fraction, srid)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"线段插值失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    validate_wkt(line_wkt)
+    return await line_interpolate(line_wkt, fraction, srid)
 
 
 @mcp.tool()
+@safe_tool("捕捉到网格失败")
 async def snap_geometry(
     geometry_wkt: str,
     grid_size: float,
@@ -989,21 +1096,12 @@ async def snap_geometry(
     Returns:
         捕捉后的几何对象
     """
-    try:
-        result = await snap_to_grid(geometry_wkt, grid_size, srid)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"捕捉到网格失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    validate_wkt(geometry_wkt)
+    return await snap_to_grid(geometry_wkt, grid_size, srid)
 
 
 @mcp.tool()
+@safe_tool("线段分割失败")
 async def split_line(
     line_wkt: str,
     point_wkt: str,
@@ -1020,23 +1118,15 @@ async def split_line(
     Returns:
         分割后的线段信息
     """
-    try:
-        result = await split_line_by_point(line_wkt, point_wkt, srid)
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"线段分割失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    validate_wkt(line_wkt)
+    validate_wkt(point_wkt)
+    return await split_line_by_point(line_wkt, point_wkt, srid)
 
 
 # ============= 数据导入工具 =============
 
 @mcp.tool()
+@safe_tool("导入 Shapefile 失败")
 async def import_shp(
     file_path: str,
     table_name: str,
@@ -1059,23 +1149,15 @@ async def import_shp(
     Returns:
         导入结果信息，包括表名、几何类型、要素数量等
     """
-    try:
-        result = await import_shapefile(
-            file_path, table_name, schema, srid, geometry_column, if_exists
-        )
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"导入 Shapefile 失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    result = await import_shapefile(
+        file_path, table_name, schema, srid, geometry_column, if_exists
+    )
+    catalog_cache.invalidate(schema, table_name)
+    return result
 
 
 @mcp.tool()
+@safe_tool("导入 GeoJSON 失败")
 async def import_geojson_file(
     file_path: str = None,
     geojson_data: str = None,
@@ -1100,23 +1182,15 @@ async def import_geojson_file(
     Returns:
         导入结果信息，包括表名、几何类型、要素数量等
     """
-    try:
-        result = await import_geojson(
-            file_path, geojson_data, table_name, schema, srid, geometry_column, if_exists
-        )
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"导入 GeoJSON 失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    result = await import_geojson(
+        file_path, geojson_data, table_name, schema, srid, geometry_column, if_exists
+    )
+    catalog_cache.invalidate(schema, table_name)
+    return result
 
 
 @mcp.tool()
+@safe_tool("导入 GeoTIFF 失败")
 async def import_tif(
     file_path: str,
     table_name: str,
@@ -1139,23 +1213,15 @@ async def import_tif(
     Returns:
         导入结果信息，包括表名、尺寸、波段数等
     """
-    try:
-        result = await import_geotiff(
-            file_path, table_name, schema, srid, tile_size, overview_levels
-        )
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"导入 GeoTIFF 失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    result = await import_geotiff(
+        file_path, table_name, schema, srid, tile_size, overview_levels
+    )
+    catalog_cache.invalidate(schema, table_name)
+    return result
 
 
 @mcp.tool()
+@safe_tool("导入 PNG 失败")
 async def import_png(
     file_path: str,
     table_name: str,
@@ -1176,23 +1242,15 @@ async def import_png(
     Returns:
         导入结果信息，包括表名、尺寸、地理范围等
     """
-    try:
-        result = await import_png_as_georeferenced(
-            file_path, table_name, bounds, schema, srid
-        )
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"导入 PNG 失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    result = await import_png_as_georeferenced(
+        file_path, table_name, bounds, schema, srid
+    )
+    catalog_cache.invalidate(schema, table_name)
+    return result
 
 
 @mcp.tool()
+@safe_tool("获取支持格式失败")
 async def get_supported_formats() -> Dict[str, Any]:
     """
     列出所有支持的数据导入格式
@@ -1200,22 +1258,19 @@ async def get_supported_formats() -> Dict[str, Any]:
     Returns:
         支持的矢量和栅格格式列表
     """
-    try:
-        result = await list_supported_formats()
-        return {
-            "success": True,
-            **result
-        }
-    except Exception as e:
-        logger.error(f"获取支持格式失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await list_supported_formats()
 
 # ============= Text-to-SQL 工具 =============
 
+# execute_sql 安全检查: 语句开头必须是 SELECT (或注释)，且不允许出现修改类关键字
+_SELECT_PREFIX_RE = re.compile(r'\s*(SELECT|--)', re.IGNORECASE)
+_DANGEROUS_RE = re.compile(
+    r'\b(DROP|DELETE|TRUNCATE|INSERT|UPDATE|ALTER|CREATE|GRANT|REVOKE)\b',
+    re.IGNORECASE
+)
+
 @mcp.tool()
+@safe_tool("NL to SQL转换失败")
 async def nl_to_sql(
     query: str,
     table_name: str = None,
@@ -1248,37 +1303,34 @@ async def nl_to_sql(
         3. 缓冲区:
            query: "为表:roads创建50米缓冲区"
     """
-    try:
-        result = await parse_nl_query(query, table_name, schema)
-        
-        if not result.get("success"):
-            return result
-        
-        return {
-            "success": True,
-            "message": "SQL生成成功。请检查以下SQL语句，确认无误后使用execute_sql工具执行。",
-            "query_type": result.get("query_type"),
-            "table_name": result.get("table_name"),
-            "schema": result.get("schema"),
-            "generated_sql": result.get("sql"),
-            "parameters": result.get("parameters"),
-            "original_query": result.get("original_query"),
-            "warning": "⚠️ 请仔细检查SQL语句后再执行，特别注意WHERE条件和LIMIT限制"
-        }
-        
-    except Exception as e:
-        logger.error(f"NL to SQL转换失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    result = await parse_nl_query(query, table_name, schema)
+    
+    if not result.get("success"):
+        return result
+    
+    # 用户确认期间在后台预编译SQL(使用execute_sql的默认limit)
+    prefetch_token = prefetch_sql(result["sql"], 100)
+    
+    return {
+        "message": "SQL生成成功。请检查以下SQL语句，确认无误后使用execute_sql工具执行。",
+        "query_type": result.get("query_type"),
+        "table_name": result.get("table_name"),
+        "schema": result.get("schema"),
+        "generated_sql": result.get("sql"),
+        "parameters": result.get("parameters"),
+        "original_query": result.get("original_query"),
+        "prefetch_token": prefetch_token,
+        "warning": "⚠️ 请仔细检查SQL语句后再执行，特别注意WHERE条件和LIMIT限制"
+    }
 
 
 @mcp.tool()
+@safe_tool("执行SQL失败")
 async def execute_sql(
     sql: str,
     limit: int = 100,
-    confirmed: bool = False
+    confirmed: bool = False,
+    prefetch_token: str = None
 ) -> Dict[str, Any]:
     """
     执行SQL查询语句
@@ -1293,6 +1345,7 @@ async def execute_sql(
         sql: 要执行的SQL语句(仅支持SELECT查询)
         limit: 结果数量限制，默认100
         confirmed: 确认标志，必须设置为true才能执行
+        prefetch_token: nl_to_sql 返回的预取令牌(可选)
         
     Returns:
         查询结果
@@ -1311,37 +1364,27 @@ async def execute_sql(
         }
     
     # 安全检查: 只允许SELECT语句
-    sql_upper = sql.strip().upper()
-    if not sql_upper.startswith('SELECT') and not sql_upper.startswith('--'):
+    if not _SELECT_PREFIX_RE.match(sql):
         return {
             "success": False,
             "error": "安全限制: 只允许执行SELECT查询语句"
         }
     
-    # 检查是否包含危险操作
-    dangerous_keywords = ['DROP', 'DELETE', 'TRUNCATE', 'INSERT', 'UPDATE', 'ALTER', 'CREATE']
-    for keyword in dangerous_keywords:
-        if keyword in sql_upper:
-            return {
-                "success": False,
-                "error": f"安全限制: SQL中不允许包含 {keyword} 操作"
-            }
-    
-    try:
-        result = await execute_generated_sql(sql, limit)
-        return result
-        
-    except Exception as e:
-        logger.error(f"执行SQL失败: {str(e)}")
+    # 检查是否包含危险操作(按整词匹配，避免误伤 created_at 之类的列名)
+    dangerous = _DANGEROUS_RE.search(sql)
+    if dangerous:
         return {
             "success": False,
-            "error": str(e)
+            "error": f"安全限制: SQL中不允许包含 {dangerous.group(1).upper()} 操作"
         }
+    
+    return await execute_generated_sql(sql, limit, prefetch_token)
 
 
 # ============= Vanna AI 工具 (高级Text-to-SQL) =============
 
 @mcp.tool()
+@vanna_tool("Vanna初始化失败")
 async def vanna_init(
     model_name: str = "gpt-4",
     api_key: str = None,
@@ -1379,20 +1422,11 @@ async def vanna_init(
         - 训练数据保存在本地./chroma_db目录
         - 支持OpenAI兼容的API端点
     """
-    try:
-        adapter = get_vanna_mcp_adapter()
-        result = await adapter.initialize(model_name, api_key, api_base)
-        return result
-        
-    except Exception as e:
-        logger.error(f"Vanna初始化失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await vanna_adapter.initialize(model_name, api_key, api_base)
 
 
 @mcp.tool()
+@vanna_tool("DDL训练预览失败")
 async def vanna_train_ddl(schema: str = "public") -> Dict[str, Any]:
     """
     预览数据库DDL训练 - 需要用户确认后才执行
@@ -1411,26 +1445,11 @@ async def vanna_train_ddl(schema: str = "public") -> Dict[str, Any]:
         2. 检查返回的信息
         3. vanna_confirm_training(session_id="training_xxx")
     """
-    if not VANNA_AVAILABLE:
-        return {
-            "success": False,
-            "error": "Vanna AI未安装"
-        }
-    
-    try:
-        adapter = get_vanna_mcp_adapter()
-        result = await adapter.train_ddl_preview(schema)
-        return result
-        
-    except Exception as e:
-        logger.error(f"DDL训练预览失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await vanna_adapter.train_ddl_preview(schema)
 
 
 @mcp.tool()
+@vanna_tool("文档训练预览失败")
 async def vanna_train_documentation(documentation: str) -> Dict[str, Any]:
     """
     预览文档训练 - 需要用户确认后才执行
@@ -1450,26 +1469,11 @@ async def vanna_train_documentation(documentation: str) -> Dict[str, Any]:
         2. 检查返回的信息
         3. vanna_confirm_training(session_id="training_xxx")
     """
-    if not VANNA_AVAILABLE:
-        return {
-            "success": False,
-            "error": "Vanna AI未安装"
-        }
-    
-    try:
-        adapter = get_vanna_mcp_adapter()
-        result = await adapter.train_documentation_preview(documentation)
-        return result
-        
-    except Exception as e:
-        logger.error(f"文档训练预览失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await vanna_adapter.train_documentation_preview(documentation)
 
 
 @mcp.tool()
+@vanna_tool("SQL示例训练预览失败")
 async def vanna_train_sql_example(
     question: str,
     sql: str
@@ -1493,26 +1497,11 @@ async def vanna_train_sql_example(
         2. 检查SQL正确性
         3. vanna_confirm_training(session_id="training_xxx")
     """
-    if not VANNA_AVAILABLE:
-        return {
-            "success": False,
-            "error": "Vanna AI未安装"
-        }
-    
-    try:
-        adapter = get_vanna_mcp_adapter()
-        result = await adapter.train_sql_example_preview(question, sql)
-        return result
-        
-    except Exception as e:
-        logger.error(f"SQL示例训练预览失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await vanna_adapter.train_sql_example_preview(question, sql)
 
 
 @mcp.tool()
+@vanna_tool("Vanna SQL生成失败")
 async def vanna_generate_sql(
     question: str,
     allow_llm_to_see_data: bool = False
@@ -1538,26 +1527,11 @@ async def vanna_generate_sql(
     注意:
         - allow_llm_to_see_data=True会提高准确性但可能涉及隐私
     """
-    if not VANNA_AVAILABLE:
-        return {
-            "success": False,
-            "error": "Vanna AI未安装"
-        }
-    
-    try:
-        adapter = get_vanna_mcp_adapter()
-        result = await adapter.generate_sql_with_preview(question, allow_llm_to_see_data)
-        return result
-        
-    except Exception as e:
-        logger.error(f"Vanna SQL生成失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await vanna_adapter.generate_sql_with_preview(question, allow_llm_to_see_data)
 
 
 @mcp.tool()
+@vanna_tool("Vanna问答失败")
 async def vanna_ask(
     question: str,
     auto_train: bool = True,
@@ -1583,44 +1557,29 @@ async def vanna_ask(
             visualize=True
         )
         
-    注意:
-        - 此工具会直接执行SQL，请确保模型已充分训练
-        - auto_train=True会持续改进模型
-        - visualize=True会生成Plotly图表
-    """
-    if not VANNA_AVAILABLE:
-        return {
-            "success": False,
-            "error": "Vanna AI未安装"
-        }
-    
-    try:
-        adapter = get_vanna_mcp_adapter()
-        # 只生成SQL，不执行（避免超时）
-        sql_result = await adapter.generate_sql_with_preview(question, allow_llm_to_see_data=True)
-        
-        if not sql_result.get('success'):
-            return sql_result
-        
-        sql = sql_result.get('generated_sql')
-        
-        return {
-            "success": True,
-            "question": question,
-            "generated_sql": sql,
-            "message": "SQL已生成。请使用execute_sql工具执行此SQL，记得设置confirmed=True",
-            "warning": "⚠️ 为避免超时，vanna_ask现在只生成SQL不执行。请检查SQL后使用execute_sql工具执行。"
-        }
-        
-    except Exception as e:
-        logger.error(f"Vanna问答失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    注意:
+        - 此工具会直接执行SQL，请确保模型已充分训练
+        - auto_train=True会持续改进模型
+        - visualize=True会生成Plotly图表
+    """
+    # 只生成SQL，不执行（避免超时）
+    sql_result = await vanna_adapter.generate_sql_with_preview(question, allow_llm_to_see_data=True)
+    
+    if not sql_result.get('success'):
+        return sql_result
+    
+    sql = sql_result.get('generated_sql')
+    
+    return {
+        "question": question,
+        "generated_sql": sql,
+        "message": "SQL已生成。请使用execute_sql工具执行此SQL，记得设置confirmed=True",
+        "warning": "⚠️ 为避免超时，vanna_ask现在只生成SQL不执行。请检查SQL后使用execute_sql工具执行。"
+    }
 
 
 @mcp.tool()
+@vanna_tool("获取训练数据失败")
 async def vanna_get_training_data() -> Dict[str, Any]:
     """
     获取Vanna模型的训练数据
@@ -1633,26 +1592,11 @@ async def vanna_get_training_data() -> Dict[str, Any]:
     示例:
         vanna_get_training_data()
     """
-    if not VANNA_AVAILABLE:
-        return {
-            "success": False,
-            "error": "Vanna AI未安装"
-        }
-    
-    try:
-        adapter = get_vanna_mcp_adapter()
-        result = await adapter.get_training_data()
-        return result
-        
-    except Exception as e:
-        logger.error(f"获取训练数据失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await vanna_adapter.get_training_data()
 
 
 @mcp.tool()
+@vanna_tool("删除训练数据失败")
 async def vanna_remove_training_data(id: str) -> Dict[str, Any]:
     """
     删除指定的训练数据
@@ -1668,26 +1612,11 @@ async def vanna_remove_training_data(id: str) -> Dict[str, Any]:
     示例:
         vanna_remove_training_data(id="training_123")
     """
-    if not VANNA_AVAILABLE:
-        return {
-            "success": False,
-            "error": "Vanna AI未安装"
-        }
-    
-    try:
-        adapter = get_vanna_mcp_adapter()
-        result = await adapter.remove_training_data(id)
-        return result
-        
-    except Exception as e:
-        logger.error(f"删除训练数据失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await vanna_adapter.remove_training_data(id)
 
 
 @mcp.tool()
+@vanna_tool("确认训练失败")
 async def vanna_confirm_training(session_id: str) -> Dict[str, Any]:
     """
     确认并执行训练
@@ -1703,26 +1632,11 @@ async def vanna_confirm_training(session_id: str) -> Dict[str, Any]:
     示例:
         vanna_confirm_training(session_id="training_1")
     """
-    if not VANNA_AVAILABLE:
-        return {
-            "success": False,
-            "error": "Vanna AI未安装"
-        }
-    
-    try:
-        adapter = get_vanna_mcp_adapter()
-        result = await adapter.confirm_training(session_id)
-        return result
-        
-    except Exception as e:
-        logger.error(f"确认训练失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await vanna_adapter.confirm_training(session_id)
 
 
 @mcp.tool()
+@vanna_tool("取消训练失败")
 async def vanna_cancel_training(session_id: str) -> Dict[str, Any]:
     """
     取消训练会话
@@ -1738,27 +1652,49 @@ async def vanna_cancel_training(session_id: str) -> Dict[str, Any]:
     示例:
         vanna_cancel_training(session_id="training_1")
     """
-    if not VANNA_AVAILABLE:
-        return {
-            "success": False,
-            "error": "Vanna AI未安装"
-        }
-    
-    try:
-        adapter = get_vanna_mcp_adapter()
-        result = await adapter.cancel_training(session_id)
-        return result
-        
-    except Exception as e:
-        logger.error(f"取消训练失败: {str(e)}")
-        return {
-            "success": False,
-            "error": str(e)
-        }
+    return await vanna_adapter.cancel_training(session_id)
+
+
+@mcp.tool()
+@vanna_tool("获取SQL缓存统计失败")
+async def vanna_cache_stats() -> Dict[str, Any]:
+    """
+    获取Vanna生成SQL缓存的统计信息
+
+    vanna_generate_sql 和 vanna_ask 对相同的问题复用上次生成的SQL，
+    措辞不同但语义相近的问题通过语义缓存复用，
+    确认训练或删除训练数据后缓存会被清空。
+
+    Returns:
+        命中数、未命中数、命中率和缓存条目数
+
+    示例:
+        vanna_cache_stats()
+    """
+    return {
+        **vanna_adapter.sql_cache.stats(),
+        "semantic": vanna_adapter.semantic_cache.stats()
+    }
 
 
 # ============= 资源(Resources) =============
 
+def _to_json(data: Any, indent: bool = True) -> str:
+    """
+    将资源数据序列化为 JSON 字符串，优先使用 orjson
+    
+    Args:
+        data: 要序列化的数据
+        indent: 是否缩进两格输出
+        
+    Returns:
+        JSON 字符串(非 ASCII 字符原样输出)
+    """
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(data, default=str, option=option).decode()
+    return json.dumps(data, indent=2 if indent else None, ensure_ascii=False, default=str)
+
 @mcp.resource("yukon://database/info")
 async def get_database_info() -> str:
     """
@@ -1768,9 +1704,10 @@ async def get_database_info() -> str:
         数据库信息的 JSON 字符串
     """
     try:
-        import json
-        result = await get_postgis_version()
-        extensions = await list_installed_extensions()
+        result, extensions = await asyncio.gather(
+            get_postgis_version(),
+            list_installed_extensions()
+        )
         
         info = {
             "database": db_config.database,
@@ -1779,10 +1716,26 @@ async def get_database_info() -> str:
             "postgis_version": result,
             "extensions": extensions
         }
-        return json.dumps(info, indent=2, ensure_ascii=False)
+        return _to_json(info)
     except Exception as e:
         logger.error(f"获取数据库信息失败: {str(e)}")
-        return json.dumps({"error": str(e)}, ensure_ascii=False)
+        return _to_json({"error": str(e)}, indent=False)
+
+
+@mcp.resource("yukon://database/health")
+async def get_database_health() -> str:
+    """
+    获取数据库健康状态和连接池统计资源
+    
+    Returns:
+        健康状态的 JSON 字符串
+    """
+    try:
+        health = await db_config.health_check()
+        return _to_json(health)
+    except Exception as e:
+        logger.error(f"获取数据库健康状态失败: {str(e)}")
+        return _to_json({"error": str(e)}, indent=False)
 
 
 @mcp.resource("yukon://database/{schema}")
@@ -1797,15 +1750,14 @@ async def get_database_schema(schema: str) -> str:
         表列表的 JSON 字符串
     """
     try:
-        import json
         tables = await list_spatial_tables(schema)
-        return json.dumps({
+        return _to_json({
             "schema": schema,
             "tables": tables
-        }, indent=2, ensure_ascii=False)
+        })
     except Exception as e:
         logger.error(f"获取表列表失败: {str(e)}")
-        return json.dumps({"error": str(e)}, ensure_ascii=False)
+        return _to_json({"error": str(e)}, indent=False)
 
 
 @mcp.resource("yukon://database/{schema}/{table_name}/info")
@@ -1821,12 +1773,11 @@ async def get_table_info_resource(schema: str, table_name: str) -> str:
         表信息的 JSON 字符串
     """
     try:
-        import json
         info = await get_table_spatial_info(table_name, schema)
-        return json.dumps(info, indent=2, ensure_ascii=False)
+        return _to_json(info)
     except Exception as e:
         logger.error(f"获取表信息失败: {str(e)}")
-        return json.dumps({"error": str(e)}, ensure_ascii=False)
+        return _to_json({"error": str(e)}, indent=False)
 
 
 @mcp.resource("yukon://database/{schema}/{table_name}/extent")
@@ -1842,13 +1793,12 @@ async def get_table_extent_resource(schema: str, table_name: str) -> str:
         空间范围的 JSON 字符串
     """
     try: 
-        import json
         # 默认使用 geom 作为几何列名
         extent = await get_spatial_extent(table_name, "geom", schema)
-        return json.dumps(extent, indent=2, ensure_ascii=False)
+        return _to_json(extent)
     except Exception as e:
         logger.error(f"获取空间范围失败: {str(e)}")
-        return json.dumps({"error": str(e)}, ensure_ascii=False)
+        return _to_json({"error": str(e)}, indent=False)
 
 
 @mcp.resource("yukon://formats/supported")
@@ -1860,12 +1810,11 @@ async def get_supported_formats_resource() -> str:
         支持格式的 JSON 字符串
     """
     try:
-        import json
         formats = await list_supported_formats()
-        return json.dumps(formats, indent=2, ensure_ascii=False)
+        return _to_json(formats)
     except Exception as e:
         logger.error(f"获取支持格式失败: {str(e)}")
-        return json.dumps({"error": str(e)}, ensure_ascii=False)
+        return _to_json({"error": str(e)}, indent=False)
 
 
 # ============= 提示(Prompts) =============
@@ -1900,15 +1849,24 @@ async def analyze_spatial_data_prompt(schema: str = "public", table_name: str =
                 }
             ]
         
-        info = await get_table_spatial_info(table_name, schema)
-        extent = await get_spatial_extent(table_name, info.get('geometry_columns', [{}])[0].get('column_name', 'geom'), schema)
+        # 先按默认几何列名 geom 与表信息并发查询空间范围，列名不同时再重新查询
+        info, extent = await asyncio.gather(
+            get_table_spatial_info(table_name, schema),
+            get_spatial_extent(table_name, "geom", schema),
+            return_exceptions=True
+        )
+        if isinstance(info, Exception):
+            raise info
+        geometry_column = info.get('geometry_columns', [{}])[0].get('column_name', 'geom')
+        if geometry_column != "geom" or isinstance(extent, Exception):
+            extent = await get_spatial_extent(table_name, geometry_column, schema)
         
         analysis_text = f"""请分析以下空间数据表的信息:
 
 表名: {schema}.{table_name}
 几何类型: {info.get('geometry_columns', [{}])[0].get('type', 'Unknown')}
 坐标系统: EPSG:{info.get('geometry_columns', [{}])[0].get('srid', 'Unknown')}
-要素数量: {info.get('row_count', 0)}
+要素数量(估计): {info.get('row_count_estimate') or 0}
 
 空间范围:
 - 最小X: {extent.get('bounds', [0,0,0,0])[0]}
@@ -1948,48 +1906,9 @@ async def analyze_spatial_data_prompt(schema: str = "public", table_name: str =
         ]
 
 
-@mcp.prompt(
-    name="import_data_guide",
-    title="数据导入指南",
-    description="提供数据导入的交互式指导"
-)
-async def import_data_guide_prompt(file_type: str = "") -> list:
-    """
-    生成数据导入指南提示
-    
-    Args:
-        file_type: 文件类型 (shapefile, geojson, geotiff, png)
-        
-    Returns:
-        消息列表
-    """
-    formats = await list_supported_formats()
-    
-    if not file_type:
-        format_text = "支持的矢量格式:\n"
-        for fmt_name, fmt_info in formats.get('vector_formats', {}).items():
-            format_text += f"- {fmt_info['description']} ({fmt_info['extension']})\n"
-        
-        format_text += "\n支持的栅格格式:\n"
-        for fmt_name, fmt_info in formats.get('raster_formats', {}).items():
-            format_text += f"- {fmt_info['description']} ({fmt_info['extension']})\n"
-        
-        return [
-            {
-                "role": "user",
-                "content": {
-                    "type": "text",
-                    "text": f"""PostGIS 数据导入指南
-
-{format_text}
-
-请告诉我您要导入哪种格式的数据，我会为您提供详细的导入步骤。"""
-                }
-            }
-        ]
-    
-    guides = {
-        "shapefile": """Shapefile 导入步骤:
+# 各格式的导入步骤说明(静态文本)
+_IMPORT_GUIDES = {
+    "shapefile": """Shapefile 导入步骤:
 
 1. 准备文件: 确保 .shp, .shx, .dbf, .prj 等文件都在同一目录
 2. 使用工具: import_shp
@@ -2009,7 +1928,7 @@ result = await import_shp(
     srid=4326
 )
 ```""",
-        "geojson": """GeoJSON 导入步骤:
+    "geojson": """GeoJSON 导入步骤:
 
 1. 准备文件或数据字符串
 2. 使用工具: import_geojson_file
@@ -2028,7 +1947,7 @@ result = await import_geojson_file(
     table_name="my_geojson_table"
 )
 ```""",
-        "geotiff": """GeoTIFF 导入步骤:
+    "geotiff": """GeoTIFF 导入步骤:
 
 1. 准备 GeoTIFF 文件 (带地理参考信息)
 2. 使用工具: import_tif
@@ -2046,7 +1965,7 @@ result = await import_tif(
     table_name="my_raster"
 )
 ```""",
-        "png": """PNG 导入步骤:
+    "png": """PNG 导入步骤:
 
 1. 准备 PNG 图像和地理边界信息
 2. 使用工具: import_png
@@ -2065,9 +1984,49 @@ result = await import_png(
     bounds=[120.0, 30.0, 121.0, 31.0]
 )
 ```"""
-    }
+}
+
+
+@mcp.prompt(
+    name="import_data_guide",
+    title="数据导入指南",
+    description="提供数据导入的交互式指导"
+)
+async def import_data_guide_prompt(file_type: str = "") -> list:
+    """
+    生成数据导入指南提示
+    
+    Args:
+        file_type: 文件类型 (shapefile, geojson, geotiff, png)
+        
+    Returns:
+        消息列表
+    """
+    if not file_type:
+        formats = await list_supported_formats()
+        format_text = "支持的矢量格式:\n"
+        for fmt_name, fmt_info in formats.get('vector_formats', {}).items():
+            format_text += f"- {fmt_info['description']} ({fmt_info['extension']})\n"
+        
+        format_text += "\n支持的栅格格式:\n"
+        for fmt_name, fmt_info in formats.get('raster_formats', {}).items():
+            format_text += f"- {fmt_info['description']} ({fmt_info['extension']})\n"
+        
+        return [
+            {
+                "role": "user",
+                "content": {
+                    "type": "text",
+                    "text": f"""PostGIS 数据导入指南
+
+{format_text}
+
+请告诉我您要导入哪种格式的数据，我会为您提供详细的导入步骤。"""
+                }
+            }
+        ]
     
-    guide_text = guides.get(file_type.lower(), f"不支持的文件类型: {file_type}")
+    guide_text = _IMPORT_GUIDES.get(file_type.lower(), f"不支持的文件类型: {file_type}")
     
     return [
         {
@@ -2080,23 +2039,9 @@ result = await import_png(
     ]
 
 
-@mcp.prompt(
-    name="spatial_query_builder",
-    title="空间查询构建器",
-    description="帮助构建复杂的空间查询"
-)
-async def spatial_query_builder_prompt(query_type: str = "") -> list:
-    """
-    生成空间查询构建提示
-    
-    Args:
-        query_type: 查询类型 (nearby, bbox, intersection, buffer)
-        
-    Returns:
-        消息列表
-    """
-    query_guides = {
-        "nearby": """附近查询 (Nearby Query)
+# 各查询类型的使用说明(静态文本)
+_QUERY_GUIDES = {
+    "nearby": """附近查询 (Nearby Query)
 
 查找指定位置附近的要素。
 
@@ -2123,7 +2068,7 @@ results = await query_nearby(
     table_name="restaurants"
 )
 ```""",
-        "bbox": """边界框查询 (Bounding Box Query)
+    "bbox": """边界框查询 (Bounding Box Query)
 
 查找在指定矩形区域内的所有要素。
 
@@ -2150,7 +2095,7 @@ results = await query_bbox(
     table_name="buildings"
 )
 ```""",
-        "intersection": """相交分析 (Intersection Analysis)
+    "intersection": """相交分析 (Intersection Analysis)
 
 检查两个几何对象是否相交，并获取相交部分。
 
@@ -2173,7 +2118,7 @@ result = await test_intersection(
     srid=4326
 )
 ```""",
-        "buffer": """缓冲区分析 (Buffer Analysis)
+    "buffer": """缓冲区分析 (Buffer Analysis)
 
 为几何对象创建指定距离的缓冲区。
 
@@ -2196,8 +2141,24 @@ result = await buffer_geometry(
     srid=4326
 )
 ```"""
-    }
+}
+
+
+@mcp.prompt(
+    name="spatial_query_builder",
+    title="空间查询构建器",
+    description="帮助构建复杂的空间查询"
+)
+async def spatial_query_builder_prompt(query_type: str = "") -> list:
+    """
+    生成空间查询构建提示
     
+    Args:
+        query_type: 查询类型 (nearby, bbox, intersection, buffer)
+        
+    Returns:
+        消息列表
+    """
     if not query_type:
         return [
             {
@@ -2216,7 +2177,7 @@ result = await buffer_geometry(
             }
         ]
     
-    guide = query_guides.get(query_type.lower(), f"不支持的查询类型: {query_type}")
+    guide = _QUERY_GUIDES.get(query_type.lower(), f"不支持的查询类型: {query_type}")
     
     return [
         {
@@ -2233,26 +2194,40 @@ result = await buffer_geometry(
 vanna_service_process: Optional[subprocess.Popen] = None
 
 
-def check_vanna_service_health(base_url: str = "http://localhost:5000", timeout: int = 5) -> bool:
+async def check_vanna_service_health(
+    session: aiohttp.ClientSession,
+    base_url: str = "http://localhost:5000"
+) -> bool:
     """
     检查Vanna服务健康状态
     
     Args:
+        session: HTTP 会话，启动轮询期间复用同一个 keep-alive 连接
         base_url: Vanna服务基础URL
-        timeout: 超时时间(秒)
         
     Returns:
         服务是否健康
     """
     try:
-        response = requests.get(f"{base_url}/health", timeout=timeout)
-        return response.status_code == 200 and response.json().get('status') == 'ok'
+        async with session.get(f"{base_url}/health") as response:
+            if response.status != 200:
+                return False
+            data = await response.json()
+            return data.get('status') == 'ok'
     except Exception as e:
         logger.debug(f"Vanna服务健康检查失败: {str(e)}")
         return False
 
 
-def start_vanna_service() -> bool:
+def _health_check_session() -> aiohttp.ClientSession:
+    """创建健康检查用的 HTTP 会话(单连接，5 秒超时)"""
+    return aiohttp.ClientSession(
+        timeout=aiohttp.ClientTimeout(total=5),
+        connector=aiohttp.TCPConnector(limit=1)
+    )
+
+
+async def start_vanna_service() -> bool:
     """
     启动Vanna服务
     
@@ -2268,9 +2243,10 @@ def start_vanna_service() -> bool:
         return True
     
     # 检查服务是否已运行
-    if check_vanna_service_health():
-        logger.info("检测到Vanna服务已运行")
-        return True
+    async with _health_check_session() as session:
+        if await check_vanna_service_health(session):
+            logger.info("检测到Vanna服务已运行")
+            return True
     
     # 获取Vanna服务脚本路径
     vanna_service_path = Path(__file__).parent / "vanna_server" / "vanna_service.py"
@@ -2282,23 +2258,34 @@ def start_vanna_service() -> bool:
     try:
         logger.info("正在启动Vanna服务...")
         
-        # 启动Vanna服务作为子进程
-        vanna_service_process = subprocess.Popen(
-            [sys.executable, str(vanna_service_path)],
-            stdout=subprocess.PIPE,
-            stderr=subprocess.PIPE,
-            text=True,
-            bufsize=1
-        )
-        
-        # 等待服务启动
+        # 启动Vanna服务作为子进程，输出写入日志文件(不使用管道，避免无人读取时写满缓冲区阻塞子进程)
+        log_path = Path(os.getenv('VANNA_SERVICE_LOG', str(project_root / "vanna_service.log")))
+        with open(log_path, "ab") as log_file:
+            vanna_service_process = subprocess.Popen(
+                [sys.executable, str(vanna_service_path)],
+                stdout=log_file,
+                stderr=subprocess.STDOUT,
+                close_fds=True
+            )
+        logger.info(f"Vanna服务日志: {log_path}")
+        
+        # 等待服务启动: 轮询间隔从 0.1 秒按指数退避增长到 2 秒，子进程退出时立即失败
         max_wait = 30
-        wait_interval = 1
-        for i in range(max_wait):
-            if check_vanna_service_health():
-                logger.info(f"✓ Vanna服务启动成功 (耗时 {i+1}秒)")
-                return True
-            time.sleep(wait_interval)
+        wait_interval = 0.1
+        loop = asyncio.get_running_loop()
+        started = loop.time()
+        async with _health_check_session() as session:
+            while loop.time() - started < max_wait:
+                if await check_vanna_service_health(session):
+                    logger.info(f"✓ Vanna服务启动成功 (耗时 {loop.time() - started:.1f}秒)")
+                    return True
+                if vanna_service_process.poll() is not None:
+                    logger.error(
+                        f"Vanna服务进程已退出(退出码 {vanna_service_process.returncode})"
+                    )
+                    return False
+                await asyncio.sleep(wait_interval)
+                wait_interval = min(wait_interval * 1.6, 2.0)
         
         logger.error(f"Vanna服务启动超时({max_wait}秒)")
         return False
@@ -2325,44 +2312,122 @@ def stop_vanna_service():
             logger.error(f"停止Vanna服务失败: {str(e)}")
 
 
-def main():
-    """启动 MCP 服务器"""
-    import sys
-    
-    # 对于MCP客户端(如Cherry Studio)，不要输出日志到stdout
-    # 因为stdout用于MCP协议通信
-    if len(sys.argv) > 1 and sys.argv[1] == "--stdio":
-        # 禁用控制台日志输出，只记录到文件
-        for handler in logging.root.handlers[:]:
-            if isinstance(handler, logging.StreamHandler):
-                logging.root.removeHandler(handler)
-    
-    logger.info("启动 PostGIS MCP 服务器...")
+async def probe_async_pool() -> bool:
+    """
+    使用临时 asyncpg 连接池测试数据库连接，测试结束后关闭该连接池
     
-    # 启动Vanna服务(如果启用)
+    Returns:
+        连接是否成功
+    """
+    try:
+        await db_config.get_async_pool(min_conn=1, max_conn=1)
+        return await db_config.async_test_connection()
+    finally:
+        await db_config.close_async_pool()
+
+
+async def _start_vanna():
+    """启动Vanna服务(如果启用)，失败时只记录日志"""
     try:
-        if not start_vanna_service():
+        if not await start_vanna_service():
             logger.warning("Vanna服务启动失败，但MCP服务器将继续启动")
     except Exception as e:
         logger.error(f"启动Vanna服务时发生错误: {str(e)}")
-    
-    # 初始化数据库连接池
+
+
+async def _check_database():
+    """初始化并测试数据库连接，失败时只记录日志"""
     try:
         logger.info("正在初始化数据库连接...")
-        db_config.initialize_pool()
+        if db_config.use_asyncpg:
+            # asyncpg 连接池绑定事件循环，在 MCP 事件循环中首次使用时再创建
+            connected = await probe_async_pool()
+        else:
+            await asyncio.to_thread(db_config.initialize_pool)
+            connected = await asyncio.to_thread(db_config.test_connection)
         
         # 测试数据库连接
-        if db_config.test_connection():
+        if connected:
             logger.info("数据库连接成功!")
         else:
             logger.warning("数据库连接测试失败，但服务器将继续启动")
     except Exception as e:
         logger.error(f"初始化数据库连接失败: {str(e)}")
         logger.warning("服务器将在没有数据库连接的情况下启动")
+
+
+async def startup_services():
+    """并发启动 Vanna 服务并检查数据库连接"""
+    await asyncio.gather(_start_vanna(), _check_database())
+
+
+# streamable HTTP 传输的 ASGI 应用，多进程部署时由 uvicorn 在每个 worker 中导入:
+#   uvicorn src.server:app --workers 4
+app = mcp.streamable_http_app()
+_session_manager_lifespan = app.router.lifespan_context
+
+
+@asynccontextmanager
+async def _http_app_lifespan(starlette_app) -> AsyncIterator[None]:
+    """HTTP 应用生命周期: 在会话管理器之外持有共享资源，直到 worker 退出"""
+    async with shared_resources():
+        async with _session_manager_lifespan(starlette_app):
+            yield
+
+
+app.router.lifespan_context = _http_app_lifespan
+
+
+def run_http_workers():
+    """
+    以 streamable HTTP 传输启动多个 uvicorn worker 进程
+    
+    单进程时 CPU 密集的工具(WKT 解析、GeoJSON 序列化、shapely 运算)会阻塞整个事件循环，
+    多 worker 可随 CPU 核数扩展。每个 worker 各自持有连接池，
+    worker 较多时建议配置 POSTGIS_PGBOUNCER_HOST 通过 PgBouncer 复用数据库连接
+    """
+    import uvicorn
+    
+    workers = int(os.getenv("MCP_WORKERS", str(os.cpu_count() or 1)))
+    try:
+        import uvloop  # noqa: F401
+        loop = "uvloop"
+    except ImportError:
+        loop = "auto"
+    
+    logger.info(f"以 HTTP 模式启动 {workers} 个 worker")
+    uvicorn.run(
+        "src.server:app",
+        host=os.getenv("MCP_HOST", "0.0.0.0"),
+        port=int(os.getenv("MCP_PORT", "8000")),
+        workers=workers,
+        loop=loop
+    )
+
+
+def main():
+    """启动 MCP 服务器"""
+    import sys
+    
+    # 对于MCP客户端(如Cherry Studio)，不要输出日志到stdout
+    # 因为stdout用于MCP协议通信
+    if len(sys.argv) > 1 and sys.argv[1] == "--stdio":
+        # 禁用控制台日志输出，只记录到文件
+        for handler in logging.root.handlers[:]:
+            if isinstance(handler, logging.StreamHandler):
+                logging.root.removeHandler(handler)
     
-    # 启动 MCP 服务器 - 使用stdio传输
+    logger.info("启动 PostGIS MCP 服务器...")
+    
+    # Vanna 服务启动和数据库连接检查互不依赖，并发进行
+    asyncio.run(startup_services())
+    
+    # 启动 MCP 服务器 - 默认使用stdio传输，--http 时使用多进程 HTTP 传输
     try:
-        mcp.run(transport='stdio')
+        if "--http" in sys.argv:
+            run_http_workers()
+        else:
+            mcp.run(transport='stdio')
     finally:
         # 停止Vanna服务
         stop_vanna_service()
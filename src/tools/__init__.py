@@ -11,7 +11,8 @@ from .geometry import (
     calculate_area,
     calculate_length,
     transform_geometry,
-    simplify_geometry
+    simplify_geometry,
+    batch_geometry_ops
 )
 from .analysis import (
     calculate_distance,
@@ -26,15 +27,21 @@ from .admin import (
     list_spatial_tables,
     get_table_spatial_info,
     create_spatial_index,
+    create_spatial_indexes,
+    recommend_index_type,
     analyze_table,
     vacuum_table,
+    get_maintenance_status,
+    subdivide_table,
     get_spatial_extent,
-    check_geometry_validity
+    check_geometry_validity,
+    get_table_overview
 )
 from .advanced import (
     spatial_join,
     nearest_neighbor,
     spatial_cluster,
+    iter_spatial_clusters,
     convex_hull,
     voronoi_polygons,
     line_interpolate,
@@ -60,6 +67,7 @@ __all__ = [
     "calculate_length",
     "transform_geometry",
     "simplify_geometry",
+    "batch_geometry_ops",
     # 空间分析
     "calculate_distance",
     "check_intersection",
@@ -72,14 +80,20 @@ __all__ = [
     "list_spatial_tables",
     "get_table_spatial_info",
     "create_spatial_index",
+    "create_spatial_indexes",
+    "recommend_index_type",
     "analyze_table",
     "vacuum_table",
+    "get_maintenance_status",
+    "subdivide_table",
     "get_spatial_extent",
     "check_geometry_validity",
+    "get_table_overview",
     # 高级分析
     "spatial_join",
     "nearest_neighbor",
     "spatial_cluster",
+    "iter_spatial_clusters",
     "convex_hull",
     "voronoi_polygons",
     "line_interpolate",
@@ -3,31 +3,143 @@ PostGIS 扩展管理和数据库管理工具模块
 提供 PostGIS 扩展管理、空间表发现和索引管理功能
 """
 from typing import Dict, List, Any, Optional
-import asyncpg
+from functools import lru_cache
+import asyncio
 import logging
+import os
+import time
+import uuid
 
 from ..config import db_config
+from .cache import catalog_cache
+from .spatial_query import fetch_json_statement
+from .srid import geography_srid
+from .validation import quote_ident, quote_literal, qualified_name
 
 logger = logging.getLogger(__name__)
 
+db_config.register_statement("postgis_version", """
+    SELECT 
+        PostGIS_Version() as postgis_version,
+        PostGIS_Full_Version() as full_version,
+        PostGIS_GEOS_Version() as geos_version,
+        PostGIS_Proj_Version() as proj_version,
+        PostGIS_Lib_Version() as lib_version
+""")
+# 列表类查询在数据库端聚合为 JSON 数组，客户端不再逐行构造 Record 和 dict
+db_config.register_statement("installed_extensions", """
+    SELECT coalesce(json_agg(json_build_object(
+        'name', name,
+        'default_version', default_version,
+        'installed_version', installed_version,
+        'comment', comment
+    ) ORDER BY name), '[]'::json)
+    FROM pg_available_extensions
+    WHERE installed_version IS NOT NULL
+        AND (
+            name ILIKE '%postgis%'
+            OR name ILIKE '%gis%'
+            OR comment ILIKE '%GaussDB%'
+            OR installed_version ILIKE '%GaussDB%'
+        )
+""")
+db_config.register_statement("spatial_tables", """
+    SELECT coalesce(json_agg(json_build_object(
+        'schema', f_table_schema,
+        'table', f_table_name,
+        'geometry_column', f_geometry_column,
+        'dimension', coord_dimension,
+        'srid', srid,
+        'geometry_type', type
+    ) ORDER BY f_table_name, f_geometry_column), '[]'::json)
+    FROM geometry_columns
+    WHERE f_table_schema = $1
+""")
+# 获取几何列信息
+db_config.register_statement("table_geometry_columns", """
+    SELECT 
+        f_geometry_column,
+        coord_dimension,
+        srid,
+        type as geometry_type
+    FROM geometry_columns
+    WHERE f_table_schema = $1 AND f_table_name = $2
+""")
+# 获取表统计信息；行数取 ANALYZE 维护的 reltuples 估计值，避免 COUNT(*) 全表扫描
+db_config.register_statement("table_stats", """
+    SELECT 
+        c.reltuples::bigint as row_count_estimate,
+        pg_size_pretty(pg_total_relation_size(c.oid)) as total_size
+    FROM pg_class c
+    JOIN pg_namespace n ON n.oid = c.relnamespace
+    WHERE n.nspname = $1 AND c.relname = $2
+""")
+# 获取索引信息
+db_config.register_statement("table_indexes", """
+    SELECT 
+        indexname,
+        indexdef
+    FROM pg_indexes
+    WHERE schemaname = $1 AND tablename = $2
+""")
+db_config.register_statement("geometry_type", """
+    SELECT type
+    FROM geometry_columns
+    WHERE f_table_schema = $1 AND f_table_name = $2 AND f_geometry_column = $3
+""")
+# 由统计信息估计空间范围和行数，不扫描表；表未 ANALYZE 时 extent 为 NULL
+db_config.register_statement("estimated_extent", """
+    SELECT 
+        ST_AsText(e) as extent,
+        ST_XMin(e) as min_x,
+        ST_YMin(e) as min_y,
+        ST_XMax(e) as max_x,
+        ST_YMax(e) as max_y,
+        (
+            SELECT c.reltuples::bigint
+            FROM pg_class c
+            JOIN pg_namespace n ON n.oid = c.relnamespace
+            WHERE n.nspname = $1 AND c.relname = $2
+        ) as feature_count
+    FROM ST_EstimatedExtent($1, $2, $3) AS e
+""")
+db_config.register_statement("index_exists", """
+    SELECT COUNT(*) as count
+    FROM pg_indexes
+    WHERE schemaname = $1 AND tablename = $2 AND indexname = $3
+""")
+# 按列查找同一访问方法的单列、非部分索引(无论名称)，避免重复建立相同的空间索引
+db_config.register_statement("column_index", """
+    SELECT i.relname
+    FROM pg_index x
+    JOIN pg_class i ON i.oid = x.indexrelid
+    JOIN pg_class t ON t.oid = x.indrelid
+    JOIN pg_namespace n ON n.oid = t.relnamespace
+    JOIN pg_am am ON am.oid = i.relam
+    JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = x.indkey[0]
+    WHERE n.nspname = $1 AND t.relname = $2 AND a.attname = $3 AND am.amname = $4
+      AND x.indnatts = 1 AND x.indpred IS NULL
+    LIMIT 1
+""")
+
 
-async def get_db_connection() -> asyncpg.Connection:
+async def _pool_statement(method: str, name: str, *args):
     """
-    获取数据库连接
+    从连接池借出独立连接执行一条预编译模板，便于多条互不依赖的查询并发执行
     
+    Args:
+        method: fetch / fetchrow / fetchval
+        name: register_statement 登记的模板名称
+        *args: 查询参数
+        
     Returns:
-        数据库连接对象
-    """
-    conn = await asyncpg.connect(
-        host=db_config.host,
-        port=db_config.port,
-        database=db_config.database,
-        user=db_config.user,
-        password=db_config.password
-    )
-    return conn
+        查询结果
+    """
+    async with db_config.acquire() as conn:
+        return await db_config.run_statement(conn, name, *args, method=method)
 
 
+@catalog_cache.cached
 async def get_postgis_version() -> Dict[str, Any]:
     """
     获取 PostGIS 版本信息
@@ -35,37 +147,21 @@ async def get_postgis_version() -> Dict[str, Any]:
     Returns:
         包含版本信息的字典
     """
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT 
-                PostGIS_Version() as postgis_version,
-                PostGIS_Full_Version() as full_version,
-                PostGIS_GEOS_Version() as geos_version,
-                PostGIS_Proj_Version() as proj_version,
-                PostGIS_Lib_Version() as lib_version
-        """
-        
-        row = await conn.fetchrow(query)
-        
-        result = {
-            "postgis_version": row["postgis_version"],
-            "full_version": row["full_version"],
-            "geos_version": row["geos_version"],
-            "proj_version": row["proj_version"],
-            "lib_version": row["lib_version"]
-        }
-        
-        logger.info(f"PostGIS 版本: {result['postgis_version']}")
-        return result
-        
-    except Exception as e:
-        logger.error(f"获取 PostGIS 版本失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    async with db_config.acquire() as conn:
+        try:
+            row = await db_config.run_statement(conn, "postgis_version", method="fetchrow")
+            
+            result = dict(row)
+            
+            logger.info(f"PostGIS 版本: {result['postgis_version']}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"获取 PostGIS 版本失败: {str(e)}")
+            raise
 
 
+@catalog_cache.cached
 async def list_installed_extensions() -> List[Dict[str, Any]]:
     """
     列出已安装的 PostGIS 相关扩展
@@ -73,46 +169,19 @@ async def list_installed_extensions() -> List[Dict[str, Any]]:
     Returns:
         已安装的 PostGIS 相关扩展列表
     """
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT
-                name,
-                default_version,
-                installed_version,
-                comment
-            FROM pg_available_extensions
-            WHERE installed_version IS NOT NULL
-                AND (
-                    name ILIKE '%postgis%'
-                    OR name ILIKE '%gis%'
-                    OR comment ILIKE '%GaussDB%'
-                    OR installed_version ILIKE '%GaussDB%'
-                )
-            ORDER BY name
-        """
-        
-        rows = await conn.fetch(query)
-        
-        results = []
-        for row in rows:
-            results.append({
-                "name": row["name"],
-                "default_version": row["default_version"],
-                "installed_version": row["installed_version"],
-                "comment": row["comment"]
-            })
-        
-        logger.info(f"找到 {len(results)} 个 PostGIS 相关扩展")
-        return results
-        
-    except Exception as e:
-        logger.error(f"列出已安装扩展失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    async with db_config.acquire() as conn:
+        try:
+            results = await fetch_json_statement(conn, "installed_extensions")
+            
+            logger.info(f"找到 {len(results)} 个 PostGIS 相关扩展")
+            return results
+            
+        except Exception as e:
+            logger.error(f"列出已安装扩展失败: {str(e)}")
+            raise
 
 
+@catalog_cache.cached
 async def list_spatial_tables(schema: str = "public") -> List[Dict[str, Any]]:
     """
     列出包含空间字段的表
@@ -123,47 +192,29 @@ async def list_spatial_tables(schema: str = "public") -> List[Dict[str, Any]]:
     Returns:
         包含空间字段的表列表
     """
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT 
-                f_table_schema as schema_name,
-                f_table_name as table_name,
-                f_geometry_column as geometry_column,
-                coord_dimension as dimension,
-                srid,
-                type as geometry_type
-            FROM geometry_columns
-            WHERE f_table_schema = $1
-            ORDER BY f_table_name, f_geometry_column
-        """
-        
-        rows = await conn.fetch(query, schema)
-        
-        results = []
-        for row in rows:
-            results.append({
-                "schema": row["schema_name"],
-                "table": row["table_name"],
-                "geometry_column": row["geometry_column"],
-                "dimension": row["dimension"],
-                "srid": row["srid"],
-                "geometry_type": row["geometry_type"]
-            })
-        
-        logger.info(f"在 {schema} 模式中找到 {len(results)} 个空间表")
-        return results
-        
-    except Exception as e:
-        logger.error(f"列出空间表失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    async with db_config.acquire() as conn:
+        try:
+            results = await fetch_json_statement(conn, "spatial_tables", schema)
+            
+            logger.info(f"在 {schema} 模式中找到 {len(results)} 个空间表")
+            return results
+            
+        except Exception as e:
+            logger.error(f"列出空间表失败: {str(e)}")
+            raise
 
 
+async def _count_rows(table_name: str, schema: str) -> int:
+    """精确统计表的行数(全表扫描)"""
+    async with db_config.acquire() as conn:
+        return await conn.fetchval(f"SELECT COUNT(*) FROM {qualified_name(schema, table_name)}")
+
+
+@catalog_cache.cached
 async def get_table_spatial_info(
     table_name: str,
-    schema: str = "public"
+    schema: str = "public",
+    exact: bool = False
 ) -> Dict[str, Any]:
     """
     获取表的详细空间信息
@@ -171,49 +222,31 @@ async def get_table_spatial_info(
     Args:
         table_name: 表名
         schema: 模式名，默认为 'public'
+        exact: 是否用 COUNT(*) 精确统计行数；默认只返回 pg_class.reltuples 估计值
+               (由 ANALYZE 更新，从未分析过的表为 None)
         
     Returns:
         包含表空间信息的字典
     """
-    conn = await get_db_connection()
     try:
-        # 获取几何列信息
-        geom_query = """
-            SELECT 
-                f_geometry_column,
-                coord_dimension,
-                srid,
-                type as geometry_type
-            FROM geometry_columns
-            WHERE f_table_schema = $1 AND f_table_name = $2
-        """
-        
-        geom_rows = await conn.fetch(geom_query, schema, table_name)
-        
-        # 获取表统计信息
-        stats_query = f"""
-            SELECT 
-                COUNT(*) as row_count,
-                pg_size_pretty(pg_total_relation_size($1 || '.' || $2)) as total_size
-        """
-        
-        stats_row = await conn.fetchrow(stats_query, schema, table_name)
-        
-        # 获取索引信息
-        index_query = """
-            SELECT 
-                indexname,
-                indexdef
-            FROM pg_indexes
-            WHERE schemaname = $1 AND tablename = $2
-        """
-        
-        index_rows = await conn.fetch(index_query, schema, table_name)
+        # 查询互不依赖，各自借出连接并发执行
+        queries = [
+            _pool_statement("fetch", "table_geometry_columns", schema, table_name),
+            _pool_statement("fetchrow", "table_stats", schema, table_name),
+            _pool_statement("fetch", "table_indexes", schema, table_name)
+        ]
+        if exact:
+            queries.append(_count_rows(table_name, schema))
+        geom_rows, stats_row, index_rows, *row_count = await asyncio.gather(*queries)
+        
+        if stats_row is None:
+            raise ValueError(f"表不存在: {schema}.{table_name}")
+        estimate = stats_row["row_count_estimate"]
         
         result = {
             "schema": schema,
             "table": table_name,
-            "row_count": stats_row["row_count"],
+            "row_count_estimate": estimate if estimate >= 0 else None,
             "total_size": stats_row["total_size"],
             "geometry_columns": [dict(row) for row in geom_rows],
             "indexes": [
@@ -224,6 +257,8 @@ async def get_table_spatial_info(
                 for row in index_rows
             ]
         }
+        if exact:
+            result["row_count"] = row_count[0]
         
         logger.info(f"获取表 {schema}.{table_name} 的空间信息")
         return result
@@ -231,72 +266,421 @@ async def get_table_spatial_info(
     except Exception as e:
         logger.error(f"获取表空间信息失败: {str(e)}")
         raise
-    finally:
-        await conn.close()
+
+
+# 支持的空间索引访问方法
+_INDEX_TYPES = ("gist", "spgist", "brin")
+# 这些几何类型的对象之间重叠少，SP-GiST 的空间划分比 GiST 的 R 树构建更快、体积更小，
+# 点查询和点在面内查询也更快；但 SP-GiST 不支持 <-> KNN 排序
+_SPGIST_GEOMETRY_TYPES = frozenset(("POINT", "MULTIPOINT", "POLYGON", "MULTIPOLYGON"))
+
+
+# 部分索引条件允许的比较运算符
+_PARTIAL_INDEX_OPERATORS = frozenset(("=", "<>", "!=", "<", "<=", ">", ">=", "IN"))
+_PARTIAL_INDEX_NULL_OPERATORS = frozenset(("IS NULL", "IS NOT NULL"))
+
+
+def _partial_index_predicate(conditions: List[Dict[str, Any]]) -> str:
+    """
+    由结构化条件生成部分索引的 WHERE 子句
+    
+    CREATE INDEX 不接受绑定参数，列名经 quote_ident 引用、运算符限定在白名单内、
+    值按字面量转义，不直接拼接调用方提供的 SQL 片段
+    
+    Args:
+        conditions: 条件列表(AND 连接)，每项形如 {"column": "status", "op": "=", "value": "active"}；
+                    op 为 IS NULL / IS NOT NULL 时不需要 value，为 IN 时 value 为列表
+        
+    Returns:
+        WHERE 子句
+        
+    Raises:
+        ValueError: 条件格式错误或运算符不受支持
+    """
+    if isinstance(conditions, dict):
+        conditions = [conditions]
+    clauses = []
+    for condition in conditions:
+        if not isinstance(condition, dict) or "column" not in condition:
+            raise ValueError(f"无效的部分索引条件: {condition!r}")
+        column = quote_ident(condition["column"])
+        op = str(condition.get("op", "=")).upper().strip()
+        if op in _PARTIAL_INDEX_NULL_OPERATORS:
+            clauses.append(f"{column} {op}")
+        elif op == "IN":
+            values = condition.get("value")
+            if not isinstance(values, (list, tuple)) or not values:
+                raise ValueError("IN 条件的 value 必须是非空列表")
+            clauses.append(f"{column} IN ({', '.join(quote_literal(v) for v in values)})")
+        elif op in _PARTIAL_INDEX_OPERATORS:
+            if condition.get("value") is None:
+                raise ValueError(f"{op} 条件缺少 value，判断空值请使用 IS NULL")
+            clauses.append(f"{column} {op} {quote_literal(condition['value'])}")
+        else:
+            raise ValueError(f"不支持的部分索引运算符: {op}")
+    return "WHERE " + " AND ".join(clauses) if clauses else ""
+
+
+async def recommend_index_type(
+    table_name: str,
+    geometry_column: str = "geom",
+    schema: str = "public",
+    knn: bool = True
+) -> str:
+    """
+    根据几何列类型和查询负载推荐空间索引类型
+    
+    需要 KNN 排序(nearest_neighbor 等使用的 <->)时总是使用 GiST；
+    明确不需要 KNN 时，点和(多)面表推荐 SP-GiST，其他类型仍使用 GiST
+    
+    Args:
+        table_name: 表名
+        geometry_column: 几何列名
+        schema: 模式名
+        knn: 是否需要 KNN 最近邻排序
+        
+    Returns:
+        'spgist' 或 'gist'
+    """
+    if knn:
+        return "gist"
+    async with db_config.acquire() as conn:
+        geometry_type = await db_config.run_statement(
+            conn, "geometry_type", schema, table_name, geometry_column, method="fetchval"
+        )
+    if geometry_type is not None and geometry_type.upper() in _SPGIST_GEOMETRY_TYPES:
+        return "spgist"
+    return "gist"
 
 
 async def create_spatial_index(
     table_name: str,
     geometry_column: str = "geom",
     schema: str = "public",
-    index_name: Optional[str] = None
+    index_name: Optional[str] = None,
+    index_type: Optional[str] = None,
+    extra_columns: Optional[List[str]] = None,
+    partial_where: Optional[List[Dict[str, Any]]] = None,
+    concurrently: bool = False,
+    knn: bool = True,
+    geography_index: bool = False
 ) -> Dict[str, Any]:
     """
-    为空间列创建 GIST 索引
+    为空间列创建空间索引
     
     Args:
         table_name: 表名
         geometry_column: 几何列名，默认为 'geom'
         schema: 模式名，默认为 'public'
         index_name: 索引名称，如果不提供则自动生成
+        index_type: 索引类型 gist / spgist / brin，不提供时由 recommend_index_type 选择:
+                    默认 gist；knn=False 时点、面表使用 spgist。
+                    按写入时间顺序追加、只做外包框查询的大表可使用 brin
+        extra_columns: 与几何列组成复合索引的前导列(如分类字段)，
+                       GiST 复合索引中的普通类型列需要 btree_gist 扩展
+        partial_where: 部分索引条件列表(AND 连接)，只为满足条件的行建立索引，
+                       每项形如 {"column": "status", "op": "=", "value": "active"}
+        concurrently: 是否使用 CREATE INDEX CONCURRENTLY(建索引期间不阻塞写入)
+        knn: 是否需要 KNN 最近邻查询；为 False 且未指定 index_type 时点、面表使用 SP-GiST
+        geography_index: 几何列为地理坐标系时，是否额外创建 GIST ((geom::geography)) 表达式索引，
+                         供 find_nearest 等按米计算距离的查询使用(带 partial_where 时使用相同条件)
         
     Returns:
         包含索引创建信息的字典
     """
-    conn = await get_db_connection()
-    try:
-        # 生成索引名称
-        if index_name is None:
-            index_name = f"idx_{table_name}_{geometry_column}_gist"
-        
-        # 检查索引是否已存在
-        check_query = """
-            SELECT COUNT(*) as count
-            FROM pg_indexes
-            WHERE schemaname = $1 AND tablename = $2 AND indexname = $3
-        """
-        
-        check_row = await conn.fetchrow(check_query, schema, table_name, index_name)
+    column = quote_ident(geometry_column)
+    columns = [quote_ident(name) for name in extra_columns or []] + [column]
+    if index_type is None:
+        # SP-GiST 不支持多列索引
+        index_type = (
+            "gist" if extra_columns
+            else await recommend_index_type(table_name, geometry_column, schema, knn)
+        )
+    index_type = index_type.lower()
+    if index_type not in _INDEX_TYPES:
+        raise ValueError(f"不支持的索引类型: {index_type}，可选: {', '.join(_INDEX_TYPES)}")
+    if index_type == "spgist" and extra_columns:
+        raise ValueError("SP-GiST 索引不支持多列，请使用 gist 或 brin")
+    where = _partial_index_predicate(partial_where) if partial_where else ""
+    concurrent = "CONCURRENTLY" if concurrently else ""
+    
+    async with db_config.acquire() as conn:
+        try:
+            # 生成索引名称
+            if index_name is None:
+                index_name = f"idx_{table_name}_{geometry_column}_{index_type}"
+            
+            # 检查索引是否已存在
+            check_row = await db_config.run_statement(
+                conn, "index_exists", schema, table_name, index_name, method="fetchrow"
+            )
+            
+            if check_row["count"] > 0:
+                return {
+                    "success": False,
+                    "message": f"索引 {index_name} 已存在"
+                }
+            
+            # 同一列上已有相同类型的普通空间索引(如旧版本或导入时按其他名称创建的)
+            if not extra_columns and not partial_where:
+                existing = await db_config.run_statement(
+                    conn, "column_index", schema, table_name, geometry_column, index_type,
+                    method="fetchval"
+                )
+                if existing is not None:
+                    return {
+                        "success": False,
+                        "index_name": existing,
+                        "message": f"列 {geometry_column} 上已有 {index_type} 索引 {existing}"
+                    }
+            
+            # 创建索引
+            create_query = f"""
+                CREATE INDEX {concurrent} {quote_ident(index_name)}
+                ON {qualified_name(schema, table_name)}
+                USING {index_type.upper()} ({", ".join(columns)})
+                {where}
+            """
+            
+            # 大表建索引可能远超连接池默认的 60 秒命令超时
+            await conn.execute(create_query, timeout=db_config.bulk_timeout)
+            
+            logger.info(f"成功创建空间索引: {schema}.{table_name}.{index_name} ({index_type})")
+            
+            result = {
+                "success": True,
+                "index_name": index_name,
+                "index_type": index_type,
+                "table": f"{schema}.{table_name}",
+                "column": geometry_column,
+                "extra_columns": extra_columns or [],
+                "partial_where": partial_where
+            }
+            
+            if not geography_index:
+                return result
+            
+            # 地理坐标系几何列额外创建 geography 表达式索引，供 ST_DWithin(geom::geography, ...) 使用
+            srid = await conn.fetchval(
+                """
+                    SELECT srid
+                    FROM geometry_columns
+                    WHERE f_table_schema = $1 AND f_table_name = $2 AND f_geometry_column = $3
+                """,
+                schema, table_name, geometry_column
+            )
+            if srid is not None and await geography_srid(srid) == srid:
+                geog_index_name = f"{index_name}_geog"
+                await conn.execute(f"""
+                    CREATE INDEX {concurrent} IF NOT EXISTS {quote_ident(geog_index_name)}
+                    ON {qualified_name(schema, table_name)}
+                    USING GIST (({column}::geography))
+                    {where}
+                """, timeout=db_config.bulk_timeout)
+                logger.info(f"成功创建 geography 表达式索引: {schema}.{table_name}.{geog_index_name}")
+                result["geography_index_name"] = geog_index_name
+            
+            return result
+            
+        except Exception as e:
+            logger.error(f"创建空间索引失败: {str(e)}")
+            raise
+
+
+async def create_spatial_indexes(
+    specs: List[Dict[str, Any]],
+    concurrently: bool = True
+) -> List[Dict[str, Any]]:
+    """
+    批量创建空间索引
+    
+    每个索引在各自借出的连接上并发创建(PostgreSQL 可同时构建多个索引)，
+    默认使用 CREATE INDEX CONCURRENTLY，建索引期间不阻塞对表的写入
+    
+    Args:
+        specs: 索引定义列表，每项包含 table_name，可选 geometry_column、schema、
+               index_name、index_type、extra_columns、partial_where、knn、geography_index，
+               含义同 create_spatial_index
+        concurrently: 是否使用 CREATE INDEX CONCURRENTLY
         
-        if check_row["count"] > 0:
+    Returns:
+        与 specs 一一对应的结果列表，失败的项包含 error
+    """
+    async def create_one(spec: Dict[str, Any]) -> Dict[str, Any]:
+        try:
+            return await create_spatial_index(**spec, concurrently=concurrently)
+        except Exception as e:
             return {
                 "success": False,
-                "message": f"索引 {index_name} 已存在"
+                "table": f"{spec.get('schema', 'public')}.{spec.get('table_name')}",
+                "error": str(e)
             }
+    
+    results = await asyncio.gather(*[create_one(spec) for spec in specs])
+    
+    logger.info(
+        f"批量创建空间索引: {sum(1 for r in results if r.get('success'))}/{len(specs)} 成功"
+    )
+    return results
+
+
+def subdivided_table_name(table_name: str) -> str:
+    """subdivide_table 生成的拆分表名"""
+    return f"{table_name}_subdiv"
+
+
+async def subdivide_table(
+    table_name: str,
+    geometry_column: str = "geom",
+    schema: str = "public",
+    id_column: str = "id",
+    max_vertices: int = 256
+) -> Dict[str, Any]:
+    """
+    用 ST_Subdivide 将大而复杂的几何拆分到辅助表并建立 GiST 索引
+    
+    大多边形的外包框很松，索引筛选出的候选过多；拆分后每块的外包框紧凑，
+    spatial_join(use_subdivided=True) 可先与拆分表连接再按 source_id 去重。
+    辅助表名为 <table>_subdiv，已存在时重建，源表数据变化后需重新执行
+    
+    Args:
+        table_name: 表名
+        geometry_column: 几何列名
+        schema: 模式名
+        id_column: 源表主键列，写入拆分表的 source_id
+        max_vertices: 每块的最大顶点数(不小于 5)
         
-        # 创建索引
-        create_query = f"""
-            CREATE INDEX {index_name}
-            ON {schema}.{table_name}
-            USING GIST ({geometry_column})
-        """
-        
-        await conn.execute(create_query)
-        
-        logger.info(f"成功创建空间索引: {schema}.{table_name}.{index_name}")
-        
-        return {
-            "success": True,
-            "index_name": index_name,
-            "table": f"{schema}.{table_name}",
-            "column": geometry_column
-        }
-        
+    Returns:
+        拆分结果字典
+    """
+    max_vertices = int(max_vertices)
+    if max_vertices < 5:
+        raise ValueError(f"max_vertices 不能小于 5: {max_vertices}")
+    column = quote_ident(geometry_column)
+    target_name = subdivided_table_name(table_name)
+    target = qualified_name(schema, target_name)
+    
+    async with db_config.acquire() as conn:
+        try:
+            async with conn.transaction():
+                await conn.execute(f"DROP TABLE IF EXISTS {target}")
+                # CREATE TABLE AS 不支持绑定参数，max_vertices 已转换为整数
+                await conn.execute(f"""
+                    CREATE TABLE {target} AS
+                    SELECT 
+                        {quote_ident(id_column)} as source_id,
+                        ST_Subdivide({column}, {max_vertices}) as geom
+                    FROM {qualified_name(schema, table_name)}
+                    WHERE {column} IS NOT NULL
+                """, timeout=db_config.bulk_timeout)
+                await conn.execute(
+                    f"CREATE INDEX {quote_ident(f'idx_{target_name}_geom_gist')} "
+                    f"ON {target} USING GIST (geom)",
+                    timeout=db_config.bulk_timeout
+                )
+                await conn.execute(
+                    f"CREATE INDEX {quote_ident(f'idx_{target_name}_source_id')} "
+                    f"ON {target} (source_id)",
+                    timeout=db_config.bulk_timeout
+                )
+            await conn.execute(f"ANALYZE {target}", timeout=db_config.bulk_timeout)
+            row = await conn.fetchrow(
+                f"SELECT COUNT(*) as parts, COUNT(DISTINCT source_id) as sources FROM {target}"
+            )
+            
+            logger.info(f"拆分表 {schema}.{table_name}: {row['sources']} 个要素 -> {row['parts']} 块")
+            
+            return {
+                "success": True,
+                "table": f"{schema}.{table_name}",
+                "subdivided_table": f"{schema}.{target_name}",
+                "source_features": row["sources"],
+                "parts": row["parts"],
+                "max_vertices": max_vertices
+            }
+            
+        except Exception as e:
+            logger.error(f"拆分表失败: {str(e)}")
+            raise
+
+
+# 维护任务(ANALYZE / VACUUM)的锁等待和执行超时
+MAINTENANCE_LOCK_TIMEOUT = os.getenv("YUKON_MAINTENANCE_LOCK_TIMEOUT", "5s")
+MAINTENANCE_TIMEOUT = float(os.getenv("YUKON_MAINTENANCE_TIMEOUT", "1800"))
+# 保留的已结束任务数量
+_MAX_FINISHED_JOBS = 256
+
+# job_id -> 任务状态；后台任务对象单独保存，避免被垃圾回收
+_maintenance_jobs: Dict[str, Dict[str, Any]] = {}
+_maintenance_tasks: set = set()
+
+
+async def _run_maintenance(job: Dict[str, Any], query: str, schema: str, table_name: str):
+    """在独立借出的连接上执行维护语句并更新任务状态"""
+    job["status"] = "running"
+    job["started_at"] = time.time()
+    try:
+        async with db_config.acquire() as conn:
+            # VACUUM 不能在事务块中执行，使用会话级设置；连接归还连接池时会被重置
+            await conn.execute(f"SET lock_timeout = '{MAINTENANCE_LOCK_TIMEOUT}'")
+            await conn.execute(f"SET statement_timeout = '{int(MAINTENANCE_TIMEOUT)}s'")
+            await conn.execute(query, timeout=MAINTENANCE_TIMEOUT)
+        job["status"] = "succeeded"
+        logger.info(f"维护任务完成: {job['operation']} {schema}.{table_name}")
     except Exception as e:
-        logger.error(f"创建空间索引失败: {str(e)}")
-        raise
+        job["status"] = "failed"
+        job["error"] = str(e)
+        logger.error(f"维护任务失败: {job['operation']} {schema}.{table_name}: {str(e)}")
     finally:
-        await conn.close()
+        job["finished_at"] = time.time()
+        catalog_cache.invalidate(schema, table_name)
+
+
+def _submit_maintenance(operation: str, query: str, schema: str, table_name: str) -> Dict[str, Any]:
+    """
+    将维护语句提交为后台任务
+    
+    Returns:
+        任务状态(副本)
+    """
+    finished = [
+        job_id for job_id, job in _maintenance_jobs.items()
+        if job["status"] in ("succeeded", "failed")
+    ]
+    for job_id in finished[:max(0, len(finished) - _MAX_FINISHED_JOBS)]:
+        del _maintenance_jobs[job_id]
+    
+    job = {
+        "job_id": uuid.uuid4().hex,
+        "operation": operation,
+        "table": f"{schema}.{table_name}",
+        "status": "queued",
+        "submitted_at": time.time()
+    }
+    _maintenance_jobs[job["job_id"]] = job
+    task = asyncio.create_task(_run_maintenance(job, query, schema, table_name))
+    _maintenance_tasks.add(task)
+    task.add_done_callback(_maintenance_tasks.discard)
+    return dict(job)
+
+
+def get_maintenance_status(job_id: str) -> Dict[str, Any]:
+    """
+    查询维护任务状态
+    
+    Args:
+        job_id: analyze_table / vacuum_table 返回的任务ID
+        
+    Returns:
+        任务状态字典(status 为 queued / running / succeeded / failed)
+        
+    Raises:
+        ValueError: 任务不存在或已被清理
+    """
+    job = _maintenance_jobs.get(job_id)
+    if job is None:
+        raise ValueError(f"维护任务不存在: {job_id}")
+    return dict(job)
 
 
 async def analyze_table(
@@ -306,32 +690,25 @@ async def analyze_table(
     """
     分析表以更新统计信息
     
+    ANALYZE 在后台任务中执行，立即返回任务ID，可通过 get_maintenance_status 查询进度
+    
     Args:
         table_name: 表名
         schema: 模式名，默认为 'public'
         
     Returns:
-        分析结果字典
+        任务信息字典
     """
-    conn = await get_db_connection()
-    try:
-        query = f"ANALYZE {schema}.{table_name}"
-        
-        await conn.execute(query)
-        
-        logger.info(f"成功分析表: {schema}.{table_name}")
-        
-        return {
-            "success": True,
-            "table": f"{schema}.{table_name}",
-            "message": "表统计信息已更新"
-        }
-        
-    except Exception as e:
-        logger.error(f"分析表失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    query = f"ANALYZE {qualified_name(schema, table_name)}"
+    job = _submit_maintenance("analyze", query, schema, table_name)
+    
+    logger.info(f"已提交表分析任务: {schema}.{table_name} ({job['job_id']})")
+    
+    return {
+        "success": True,
+        **job,
+        "message": "表分析任务已提交"
+    }
 
 
 async def vacuum_table(
@@ -342,129 +719,262 @@ async def vacuum_table(
     """
     清理表以回收空间
     
+    VACUUM 在后台任务中执行，立即返回任务ID，可通过 get_maintenance_status 查询进度
+    
     Args:
         table_name: 表名
         schema: 模式名，默认为 'public'
         full: 是否执行完全清理
         
     Returns:
-        清理结果字典
+        任务信息字典
     """
-    conn = await get_db_connection()
-    try:
-        vacuum_type = "FULL" if full else ""
-        query = f"VACUUM {vacuum_type} {schema}.{table_name}"
-        
-        await conn.execute(query)
-        
-        logger.info(f"成功清理表: {schema}.{table_name} (FULL={full})")
+    vacuum_type = "FULL" if full else ""
+    query = f"VACUUM {vacuum_type} {qualified_name(schema, table_name)}"
+    job = _submit_maintenance("vacuum_full" if full else "vacuum", query, schema, table_name)
+    
+    logger.info(f"已提交表清理任务: {schema}.{table_name} (FULL={full}, {job['job_id']})")
+    
+    return {
+        "success": True,
+        **job,
+        "full_vacuum": full,
+        "message": "表清理任务已提交"
+    }
+
+
+# 按表拼接的SQL模板，{table} 为带模式名的表，{column} 为几何列，均已引用
+_SQL_TABLE_EXTENT = """
+    SELECT 
+        ST_AsText(ST_Extent({column})) as extent,
+        ST_XMin(ST_Extent({column})) as min_x,
+        ST_YMin(ST_Extent({column})) as min_y,
+        ST_XMax(ST_Extent({column})) as max_x,
+        ST_YMax(ST_Extent({column})) as max_y,
+        COUNT(*) as feature_count
+    FROM {table}
+"""
+_SQL_TABLE_OVERVIEW = """
+    SELECT 
+        ST_AsText(ST_Extent({column})) as extent,
+        ST_XMin(ST_Extent({column})) as min_x,
+        ST_YMin(ST_Extent({column})) as min_y,
+        ST_XMax(ST_Extent({column})) as max_x,
+        ST_YMax(ST_Extent({column})) as max_y,
+        COUNT(*) as feature_count,
+        COUNT({column}) as total_count,
+        COUNT(*) FILTER (WHERE ST_IsValid({column})) as valid_count,
+        COUNT(*) FILTER (WHERE NOT ST_IsValid({column})) as invalid_count
+    FROM {table}
+"""
+_SQL_SAMPLED_VALIDITY = """
+    SELECT 
+        COUNT({column}) as total_count,
+        COUNT(*) FILTER (WHERE ST_IsValid({column})) as valid_count,
+        COUNT(*) FILTER (WHERE NOT ST_IsValid({column})) as invalid_count
+    FROM {table} TABLESAMPLE SYSTEM ($1)
+"""
+
+
+@lru_cache(maxsize=256)
+def _table_sql(template: str, schema: str, table_name: str, geometry_column: str) -> str:
+    """
+    将表名、几何列代入SQL模板，同一张表的SQL只拼接一次
+    
+    Args:
+        template: 模块级SQL模板
+        schema: 模式名
+        table_name: 表名
+        geometry_column: 几何列名
         
-        return {
-            "success": True,
-            "table": f"{schema}.{table_name}",
-            "full_vacuum": full,
-            "message": "表空间已回收"
-        }
+    Returns:
+        SQL语句
+    """
+    return template.format(
+        table=qualified_name(schema, table_name),
+        column=quote_ident(geometry_column)
+    )
+
+
+def _extent_result(row, table: str) -> Dict[str, Any]:
+    """由 ST_Extent 聚合结果构建空间范围字典"""
+    return {
+        "table": table,
+        "extent_wkt": row["extent"],
+        "bbox": {
+            "min_x": float(row["min_x"]) if row["min_x"] else None,
+            "min_y": float(row["min_y"]) if row["min_y"] else None,
+            "max_x": float(row["max_x"]) if row["max_x"] else None,
+            "max_y": float(row["max_y"]) if row["max_y"] else None
+        },
+        "feature_count": row["feature_count"]
+    }
+
+
+def _validity_result(row, table: str) -> Dict[str, Any]:
+    """由 ST_IsValid 计数结果构建几何有效性字典"""
+    return {
+        "table": table,
+        "total_geometries": row["total_count"],
+        "valid_geometries": row["valid_count"],
+        "invalid_geometries": row["invalid_count"],
+        "validity_rate": (
+            float(row["valid_count"]) / float(row["total_count"]) * 100
+            if row["total_count"] > 0 else 0
+        )
+    }
+
+
+@catalog_cache.cached
+async def get_table_overview(
+    table_name: str,
+    geometry_column: str = "geom",
+    schema: str = "public"
+) -> Dict[str, Any]:
+    """
+    一次扫描同时获取表的空间范围和几何有效性
+    
+    两项统计读取的是同一列几何，合并为一条聚合查询后只扫描(并解压)一次表。
+    结果按表缓存，随后的 get_spatial_extent / check_geometry_validity 直接复用
+    
+    Args:
+        table_name: 表名
+        geometry_column: 几何列名
+        schema: 模式名
         
-    except Exception as e:
-        logger.error(f"清理表失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    Returns:
+        包含 extent 和 validity 两部分的字典，as_of 为统计时间(Unix 时间戳)
+    """
+    async with db_config.acquire() as conn:
+        try:
+            query = _table_sql(_SQL_TABLE_OVERVIEW, schema, table_name, geometry_column)
+            
+            row = await conn.fetchrow(query)
+            
+            table = f"{schema}.{table_name}"
+            result = {
+                "table": table,
+                "extent": _extent_result(row, table),
+                "validity": _validity_result(row, table),
+                "as_of": time.time()
+            }
+            
+            logger.info(f"获取表 {table} 的空间概况")
+            return result
+            
+        except Exception as e:
+            logger.error(f"获取表空间概况失败: {str(e)}")
+            raise
 
 
+@catalog_cache.cached
 async def get_spatial_extent(
     table_name: str,
     geometry_column: str = "geom",
-    schema: str = "public"
+    schema: str = "public",
+    exact: bool = False
 ) -> Dict[str, Any]:
     """
     获取表的空间范围
     
+    默认使用 ST_EstimatedExtent 读取 ANALYZE 收集的统计信息，要素数量取自
+    pg_class.reltuples，均不扫描表；表尚无统计信息时回退到精确计算
+    
     Args:
         table_name: 表名
         geometry_column: 几何列名
         schema: 模式名
+        exact: 是否用 ST_Extent 扫描全表计算精确范围和要素数量
         
     Returns:
-        空间范围信息字典
+        空间范围信息字典，estimated 标明结果是否为估计值
     """
-    conn = await get_db_connection()
-    try:
-        query = f"""
-            SELECT 
-                ST_AsText(ST_Extent({geometry_column})) as extent,
-                ST_XMin(ST_Extent({geometry_column})) as min_x,
-                ST_YMin(ST_Extent({geometry_column})) as min_y,
-                ST_XMax(ST_Extent({geometry_column})) as max_x,
-                ST_YMax(ST_Extent({geometry_column})) as max_y,
-                COUNT(*) as feature_count
-            FROM {schema}.{table_name}
-        """
-        
-        row = await conn.fetchrow(query)
-        
-        result = {
-            "table": f"{schema}.{table_name}",
-            "extent_wkt": row["extent"],
-            "bbox": {
-                "min_x": float(row["min_x"]) if row["min_x"] else None,
-                "min_y": float(row["min_y"]) if row["min_y"] else None,
-                "max_x": float(row["max_x"]) if row["max_x"] else None,
-                "max_y": float(row["max_y"]) if row["max_y"] else None
-            },
-            "feature_count": row["feature_count"]
-        }
-        
-        logger.info(f"获取表 {schema}.{table_name} 的空间范围")
-        return result
-        
-    except Exception as e:
-        logger.error(f"获取空间范围失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    overview = get_table_overview.peek(table_name, geometry_column, schema)
+    if overview is not None:
+        return {**overview["extent"], "estimated": False}
+    
+    table = f"{schema}.{table_name}"
+    
+    async with db_config.acquire() as conn:
+        try:
+            if not exact:
+                row = await db_config.run_statement(
+                    conn, "estimated_extent",
+                    schema, table_name, geometry_column, method="fetchrow"
+                )
+                if row is not None and row["extent"] is not None:
+                    result = _extent_result(row, table)
+                    if result["feature_count"] is not None and result["feature_count"] < 0:
+                        result["feature_count"] = None
+                    result["estimated"] = True
+                    
+                    logger.info(f"获取表 {table} 的估计空间范围")
+                    return result
+            
+            query = _table_sql(_SQL_TABLE_EXTENT, schema, table_name, geometry_column)
+            
+            row = await conn.fetchrow(query)
+            
+            result = _extent_result(row, table)
+            result["estimated"] = False
+            
+            logger.info(f"获取表 {table} 的空间范围")
+            return result
+            
+        except Exception as e:
+            logger.error(f"获取空间范围失败: {str(e)}")
+            raise
 
 
 async def check_geometry_validity(
     table_name: str,
     geometry_column: str = "geom",
-    schema: str = "public"
+    schema: str = "public",
+    sample_percent: Optional[float] = None,
+    fresh: bool = False
 ) -> Dict[str, Any]:
     """
     检查表中几何对象的有效性
     
+    有效性检查本身就要完整扫描表，顺带计算空间范围几乎没有额外开销，
+    因此通过 get_table_overview 执行，之后的空间范围查询可直接命中缓存。
+    全表结果可能来自缓存(cached 为 True，as_of 为统计时间)，
+    修复几何后复查应指定 fresh=True。
+    大表可指定 sample_percent，用 TABLESAMPLE SYSTEM 按数据块抽样估计
+    
     Args:
         table_name: 表名
         geometry_column: 几何列名
         schema: 模式名
+        sample_percent: 抽样百分比(0-100]，None 表示检查全表
+        fresh: 是否忽略缓存重新扫描全表(同时刷新该表的其他元数据缓存)
         
     Returns:
         几何有效性检查结果
     """
-    conn = await get_db_connection()
     try:
-        query = f"""
-            SELECT 
-                COUNT(*) as total_count,
-                COUNT(CASE WHEN ST_IsValid({geometry_column}) THEN 1 END) as valid_count,
-                COUNT(CASE WHEN NOT ST_IsValid({geometry_column}) THEN 1 END) as invalid_count
-            FROM {schema}.{table_name}
-            WHERE {geometry_column} IS NOT NULL
-        """
-        
-        row = await conn.fetchrow(query)
-        
-        result = {
-            "table": f"{schema}.{table_name}",
-            "total_geometries": row["total_count"],
-            "valid_geometries": row["valid_count"],
-            "invalid_geometries": row["invalid_count"],
-            "validity_rate": (
-                float(row["valid_count"]) / float(row["total_count"]) * 100
-                if row["total_count"] > 0 else 0
-            )
-        }
+        if sample_percent is not None:
+            if not 0 < sample_percent <= 100:
+                raise ValueError(f"抽样百分比必须在 (0, 100] 之间: {sample_percent}")
+            query = _table_sql(_SQL_SAMPLED_VALIDITY, schema, table_name, geometry_column)
+            async with db_config.acquire() as conn:
+                row = await conn.fetchrow(query, float(sample_percent))
+            result = {
+                **_validity_result(row, f"{schema}.{table_name}"),
+                "sample_percent": sample_percent,
+                "cached": False,
+                "as_of": time.time()
+            }
+        else:
+            if fresh:
+                catalog_cache.invalidate(schema, table_name)
+            cached = get_table_overview.peek(table_name, geometry_column, schema) is not None
+            overview = await get_table_overview(table_name, geometry_column, schema)
+            result = {
+                **overview["validity"],
+                "cached": cached,
+                "as_of": overview["as_of"]
+            }
         
         logger.info(
             f"几何有效性检查: {result['valid_geometries']}/{result['total_geometries']} 有效"
@@ -473,6 +983,4 @@ async def check_geometry_validity(
         
     except Exception as e:
         logger.error(f"检查几何有效性失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
\ No newline at end of file
+        raise
\ No newline at end of file
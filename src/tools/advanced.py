@@ -2,30 +2,129 @@
 高级空间分析工具模块
 提供高级的 PostGIS 空间分析功能
 """
-from typing import Dict, List, Any, Optional
-import asyncpg
+from typing import Dict, List, Any, Optional, AsyncIterator
+from functools import lru_cache
 import logging
 
 from ..config import db_config
+from .spatial_query import fetch_json_rows, stream_rows, get_geometry_srid, has_gist_index
+from .srid import geography_srid
+from .admin import subdivided_table_name
+from .geometry import geometry_output_sql
+from .validation import quote_ident, qualified_name
 
 logger = logging.getLogger(__name__)
 
+# 仅含绑定参数的固定SQL模板，在连接创建时预编译
+db_config.register_statement("line_interpolate_point", """
+    SELECT 
+        ST_AsText(p) as point_wkt,
+        ST_X(p) as longitude,
+        ST_Y(p) as latitude
+    FROM ST_LineInterpolatePoint(ST_GeomFromText($1, $2), $3) AS p
+""")
+db_config.register_statement("snap_to_grid", """
+    SELECT 
+        ST_AsText(ST_SnapToGrid(g, $3)) as snapped_geom,
+        ST_NPoints(g) as original_points,
+        ST_NPoints(ST_SnapToGrid(g, $3)) as snapped_points
+    FROM ST_GeomFromText($1, $2) AS g
+""")
+db_config.register_statement("split_line", """
+    SELECT ST_AsText(ST_Split(
+        ST_GeomFromText($1, $2),
+        ST_GeomFromText($3, $2)
+    )) as split_result
+""")
 
-async def get_db_connection() -> asyncpg.Connection:
+
+def _row_json(alias: str, columns: Optional[List[str]]) -> str:
     """
-    获取数据库连接
+    生成把一张表的行转换为 jsonb 的SQL表达式
     
+    Args:
+        alias: 表别名
+        columns: 需要输出的列，None 表示全部列
+        
     Returns:
-        数据库连接对象
+        SQL表达式
     """
-    conn = await asyncpg.connect(
-        host=db_config.host,
-        port=db_config.port,
-        database=db_config.database,
-        user=db_config.user,
-        password=db_config.password
+    if not columns:
+        return f"to_jsonb({alias})"
+    pairs = ", ".join(
+        "'{}', {}.{}".format(column.replace("'", "''"), alias, quote_ident(column))
+        for column in columns
     )
-    return conn
+    return f"jsonb_build_object({pairs})"
+
+
+# 空间连接类型到谓词函数的映射
+_SPATIAL_PREDICATES = {
+    "intersects": "ST_Intersects",
+    "contains": "ST_Contains",
+    "within": "ST_Within",
+    "touches": "ST_Touches",
+    "overlaps": "ST_Overlaps"
+}
+
+
+@lru_cache(maxsize=256)
+def _spatial_join_sql(
+    schema: str,
+    table1: str,
+    table2: str,
+    geom_col1: str,
+    geom_col2: str,
+    predicate: str,
+    columns1: Optional[tuple],
+    columns2: Optional[tuple],
+    subdivided_id_col: Optional[str]
+) -> str:
+    """
+    构建空间连接SQL
+    
+    相同的参数总是得到完全相同的SQL文本，asyncpg 按文本缓存的预备语句
+    因而在每个谓词下各自复用，规划器也能为不同谓词分别选择索引
+    
+    Args:
+        schema: 模式名
+        table1: 第一个表名
+        table2: 第二个表名
+        geom_col1: 第一个表的几何列
+        geom_col2: 第二个表的几何列
+        predicate: 空间谓词函数名
+        columns1: 第一个表需要输出的列
+        columns2: 第二个表需要输出的列
+        subdivided_id_col: 使用拆分表时第二个表的主键列，None 表示不使用拆分表
+        
+    Returns:
+        SQL语句
+    """
+    if subdivided_id_col is not None:
+        # 与拆分块相交即与原几何相交，按 source_id 去重后再取原表行
+        join = f"""
+            CROSS JOIN LATERAL (
+                SELECT DISTINCT s.source_id
+                FROM {qualified_name(schema, subdivided_table_name(table2))} s
+                WHERE ST_Intersects(t1.{quote_ident(geom_col1)}, s.geom)
+            ) m
+            JOIN {qualified_name(schema, table2)} t2
+            ON t2.{quote_ident(subdivided_id_col)} = m.source_id
+        """
+    else:
+        join = f"""
+            JOIN {qualified_name(schema, table2)} t2
+            ON {predicate}(t1.{quote_ident(geom_col1)}, t2.{quote_ident(geom_col2)})
+        """
+    
+    return f"""
+        SELECT 
+            {_row_json("t1", columns1)} as t1,
+            {_row_json("t2", columns2)} as t2
+        FROM {qualified_name(schema, table1)} t1
+        {join}
+        LIMIT 100
+    """
 
 
 async def spatial_join(
@@ -34,11 +133,18 @@ async def spatial_join(
     geom_col1: str = "geom",
     geom_col2: str = "geom",
     join_type: str = "intersects",
-    schema: str = "public"
+    schema: str = "public",
+    columns1: Optional[List[str]] = None,
+    columns2: Optional[List[str]] = None,
+    use_subdivided: bool = False,
+    id_col2: str = "id"
 ) -> List[Dict[str, Any]]:
     """
     执行空间连接操作
     
+    两张表的行在数据库端分别转换为 JSON 对象(几何列输出为 GeoJSON)，
+    同名列不会相互覆盖；指定 columns1 / columns2 时只传输这些列
+    
     Args:
         table1: 第一个表名
         table2: 第二个表名
@@ -46,53 +152,36 @@ async def spatial_join(
         geom_col2: 第二个表的几何列名
         join_type: 连接类型 (intersects, contains, within, touches, overlaps)
         schema: 模式名
+        columns1: 第一个表需要返回的列，None 表示全部列
+        columns2: 第二个表需要返回的列，None 表示全部列
+        use_subdivided: 是否通过 subdivide_table 生成的第二个表的拆分表筛选候选，
+                        适用于第二个表是大而复杂的多边形；仅支持 intersects
+        id_col2: 第二个表的主键列(与拆分表的 source_id 对应)
         
     Returns:
-        空间连接结果列表
+        空间连接结果列表，每项形如 {"t1": {...}, "t2": {...}}
     """
-    conn = await get_db_connection()
-    try:
-        # 根据连接类型构建查询
-        spatial_predicates = {
-            "intersects": "ST_Intersects",
-            "contains": "ST_Contains",
-            "within": "ST_Within",
-            "touches": "ST_Touches",
-            "overlaps": "ST_Overlaps"
-        }
-        
-        predicate = spatial_predicates.get(join_type.lower(), "ST_Intersects")
-        
-        query = f"""
-            SELECT 
-                t1.*,
-                t2.*
-            FROM {schema}.{table1} t1
-            JOIN {schema}.{table2} t2
-            ON {predicate}(t1.{geom_col1}, t2.{geom_col2})
-            LIMIT 100
-        """
-        
-        rows = await conn.fetch(query)
-        
-        results = []
-        for row in rows:
-            result = dict(row)
-            # 转换几何字段为字符串
-            if geom_col1 in result:
-                result[geom_col1] = str(result[geom_col1])
-            if geom_col2 in result:
-                result[geom_col2] = str(result[geom_col2])
-            results.append(result)
-        
-        logger.info(f"空间连接完成: {len(results)} 条结果")
-        return results
-        
-    except Exception as e:
-        logger.error(f"空间连接失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    if use_subdivided and join_type.lower() != "intersects":
+        raise ValueError("use_subdivided 仅支持 intersects 连接")
+    
+    async with db_config.acquire() as conn:
+        try:
+            query = _spatial_join_sql(
+                schema, table1, table2, geom_col1, geom_col2,
+                _SPATIAL_PREDICATES.get(join_type.lower(), "ST_Intersects"),
+                tuple(columns1) if columns1 else None,
+                tuple(columns2) if columns2 else None,
+                id_col2 if use_subdivided else None
+            )
+            
+            results = await fetch_json_rows(conn, query)
+            
+            logger.info(f"空间连接完成: {len(results)} 条结果")
+            return results
+            
+        except Exception as e:
+            logger.error(f"空间连接失败: {str(e)}")
+            raise
 
 
 async def nearest_neighbor(
@@ -118,50 +207,148 @@ async def nearest_neighbor(
         
     Returns:
         最近邻居列表
+        
+    Note:
+        查询点只在 CTE 中解析和转换一次。内层查询用 KNN 运算符 {geometry_column} <-> 查询点
+        (几何列原生坐标系下的平面距离)，由 GiST 索引按索引顺序取出前K个；
+        米制 geography 距离只在外层对这K行计算。
     """
-    conn = await get_db_connection()
-    try:
-        distance_filter = ""
-        if max_distance is not None:
-            distance_filter = f"""
-                AND ST_DWithin(
-                    ST_Transform({geometry_column}, 4326)::geography,
-                    ST_GeogFromText('SRID=4326;{point_wkt}'),
-                    {max_distance}
+    if not await has_gist_index(table_name, geometry_column, schema):
+        logger.warning(
+            f"{schema}.{table_name}.{geometry_column} 没有 GiST 索引，最近邻查询将退化为全表扫描排序，"
+            f"建议先执行 create_index(index_type=\"gist\")"
+        )
+    
+    column = quote_ident(geometry_column)
+    
+    # 地理坐标系的列直接转换为 geography，可使用 (geom::geography) 表达式索引
+    table_srid = await get_geometry_srid(table_name, geometry_column, schema)
+    target_srid = await geography_srid(table_srid)
+    projected = table_srid is not None and target_srid != table_srid
+    geog_expr = "ST_Transform({}, 4326)::geography" if projected else "{}::geography"
+    
+    # $5: 查询点转换到几何列的原生坐标系，KNN 排序与索引使用同一坐标系
+    args = [point_wkt, srid, k, target_srid, table_srid or srid]
+    distance_filter = ""
+    window = ""
+    if max_distance is not None:
+        args.append(max_distance)
+        if projected:
+            # 投影坐标系的列无法直接使用 geography 索引，先用原生坐标系下的
+            # 搜索窗口(查询点缓冲区的外包框)做可走索引的 && 预筛选
+            window = """,
+                        ST_Transform(
+                            ST_Buffer(ST_Transform(ST_GeomFromText($1, $2), $4)::geography, $6)::geometry,
+                            $5
+                        ) AS q_window"""
+            distance_filter = f"AND t.{column} && (SELECT q_window FROM q)"
+        distance_filter += f"""
+            AND ST_DWithin(
+                {geog_expr.format(f"t.{column}")},
+                (SELECT q_geog FROM q),
+                $6
+            )
+        """
+    
+    async with db_config.acquire() as conn:
+        try:
+            query = f"""
+                WITH q AS (
+                    SELECT
+                        ST_Transform(ST_GeomFromText($1, $2), $5) AS q_geom,
+                        ST_Transform(ST_GeomFromText($1, $2), $4)::geography AS q_geog{window}
                 )
+                SELECT 
+                    nn.*,
+                    ST_Distance(
+                        {geog_expr.format(f"nn.{column}")},
+                        (SELECT q_geog FROM q)
+                    ) as distance
+                FROM (
+                    SELECT t.*
+                    FROM {qualified_name(schema, table_name)} t
+                    WHERE t.{column} IS NOT NULL
+                    {distance_filter}
+                    ORDER BY t.{column} <-> (SELECT q_geom FROM q)
+                    LIMIT $3
+                ) nn
             """
+            
+            results = await fetch_json_rows(conn, query, *args, order_by="distance")
+            
+            logger.info(f"找到 {len(results)} 个最近邻居")
+            return results
+            
+        except Exception as e:
+            logger.error(f"最近邻查询失败: {str(e)}")
+            raise
+
+
+@lru_cache(maxsize=64)
+def _cluster_sql(schema: str, table_name: str, geometry_column: str) -> str:
+    """
+    构建 ST_ClusterDBSCAN 聚类SQL，参数 $1 为距离阈值，$2 为最小点数
+    
+    Args:
+        schema: 模式名
+        table_name: 表名
+        geometry_column: 几何列名
         
-        query = f"""
+    Returns:
+        SQL语句，结果列为 cluster_id、point_count、centroid
+    """
+    column = quote_ident(geometry_column)
+    return f"""
+        WITH clustered AS (
             SELECT 
-                *,
-                ST_Distance(
-                    ST_Transform({geometry_column}, 4326)::geography,
-                    ST_GeogFromText('SRID=4326;{point_wkt}')
-                ) as distance
-            FROM {schema}.{table_name}
-            WHERE {geometry_column} IS NOT NULL
-            {distance_filter}
-            ORDER BY {geometry_column} <-> ST_GeomFromText('{point_wkt}', {srid})
-            LIMIT {k}
-        """
-        
-        rows = await conn.fetch(query)
-        
-        results = []
-        for row in rows:
-            result = dict(row)
-            if geometry_column in result:
-                result[geometry_column] = str(result[geometry_column])
-            results.append(result)
-        
-        logger.info(f"找到 {len(results)} 个最近邻居")
-        return results
+                {column},
+                ST_ClusterDBSCAN(
+                    ST_Transform({column}, 3857),
+                    eps := $1,
+                    minpoints := $2
+                ) OVER () AS cluster_id
+            FROM {qualified_name(schema, table_name)}
+            WHERE {column} IS NOT NULL
+        )
+        SELECT 
+            cluster_id,
+            COUNT(*) as point_count,
+            ST_AsText(ST_Centroid(ST_Collect({column}))) as centroid
+        FROM clustered
+        WHERE cluster_id IS NOT NULL
+        GROUP BY cluster_id
+        ORDER BY cluster_id
+    """
+
+
+async def iter_spatial_clusters(
+    table_name: str,
+    geometry_column: str = "geom",
+    distance: float = 100,
+    min_points: int = 5,
+    schema: str = "public"
+) -> AsyncIterator[Dict[str, Any]]:
+    """
+    使用 ST_ClusterDBSCAN 进行空间聚类，通过游标逐个产出聚类
+    
+    Args:
+        table_name: 表名
+        geometry_column: 几何列名
+        distance: 聚类距离阈值（米）
+        min_points: 最小点数
+        schema: 模式名
         
-    except Exception as e:
-        logger.error(f"最近邻查询失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    Yields:
+        聚类信息字典(cluster_id, point_count, centroid)
+    """
+    query = _cluster_sql(schema, table_name, geometry_column)
+    
+    async with db_config.acquire() as conn:
+        # 窗口聚类需要扫描整表，JIT 编译的开销可以摊薄，在本查询内单独开启
+        async for row in stream_rows(
+            conn, query, float(distance), int(min_points), settings={"jit": "on"}
+        ):
+            yield dict(row)
 
 
 async def spatial_cluster(
@@ -174,6 +361,9 @@ async def spatial_cluster(
     """
     使用 ST_ClusterDBSCAN 进行空间聚类
     
+    聚类结果在数据库端聚合为一个 JSON 数组一次取回，不再逐行构造字典；
+    需要逐个处理大量聚类时使用 iter_spatial_clusters
+    
     Args:
         table_name: 表名
         geometry_column: 几何列名
@@ -184,58 +374,34 @@ async def spatial_cluster(
     Returns:
         聚类结果字典
     """
-    conn = await get_db_connection()
-    try:
-        query = f"""
-            WITH clustered AS (
-                SELECT 
-                    *,
-                    ST_ClusterDBSCAN(
-                        ST_Transform({geometry_column}, 3857),
-                        eps := {distance},
-                        minpoints := {min_points}
-                    ) OVER () AS cluster_id
-                FROM {schema}.{table_name}
-                WHERE {geometry_column} IS NOT NULL
-            )
-            SELECT 
-                cluster_id,
-                COUNT(*) as point_count,
-                ST_AsText(ST_Centroid(ST_Collect({geometry_column}))) as cluster_centroid
-            FROM clustered
-            WHERE cluster_id IS NOT NULL
-            GROUP BY cluster_id
-            ORDER BY cluster_id
-        """
-        
-        rows = await conn.fetch(query)
-        
-        clusters = []
-        for row in rows:
-            clusters.append({
-                "cluster_id": row["cluster_id"],
-                "point_count": row["point_count"],
-                "centroid": row["cluster_centroid"]
-            })
-        
-        logger.info(f"识别出 {len(clusters)} 个聚类")
-        
-        return {
-            "cluster_count": len(clusters),
-            "clusters": clusters
-        }
-        
-    except Exception as e:
-        logger.error(f"空间聚类失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    async with db_config.acquire() as conn:
+        try:
+            query = _cluster_sql(schema, table_name, geometry_column)
+            
+            async with conn.transaction():
+                await conn.execute("SELECT set_config('jit', 'on', true)")
+                clusters = await fetch_json_rows(
+                    conn, query, float(distance), int(min_points),
+                    order_by="cluster_id"
+                )
+            
+            logger.info(f"识别出 {len(clusters)} 个聚类")
+            
+            return {
+                "cluster_count": len(clusters),
+                "clusters": clusters
+            }
+            
+        except Exception as e:
+            logger.error(f"空间聚类失败: {str(e)}")
+            raise
 
 
 async def convex_hull(
     table_name: str,
     geometry_column: str = "geom",
-    schema: str = "public"
+    schema: str = "public",
+    pre_simplify_tolerance: Optional[float] = None
 ) -> Dict[str, Any]:
     """
     计算表中所有几何对象的凸包
@@ -244,43 +410,56 @@ async def convex_hull(
         table_name: 表名
         geometry_column: 几何列名
         schema: 模式名
+        pre_simplify_tolerance: 收集前 ST_SimplifyPreserveTopology 的容差(坐标单位)，默认不简化
         
     Returns:
         凸包信息字典
     """
-    conn = await get_db_connection()
-    try:
-        query = f"""
-            SELECT 
-                ST_AsText(ST_ConvexHull(ST_Collect({geometry_column}))) as convex_hull,
-                ST_Area(ST_Transform(ST_ConvexHull(ST_Collect({geometry_column})), 3857)) as area_sqm,
-                COUNT(*) as feature_count
-            FROM {schema}.{table_name}
-            WHERE {geometry_column} IS NOT NULL
-        """
-        
-        row = await conn.fetchrow(query)
-        
-        result = {
-            "convex_hull_wkt": row["convex_hull"],
-            "area_square_meters": float(row["area_sqm"]),
-            "feature_count": row["feature_count"]
-        }
-        
-        logger.info(f"计算凸包: 包含 {result['feature_count']} 个要素")
-        return result
-        
-    except Exception as e:
-        logger.error(f"计算凸包失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    column = quote_ident(geometry_column)
+    args = []
+    geom_expr = column
+    if pre_simplify_tolerance:
+        args.append(pre_simplify_tolerance)
+        geom_expr = f"ST_SimplifyPreserveTopology({column}, $1)"
+    
+    async with db_config.acquire() as conn:
+        try:
+            query = f"""
+                WITH hull AS (
+                    SELECT 
+                        ST_ConvexHull(ST_Collect({geom_expr})) as geom,
+                        COUNT(*) as feature_count
+                    FROM {qualified_name(schema, table_name)}
+                    WHERE {column} IS NOT NULL
+                )
+                SELECT 
+                    ST_AsText(geom) as convex_hull,
+                    ST_Area(ST_Transform(geom, 3857)) as area_sqm,
+                    feature_count
+                FROM hull
+            """
+            
+            row = await conn.fetchrow(query, *args)
+            
+            result = {
+                "convex_hull_wkt": row["convex_hull"],
+                "area_square_meters": float(row["area_sqm"]),
+                "feature_count": row["feature_count"]
+            }
+            
+            logger.info(f"计算凸包: 包含 {result['feature_count']} 个要素")
+            return result
+            
+        except Exception as e:
+            logger.error(f"计算凸包失败: {str(e)}")
+            raise
 
 
 async def voronoi_polygons(
     table_name: str,
     geometry_column: str = "geom",
-    schema: str = "public"
+    schema: str = "public",
+    geometry_format: str = "geojson"
 ) -> List[Dict[str, Any]]:
     """
     生成 Voronoi 多边形
@@ -289,36 +468,39 @@ async def voronoi_polygons(
         table_name: 表名
         geometry_column: 几何列名
         schema: 模式名
+        geometry_format: 多边形输出格式 geojson / wkt / twkb / ewkb，
+                         多边形较多时 ewkb(十六进制)体积更小、数据库端格式化开销更低
         
     Returns:
         Voronoi 多边形列表
     """
-    conn = await get_db_connection()
-    try:
-        query = f"""
-            SELECT 
-                (ST_Dump(ST_VoronoiPolygons(ST_Collect({geometry_column})))).geom as voronoi_polygon
-            FROM {schema}.{table_name}
-            WHERE {geometry_column} IS NOT NULL
-        """
-        
-        rows = await conn.fetch(query)
-        
-        results = []
-        for i, row in enumerate(rows):
-            results.append({
-                "polygon_id": i,
-                "geometry": str(row["voronoi_polygon"])
-            })
-        
-        logger.info(f"生成 {len(results)} 个 Voronoi 多边形")
-        return results
-        
-    except Exception as e:
-        logger.error(f"生成 Voronoi 多边形失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    column = quote_ident(geometry_column)
+    geometry = "(dump).geom"
+    if geometry_format != "geojson":
+        srid = await get_geometry_srid(table_name, geometry_column, schema) or 4326
+        geometry = await geometry_output_sql(geometry, geometry_format, srid)
+    
+    async with db_config.acquire() as conn:
+        try:
+            query = f"""
+                SELECT 
+                    (ROW_NUMBER() OVER () - 1)::int as polygon_id,
+                    {geometry} as geometry
+                FROM (
+                    SELECT ST_Dump(ST_VoronoiPolygons(ST_Collect({column}))) as dump
+                    FROM {qualified_name(schema, table_name)}
+                    WHERE {column} IS NOT NULL
+                ) v
+            """
+            
+            results = await fetch_json_rows(conn, query, order_by="polygon_id")
+            
+            logger.info(f"生成 {len(results)} 个 Voronoi 多边形")
+            return results
+            
+        except Exception as e:
+            logger.error(f"生成 Voronoi 多边形失败: {str(e)}")
+            raise
 
 
 async def line_interpolate(
@@ -337,32 +519,25 @@ async def line_interpolate(
     Returns:
         插值点信息
     """
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT 
-                ST_AsText(ST_LineInterpolatePoint(ST_GeomFromText($1, $2), $3)) as point_wkt,
-                ST_X(ST_LineInterpolatePoint(ST_GeomFromText($1, $2), $3)) as longitude,
-                ST_Y(ST_LineInterpolatePoint(ST_GeomFromText($1, $2), $3)) as latitude
-        """
-        
-        row = await conn.fetchrow(query, line_wkt, srid, fraction)
-        
-        result = {
-            "point_wkt": row["point_wkt"],
-            "longitude": float(row["longitude"]),
-            "latitude": float(row["latitude"]),
-            "fraction": fraction
-        }
-        
-        logger.info(f"线段插值点: ({result['longitude']}, {result['latitude']})")
-        return result
-        
-    except Exception as e:
-        logger.error(f"线段插值失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    async with db_config.acquire() as conn:
+        try:
+            row = await db_config.run_statement(
+                conn, "line_interpolate_point", line_wkt, srid, fraction, method="fetchrow"
+            )
+            
+            result = {
+                "point_wkt": row["point_wkt"],
+                "longitude": float(row["longitude"]),
+                "latitude": float(row["latitude"]),
+                "fraction": fraction
+            }
+            
+            logger.info(f"线段插值点: ({result['longitude']}, {result['latitude']})")
+            return result
+            
+        except Exception as e:
+            logger.error(f"线段插值失败: {str(e)}")
+            raise
 
 
 async def snap_to_grid(
@@ -381,32 +556,25 @@ async def snap_to_grid(
     Returns:
         捕捉后的几何对象
     """
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT 
-                ST_AsText(ST_SnapToGrid(ST_GeomFromText($1, $2), $3)) as snapped_geom,
-                ST_NPoints(ST_GeomFromText($1, $2)) as original_points,
-                ST_NPoints(ST_SnapToGrid(ST_GeomFromText($1, $2), $3)) as snapped_points
-        """
-        
-        row = await conn.fetchrow(query, geometry_wkt, srid, grid_size)
-        
-        result = {
-            "snapped_geometry": row["snapped_geom"],
-            "original_point_count": row["original_points"],
-            "snapped_point_count": row["snapped_points"],
-            "grid_size": grid_size
-        }
-        
-        logger.info(f"捕捉到网格: {result['original_point_count']} -> {result['snapped_point_count']} 点")
-        return result
-        
-    except Exception as e:
-        logger.error(f"捕捉到网格失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    async with db_config.acquire() as conn:
+        try:
+            row = await db_config.run_statement(
+                conn, "snap_to_grid", geometry_wkt, srid, grid_size, method="fetchrow"
+            )
+            
+            result = {
+                "snapped_geometry": row["snapped_geom"],
+                "original_point_count": row["original_points"],
+                "snapped_point_count": row["snapped_points"],
+                "grid_size": grid_size
+            }
+            
+            logger.info(f"捕捉到网格: {result['original_point_count']} -> {result['snapped_point_count']} 点")
+            return result
+            
+        except Exception as e:
+            logger.error(f"捕捉到网格失败: {str(e)}")
+            raise
 
 
 async def split_line_by_point(
@@ -425,27 +593,19 @@ async def split_line_by_point(
     Returns:
         分割后的线段信息
     """
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT 
-                ST_AsText(ST_Split(
-                    ST_GeomFromText($1, $2),
-                    ST_GeomFromText($3, $2)
-                )) as split_result
-        """
-        
-        row = await conn.fetchrow(query, line_wkt, srid, point_wkt)
-        
-        result = {
-            "split_geometry": row["split_result"]
-        }
-        
-        logger.info("线段分割完成")
-        return result
-        
-    except Exception as e:
-        logger.error(f"线段分割失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
\ No newline at end of file
+    async with db_config.acquire() as conn:
+        try:
+            row = await db_config.run_statement(
+                conn, "split_line", line_wkt, srid, point_wkt, method="fetchrow"
+            )
+            
+            result = {
+                "split_geometry": row["split_result"]
+            }
+            
+            logger.info("线段分割完成")
+            return result
+            
+        except Exception as e:
+            logger.error(f"线段分割失败: {str(e)}")
+            raise
\ No newline at end of file
@@ -2,30 +2,41 @@
 空间分析工具模块
 提供基于 PostGIS 的空间分析功能
 """
-from typing import Dict, Any, List
-import asyncpg
+from typing import Dict, Any, List, Optional
 import logging
 
 from ..config import db_config
+from .geometry import load_local_geometry, wkt_to_wkb
+from .srid import geography_srid
 
 logger = logging.getLogger(__name__)
 
-
-async def get_db_connection() -> asyncpg.Connection:
-    """
-    获取数据库连接
-    
-    Returns:
-        数据库连接对象
-    """
-    conn = await asyncpg.connect(
-        host=db_config.host,
-        port=db_config.port,
-        database=db_config.database,
-        user=db_config.user,
-        password=db_config.password
-    )
-    return conn
+# 地理坐标系输入直接按椭球计算测地线距离，不经过 PROJ 投影，高纬度地区也不失真
+db_config.register_statement("geography_distance", """
+    SELECT ST_Distance(
+        ST_GeomFromText($1, $2)::geography,
+        ST_GeomFromText($3, $2)::geography
+    ) as distance_m
+""")
+db_config.register_statement("geometry_distance", """
+    SELECT ST_Distance(
+        ST_Transform(ST_GeomFromText($1, $2), 3857),
+        ST_Transform(ST_GeomFromText($3, $2), 3857)
+    ) as distance_m
+""")
+db_config.register_statement("geometry_containment", """
+    SELECT 
+        ST_Contains(a, b) as contains,
+        ST_Within(b, a) as within
+    FROM ST_GeomFromText($1, $2) AS a, ST_GeomFromText($3, $2) AS b
+""")
+db_config.register_statement("geometry_centroid", """
+    SELECT 
+        ST_AsText(c) as centroid_wkt,
+        ST_X(c) as longitude,
+        ST_Y(c) as latitude
+    FROM ST_Centroid(ST_GeomFromText($1, $2)) AS c
+""")
 
 
 async def calculate_distance(
@@ -36,6 +47,8 @@ async def calculate_distance(
     """
     计算两个几何对象之间的距离
     
+    地理坐标系(如 4326)使用 geography 椭球距离，投影坐标系投影到 Web Mercator 后计算
+    
     Args:
         geom1_wkt: 第一个几何对象的WKT格式
         geom2_wkt: 第二个几何对象的WKT格式
@@ -44,41 +57,36 @@ async def calculate_distance(
     Returns:
         包含距离信息的字典
     """
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT 
-                ST_Distance(
-                    ST_Transform(ST_GeomFromText($1, $2), 3857),
-                    ST_Transform(ST_GeomFromText($3, $2), 3857)
-                ) as distance_m,
-                ST_Distance(
-                    ST_Transform(ST_GeomFromText($1, $2), 3857),
-                    ST_Transform(ST_GeomFromText($3, $2), 3857)
-                ) / 1000.0 as distance_km
-        """
-        
-        row = await conn.fetchrow(query, geom1_wkt, srid, geom2_wkt)
-        
-        result = {
-            "distance_meters": float(row["distance_m"]),
-            "distance_kilometers": float(row["distance_km"])
-        }
-        
-        logger.info(f"计算距离: {result['distance_meters']} 米")
-        return result
-        
-    except Exception as e:
-        logger.error(f"计算距离失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    statement = (
+        "geography_distance" if await geography_srid(srid) == srid
+        else "geometry_distance"
+    )
+    
+    async with db_config.acquire() as conn:
+        try:
+            row = await db_config.run_statement(
+                conn, statement, geom1_wkt, srid, geom2_wkt, method="fetchrow"
+            )
+            
+            distance_m = float(row["distance_m"])
+            result = {
+                "distance_meters": distance_m,
+                "distance_kilometers": distance_m / 1000.0
+            }
+            
+            logger.info(f"计算距离: {result['distance_meters']} 米")
+            return result
+            
+        except Exception as e:
+            logger.error(f"计算距离失败: {str(e)}")
+            raise
 
 
 async def check_intersection(
     geom1_wkt: str,
     geom2_wkt: str,
-    srid: int = 4326
+    srid: int = 4326,
+    pre_simplify_tolerance: Optional[float] = None
 ) -> Dict[str, Any]:
     """
     检查两个几何对象是否相交
@@ -87,45 +95,48 @@ async def check_intersection(
         geom1_wkt: 第一个几何对象的WKT格式
         geom2_wkt: 第二个几何对象的WKT格式
         srid: 空间参考系统ID
+        pre_simplify_tolerance: 计算前 ST_SimplifyPreserveTopology 的容差(坐标单位)，默认不简化
         
     Returns:
         包含相交信息的字典
     """
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT 
-                ST_Intersects(
-                    ST_GeomFromText($1, $2),
-                    ST_GeomFromText($3, $2)
-                ) as intersects,
-                CASE 
-                    WHEN ST_Intersects(ST_GeomFromText($1, $2), ST_GeomFromText($3, $2))
-                    THEN ST_AsText(
-                        ST_Intersection(
-                            ST_GeomFromText($1, $2),
-                            ST_GeomFromText($3, $2)
-                        )
-                    )
-                    ELSE NULL
-                END as intersection_geom
-        """
-        
-        row = await conn.fetchrow(query, geom1_wkt, srid, geom2_wkt)
-        
-        result = {
-            "intersects": row["intersects"],
-            "intersection_geometry": row["intersection_geom"] if row["intersects"] else None
-        }
-        
-        logger.info(f"相交检查: {result['intersects']}")
-        return result
-        
-    except Exception as e:
-        logger.error(f"相交检查失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    args = [geom1_wkt, srid, geom2_wkt]
+    geom1 = "ST_GeomFromText($1, $2)"
+    geom2 = "ST_GeomFromText($3, $2)"
+    if pre_simplify_tolerance:
+        args.append(pre_simplify_tolerance)
+        geom1 = f"ST_SimplifyPreserveTopology({geom1}, $4)"
+        geom2 = f"ST_SimplifyPreserveTopology({geom2}, $4)"
+    
+    async with db_config.acquire() as conn:
+        try:
+            query = f"""
+                WITH g AS (
+                    SELECT {geom1} AS a, {geom2} AS b
+                )
+                SELECT 
+                    ST_Intersects(a, b) as intersects,
+                    CASE 
+                        WHEN ST_Intersects(a, b)
+                        THEN ST_AsText(ST_Intersection(a, b))
+                        ELSE NULL
+                    END as intersection_geom
+                FROM g
+            """
+            
+            row = await conn.fetchrow(query, *args)
+            
+            result = {
+                "intersects": row["intersects"],
+                "intersection_geometry": row["intersection_geom"] if row["intersects"] else None
+            }
+            
+            logger.info(f"相交检查: {result['intersects']}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"相交检查失败: {str(e)}")
+            raise
 
 
 async def check_containment(
@@ -144,40 +155,30 @@ async def check_containment(
     Returns:
         包含包含关系信息的字典
     """
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT 
-                ST_Contains(
-                    ST_GeomFromText($1, $2),
-                    ST_GeomFromText($3, $2)
-                ) as contains,
-                ST_Within(
-                    ST_GeomFromText($3, $2),
-                    ST_GeomFromText($1, $2)
-                ) as within
-        """
-        
-        row = await conn.fetchrow(query, container_wkt, srid, contained_wkt)
-        
-        result = {
-            "contains": row["contains"],
-            "within": row["within"]
-        }
-        
-        logger.info(f"包含关系检查: contains={result['contains']}, within={result['within']}")
-        return result
-        
-    except Exception as e:
-        logger.error(f"包含关系检查失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    async with db_config.acquire() as conn:
+        try:
+            row = await db_config.run_statement(
+                conn, "geometry_containment", container_wkt, srid, contained_wkt,
+                method="fetchrow"
+            )
+            
+            result = {
+                "contains": row["contains"],
+                "within": row["within"]
+            }
+            
+            logger.info(f"包含关系检查: contains={result['contains']}, within={result['within']}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"包含关系检查失败: {str(e)}")
+            raise
 
 
 async def union_geometries(
     geometries_wkt: List[str],
-    srid: int = 4326
+    srid: int = 4326,
+    pre_simplify_tolerance: Optional[float] = None
 ) -> Dict[str, Any]:
     """
     合并多个几何对象
@@ -185,36 +186,52 @@ async def union_geometries(
     Args:
         geometries_wkt: WKT格式的几何对象列表
         srid: 空间参考系统ID
+        pre_simplify_tolerance: 合并前 ST_SimplifyPreserveTopology 的容差(坐标单位)，默认不简化
         
     Returns:
         包含合并后几何的字典
     """
-    conn = await get_db_connection()
-    try:
-        # 构建几何集合
-        geom_array = ", ".join([f"ST_GeomFromText('{wkt}', {srid})" for wkt in geometries_wkt])
-        
-        query = f"""
-            SELECT 
-                ST_AsText(ST_Union(ARRAY[{geom_array}])) as union_geom,
-                ST_Area(ST_Transform(ST_Union(ARRAY[{geom_array}]), 3857)) as area_sqm
-        """
-        
-        row = await conn.fetchrow(query)
-        
-        result = {
-            "union_geometry": row["union_geom"],
-            "area_square_meters": float(row["area_sqm"]) if row["area_sqm"] else None
-        }
-        
-        logger.info(f"合并 {len(geometries_wkt)} 个几何对象")
-        return result
-        
-    except Exception as e:
-        logger.error(f"合并几何对象失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    # 整个列表作为一个数组参数传入，优先在本地转换为WKB以二进制传输
+    geometries_wkb = wkt_to_wkb(geometries_wkt)
+    if geometries_wkb is not None:
+        geom_param, geom_expr = geometries_wkb, "ST_GeomFromWKB(g, $2)"
+        array_type = "bytea[]"
+    else:
+        geom_param, geom_expr = geometries_wkt, "ST_GeomFromText(g, $2)"
+        array_type = "text[]"
+    
+    args = [geom_param, srid]
+    if pre_simplify_tolerance:
+        args.append(pre_simplify_tolerance)
+        geom_expr = f"ST_SimplifyPreserveTopology({geom_expr}, $3)"
+    
+    async with db_config.acquire() as conn:
+        try:
+            query = f"""
+                WITH u AS (
+                    SELECT ST_Union({geom_expr}) AS geom
+                    FROM unnest($1::{array_type}) AS g
+                )
+                SELECT 
+                    ST_AsText(geom) as union_geom,
+                    ST_Area(ST_Transform(geom, 3857)) as area_sqm
+                FROM u
+            """
+            
+            row = await conn.fetchrow(query, *args)
+            
+            result = {
+                "union_geometry": row["union_geom"],
+                # 点、线的合并结果面积为 0，只有合并结果为 NULL 时才返回 None
+                "area_square_meters": float(row["area_sqm"]) if row["area_sqm"] is not None else None
+            }
+            
+            logger.info(f"合并 {len(geometries_wkt)} 个几何对象")
+            return result
+            
+        except Exception as e:
+            logger.error(f"合并几何对象失败: {str(e)}")
+            raise
 
 
 async def calculate_centroid(
@@ -231,28 +248,31 @@ async def calculate_centroid(
     Returns:
         包含质心坐标的字典
     """
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT 
-                ST_AsText(ST_Centroid(ST_GeomFromText($1, $2))) as centroid_wkt,
-                ST_X(ST_Centroid(ST_GeomFromText($1, $2))) as longitude,
-                ST_Y(ST_Centroid(ST_GeomFromText($1, $2))) as latitude
-        """
-        
-        row = await conn.fetchrow(query, geometry_wkt, srid)
-        
-        result = {
-            "centroid_geometry": row["centroid_wkt"],
-            "longitude": float(row["longitude"]),
-            "latitude": float(row["latitude"])
+    # 质心在原坐标系下计算，不需要投影
+    geom = load_local_geometry(geometry_wkt, srid=srid)
+    if geom is not None:
+        centroid = geom.centroid
+        return {
+            "centroid_geometry": f"POINT({centroid.x:.15g} {centroid.y:.15g})",
+            "longitude": float(centroid.x),
+            "latitude": float(centroid.y)
         }
-        
-        logger.info(f"计算质心: ({result['longitude']}, {result['latitude']})")
-        return result
-        
-    except Exception as e:
-        logger.error(f"计算质心失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
\ No newline at end of file
+    
+    async with db_config.acquire() as conn:
+        try:
+            row = await db_config.run_statement(
+                conn, "geometry_centroid", geometry_wkt, srid, method="fetchrow"
+            )
+            
+            result = {
+                "centroid_geometry": row["centroid_wkt"],
+                "longitude": float(row["longitude"]),
+                "latitude": float(row["latitude"])
+            }
+            
+            logger.info(f"计算质心: ({result['longitude']}, {result['latitude']})")
+            return result
+            
+        except Exception as e:
+            logger.error(f"计算质心失败: {str(e)}")
+            raise
\ No newline at end of file
@@ -0,0 +1,112 @@
+"""
+空间元数据缓存模块
+缓存 geometry_columns、pg_indexes 等目录查询结果，避免每次调用都访问数据库
+"""
+from typing import Dict, Any, Optional, Tuple, Callable
+import asyncio
+import functools
+import inspect
+import logging
+import os
+import time
+
+logger = logging.getLogger(__name__)
+
+
+class CatalogCache:
+    """
+    带过期时间的异步元数据缓存
+
+    每个缓存条目记录其所属的 (schema, table)，表结构或统计信息变化后
+    可通过 invalidate() 按表失效。缓存值应视为只读。
+    """
+
+    def __init__(self, ttl: float = 60):
+        """
+        初始化缓存
+
+        Args:
+            ttl: 缓存有效期(秒)
+        """
+        self.ttl = ttl
+        # key -> (过期时间, (schema, table), 值)
+        self._data: Dict[Tuple, Tuple[float, Tuple[str, Optional[str]], Any]] = {}
+        # 同一个 key 的并发未命中只查询一次数据库
+        self._locks: Dict[Tuple, asyncio.Lock] = {}
+
+    def cached(self, func: Callable) -> Callable:
+        """
+        缓存异步函数的返回值
+
+        被装饰函数通过参数 schema / table_name 确定缓存条目所属的表。
+        包装函数的 peek(*args, **kwargs) 只读取未过期的缓存值，不会查询数据库
+
+        Args:
+            func: 异步函数
+
+        Returns:
+            包装后的函数
+        """
+        signature = inspect.signature(func)
+
+        def make_key(args, kwargs):
+            bound = signature.bind(*args, **kwargs)
+            bound.apply_defaults()
+            return bound, (func.__qualname__, tuple(bound.arguments.items()))
+
+        def peek(*args, **kwargs):
+            _, key = make_key(args, kwargs)
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[2]
+            return None
+
+        @functools.wraps(func)
+        async def wrapper(*args, **kwargs):
+            bound, key = make_key(args, kwargs)
+            scope = (
+                bound.arguments.get("schema", "public"),
+                bound.arguments.get("table_name")
+            )
+
+            entry = self._data.get(key)
+            if entry is not None and entry[0] > time.monotonic():
+                return entry[2]
+
+            lock = self._locks.setdefault(key, asyncio.Lock())
+            async with lock:
+                entry = self._data.get(key)
+                if entry is not None and entry[0] > time.monotonic():
+                    return entry[2]
+                value = await func(*args, **kwargs)
+                self._data[key] = (time.monotonic() + self.ttl, scope, value)
+                return value
+
+        wrapper.peek = peek
+        return wrapper
+
+    def invalidate(self, schema: str = "public", table_name: Optional[str] = None):
+        """
+        使缓存失效
+
+        Args:
+            schema: 模式名
+            table_name: 表名；为 None 时使整个模式的缓存失效。
+                        指定表名时同时失效该模式下的表列表
+        """
+        stale = [
+            key for key, (_, (entry_schema, entry_table), _) in self._data.items()
+            if entry_schema == schema
+            and (table_name is None or entry_table in (table_name, None))
+        ]
+        for key in stale:
+            self._data.pop(key, None)
+        logger.debug("元数据缓存失效: %s.%s (%d 项)", schema, table_name or "*", len(stale))
+
+    def clear(self):
+        """清空全部缓存"""
+        self._data.clear()
+
+
+# 全局元数据缓存实例(有效期可通过 YUKON_SCHEMA_CACHE_TTL 设置，单位秒)
+catalog_cache = CatalogCache(ttl=float(os.getenv("YUKON_SCHEMA_CACHE_TTL", "60")))
@@ -3,24 +3,22 @@
 提供矢量格式(SHP, GeoJSON)和栅格格式(TIF, PNG)的导入功能
 """
 from typing import Dict, Any, List, Optional
+import asyncio
 import asyncpg
+import struct
+from concurrent.futures import ThreadPoolExecutor
 import logging
 import json
 import os
-from pathlib import Path
-import tempfile
-import base64
 import pandas as pd
 
 # 地理空间数据处理
 import geopandas as gpd
-import fiona
-from shapely import wkt
-from shapely.geometry import mapping, shape
 
 # 栅格数据处理
 import rasterio
-from rasterio.warp import calculate_default_transform, reproject, Resampling
+from rasterio.vrt import WarpedVRT
+from rasterio.windows import Window, transform as window_transform
 from PIL import Image
 import numpy as np
 
@@ -30,21 +28,214 @@ from ..config import db_config
 logger = logging.getLogger(__name__)
 
 
-async def get_db_connection() -> asyncpg.Connection:
+# numpy dtype.kind 到 PostgreSQL 列类型，整数统一用 BIGINT 避免 int64 溢出
+_PG_TYPES_BY_KIND = {
+    "b": "BOOLEAN",
+    "i": "BIGINT",
+    "u": "BIGINT",
+    "f": "DOUBLE PRECISION",
+    "M": "TIMESTAMP",
+    "m": "INTERVAL",
+}
+
+
+def _pg_type(dtype) -> str:
+    """
+    确定属性列在 PostgreSQL 中的类型
+    
+    Args:
+        dtype: pandas/numpy 列类型
+        
+    Returns:
+        PostgreSQL 类型名，无法识别的类型(字符串、对象等)为 TEXT
+    """
+    if getattr(dtype, "tz", None) is not None:
+        return "TIMESTAMPTZ"
+    return _PG_TYPES_BY_KIND.get(getattr(dtype, "kind", "O"), "TEXT")
+
+
+def _read_vector_file(file_path: str, srid: int) -> "gpd.GeoDataFrame":
     """
-    获取数据库连接
+    读取矢量文件并转换到目标坐标系(同步函数，在线程池中执行)
     
+    安装了 pyogrio/pyarrow 时使用 pyogrio 的 Arrow 读取路径，比逐要素读取快得多
+    
+    Args:
+        file_path: 文件路径
+        srid: 目标空间参考系统ID
+        
     Returns:
-        数据库连接对象
+        GeoDataFrame
     """
-    conn = await asyncpg.connect(
-        host=db_config.host,
-        port=db_config.port,
-        database=db_config.database,
-        user=db_config.user,
-        password=db_config.password
+    try:
+        import pyogrio  # noqa: F401
+        import pyarrow  # noqa: F401
+        gdf = gpd.read_file(file_path, engine="pyogrio", use_arrow=True)
+    except ImportError:
+        gdf = gpd.read_file(file_path)
+    
+    if gdf.crs is not None and gdf.crs.to_epsg() != srid:
+        logger.info(f"转换坐标系从 {gdf.crs.to_epsg()} 到 {srid}")
+        gdf = gdf.to_crs(epsg=srid)
+    return gdf
+
+
+async def _copy_features(
+    conn: asyncpg.Connection,
+    gdf: "gpd.GeoDataFrame",
+    schema: str,
+    table_name: str,
+    geometry_column: str,
+    srid: int
+) -> int:
+    """
+    使用 COPY (二进制格式) 批量写入要素，几何列以 EWKB 传输
+    
+    Args:
+        conn: 数据库连接
+        gdf: 要导入的 GeoDataFrame
+        schema: 数据库模式名
+        table_name: 目标表名
+        geometry_column: 几何列名
+        srid: 空间参考系统ID
+        
+    Returns:
+        写入的要素数量
+    """
+    import shapely
+    
+    # geometry 的二进制收发格式即 EWKB，直接以 bytes 传输
+    geometry_schema = await conn.fetchval(
+        """
+            SELECT n.nspname
+            FROM pg_type t JOIN pg_namespace n ON n.oid = t.typnamespace
+            WHERE t.typname = 'geometry'
+        """
+    )
+    # 跳过空几何
+    gdf = gdf[gdf.geometry.notna()]
+    attr_cols = [col for col in gdf.columns if col != gdf.geometry.name]
+    
+    geoms = shapely.set_srid(np.asarray(gdf.geometry), srid)
+    ewkb = shapely.to_wkb(geoms, include_srid=True)
+    
+    # astype(object) 将 numpy 标量转换为 Python 原生类型，NaN 转为 None
+    attrs = gdf[attr_cols].astype(object)
+    attrs = attrs.where(pd.notna(attrs), None)
+    
+    records = (
+        (*values, geom)
+        for values, geom in zip(attrs.itertuples(index=False, name=None), ewkb)
+    )
+    
+    await conn.set_type_codec(
+        'geometry',
+        schema=geometry_schema,
+        encoder=bytes,
+        decoder=bytes,
+        format='binary'
     )
-    return conn
+    try:
+        await conn.copy_records_to_table(
+            table_name,
+            records=records,
+            columns=[*attr_cols, geometry_column],
+            schema_name=schema,
+            timeout=db_config.bulk_timeout
+        )
+    finally:
+        # 连接归还连接池后会被其他工具复用，恢复 geometry 的默认文本格式
+        await conn.reset_type_codec('geometry', schema=geometry_schema)
+    return len(gdf)
+
+
+async def _import_geodataframe(
+    conn: asyncpg.Connection,
+    gdf: "gpd.GeoDataFrame",
+    table_name: str,
+    schema: str,
+    srid: int,
+    geometry_column: str,
+    if_exists: str
+) -> Dict[str, Any]:
+    """
+    将 GeoDataFrame 写入 PostGIS 表: 建表、COPY 写入要素并创建空间索引
+    
+    Args:
+        conn: 数据库连接
+        gdf: 要导入的 GeoDataFrame(已转换到目标坐标系)
+        table_name: 目标表名
+        schema: 数据库模式名
+        srid: 空间参考系统ID
+        geometry_column: 几何列名
+        if_exists: 如果表存在的处理方式 ('replace', 'append', 'fail')
+        
+    Returns:
+        导入结果信息
+    """
+    # 获取几何类型
+    geom_type = gdf.geometry.geom_type.mode()[0] if len(gdf) > 0 else "Unknown"
+    
+    # 创建表结构
+    columns = [
+        f'"{col}" {_pg_type(gdf[col].dtype)}'
+        for col in gdf.columns if col != gdf.geometry.name
+    ]
+    columns.append(f'"{geometry_column}" geometry({geom_type}, {srid})')
+    
+    append = if_exists not in ("replace", "fail")
+    create_table_sql = f"""
+        CREATE TABLE {"IF NOT EXISTS " if append else ""}"{schema}"."{table_name}" (
+            id SERIAL PRIMARY KEY,
+            {', '.join(columns)}
+        )
+    """
+    
+    # 不预先查询表是否存在: replace 在一次往返中删除并重建，
+    # fail 依靠 CREATE TABLE 的重名错误判断，append 只在表不存在时创建
+    if if_exists == "replace":
+        await conn.execute(
+            f'DROP TABLE IF EXISTS "{schema}"."{table_name}" CASCADE;{create_table_sql}'
+        )
+    else:
+        try:
+            await conn.execute(create_table_sql)
+        except asyncpg.exceptions.DuplicateTableError:
+            raise ValueError(f"表 {schema}.{table_name} 已存在") from None
+    if not append:
+        logger.info(f"创建表: {schema}.{table_name}")
+    
+    # 追加到已有表时先删除空间索引，批量写入后再一次性重建，避免逐行维护索引；
+    # 三步在同一事务中执行，写入失败时索引随之回滚
+    index_name = f"{table_name}_{geometry_column}_idx"
+    create_index_sql = f"""
+        CREATE INDEX IF NOT EXISTS "{index_name}"
+        ON "{schema}"."{table_name}"
+        USING GIST ("{geometry_column}")
+    """
+    async with conn.transaction():
+        if append:
+            await conn.execute(f'DROP INDEX IF EXISTS "{schema}"."{index_name}"')
+        
+        # 插入数据
+        insert_count = await _copy_features(
+            conn, gdf, schema, table_name, geometry_column, srid
+        )
+        
+        # 创建空间索引
+        await conn.execute(create_index_sql, timeout=db_config.bulk_timeout)
+    
+    result = {
+        "table_name": f"{schema}.{table_name}",
+        "geometry_type": geom_type,
+        "srid": srid,
+        "feature_count": insert_count,
+        "columns": list(gdf.columns),
+        "bounds": gdf.total_bounds.tolist()
+    }
+    
+    logger.info(f"成功导入 {insert_count} 个要素到 {schema}.{table_name}")
+    return result
 
 
 async def import_shapefile(
@@ -69,124 +260,23 @@ async def import_shapefile(
     Returns:
         导入结果信息
     """
-    conn = await get_db_connection()
     try:
         # 检查文件是否存在
         if not os.path.exists(file_path):
             raise FileNotFoundError(f"文件不存在: {file_path}")
         
-        # 读取 Shapefile
+        # 读取 Shapefile 并转换坐标系(在线程池中执行，不阻塞事件循环)
         logger.info(f"正在读取 Shapefile: {file_path}")
-        gdf = gpd.read_file(file_path)
-        
-        # 转换坐标系
-        if gdf.crs is not None and gdf.crs.to_epsg() != srid:
-            logger.info(f"转换坐标系从 {gdf.crs.to_epsg()} 到 {srid}")
-            gdf = gdf.to_crs(epsg=srid)
+        gdf = await asyncio.to_thread(_read_vector_file, file_path, srid)
         
-        # 获取几何类型
-        geom_type = gdf.geometry.geom_type.mode()[0] if len(gdf) > 0 else "Unknown"
-        
-        # 检查表是否存在
-        table_exists_query = """
-            SELECT EXISTS (
-                SELECT 1 FROM information_schema.tables
-                WHERE table_schema = $1 AND table_name = $2
+        async with db_config.acquire() as conn:
+            return await _import_geodataframe(
+                conn, gdf, table_name, schema, srid, geometry_column, if_exists
             )
-        """
-        table_exists = await conn.fetchval(table_exists_query, schema, table_name)
-        
-        if table_exists:
-            if if_exists == "fail":
-                raise ValueError(f"表 {schema}.{table_name} 已存在")
-            elif if_exists == "replace":
-                logger.info(f"删除现有表: {schema}.{table_name}")
-                await conn.execute(f'DROP TABLE IF EXISTS "{schema}"."{table_name}" CASCADE')
-        
-        # 创建表结构
-        columns = []
-        for col in gdf.columns:
-            if col != gdf.geometry.name:
-                dtype = gdf[col].dtype
-                if dtype == 'object':
-                    pg_type = 'TEXT'
-                elif dtype in ['int64', 'int32']:
-                    pg_type = 'INTEGER'
-                elif dtype in ['float64', 'float32']:
-                    pg_type = 'DOUBLE PRECISION'
-                elif dtype == 'bool':
-                    pg_type = 'BOOLEAN'
-                else:
-                    pg_type = 'TEXT'
-                columns.append(f'"{col}" {pg_type}')
-        
-        columns.append(f'"{geometry_column}" geometry({geom_type}, {srid})')
-        
-        create_table_sql = f"""
-            CREATE TABLE IF NOT EXISTS "{schema}"."{table_name}" (
-                id SERIAL PRIMARY KEY,
-                {', '.join(columns)}
-            )
-        """
-        
-        if not table_exists or if_exists == "replace":
-            await conn.execute(create_table_sql)
-            logger.info(f"创建表: {schema}.{table_name}")
-        
-        # 插入数据
-        insert_count = 0
-        for idx, row in gdf.iterrows():
-            # 准备属性数据
-            attrs = []
-            attr_cols = []
-            for col in gdf.columns:
-                if col != gdf.geometry.name:
-                    attr_cols.append(f'"{col}"')
-                    value = row[col]
-                    if pd.isna(value):
-                        attrs.append(None)
-                    else:
-                        attrs.append(value)
-            
-            # 准备几何数据
-            geom_wkt = row.geometry.wkt if row.geometry is not None else None
-            
-            if geom_wkt:
-                placeholders = ', '.join([f'${i+1}' for i in range(len(attrs))])
-                insert_sql = f"""
-                    INSERT INTO "{schema}"."{table_name}" 
-                    ({', '.join(attr_cols)}, "{geometry_column}")
-                    VALUES ({placeholders}, ST_GeomFromText(${len(attrs)+1}, {srid}))
-                """
-                await conn.execute(insert_sql, *attrs, geom_wkt)
-                insert_count += 1
-        
-        # 创建空间索引
-        index_name = f"{table_name}_{geometry_column}_idx"
-        create_index_sql = f"""
-            CREATE INDEX IF NOT EXISTS "{index_name}"
-            ON "{schema}"."{table_name}"
-            USING GIST ("{geometry_column}")
-        """
-        await conn.execute(create_index_sql)
-        
-        result = {
-            "table_name": f"{schema}.{table_name}",
-            "geometry_type": geom_type,
-            "srid": srid,
-            "feature_count": insert_count,
-            "columns": list(gdf.columns),
-            "bounds": gdf.total_bounds.tolist()
-        }
-        
-        logger.info(f"成功导入 {insert_count} 个要素到 {schema}.{table_name}")
-        return result
         
     except Exception as e:
         logger.error(f"导入 Shapefile 失败: {str(e)}")
         raise
-    finally:
-        await conn.close()
 
 
 async def import_geojson(
@@ -213,14 +303,13 @@ async def import_geojson(
     Returns:
         导入结果信息
     """
-    conn = await get_db_connection()
     try:
         # 读取 GeoJSON
         if file_path:
             if not os.path.exists(file_path):
                 raise FileNotFoundError(f"文件不存在: {file_path}")
             logger.info(f"正在读取 GeoJSON 文件: {file_path}")
-            gdf = gpd.read_file(file_path)
+            gdf = await asyncio.to_thread(_read_vector_file, file_path, srid)
         elif geojson_data:
             logger.info("正在解析 GeoJSON 数据")
             geojson_dict = json.loads(geojson_data)
@@ -229,112 +318,127 @@ async def import_geojson(
         else:
             raise ValueError("必须提供 file_path 或 geojson_data")
         
-        # 转换坐标系
-        if gdf.crs is not None and gdf.crs.to_epsg() != srid:
-            logger.info(f"转换坐标系从 {gdf.crs.to_epsg()} 到 {srid}")
-            gdf = gdf.to_crs(epsg=srid)
-        
-        # 获取几何类型
-        geom_type = gdf.geometry.geom_type.mode()[0] if len(gdf) > 0 else "Unknown"
-        
-        # 检查表是否存在
-        table_exists_query = """
-            SELECT EXISTS (
-                SELECT 1 FROM information_schema.tables
-                WHERE table_schema = $1 AND table_name = $2
+        async with db_config.acquire() as conn:
+            return await _import_geodataframe(
+                conn, gdf, table_name, schema, srid, geometry_column, if_exists
             )
-        """
-        table_exists = await conn.fetchval(table_exists_query, schema, table_name)
-        
-        if table_exists:
-            if if_exists == "fail":
-                raise ValueError(f"表 {schema}.{table_name} 已存在")
-            elif if_exists == "replace":
-                logger.info(f"删除现有表: {schema}.{table_name}")
-                await conn.execute(f'DROP TABLE IF EXISTS "{schema}"."{table_name}" CASCADE')
-        
-        # 创建表并插入数据(使用与 shapefile 相同的逻辑)
-        columns = []
-        for col in gdf.columns:
-            if col != gdf.geometry.name:
-                dtype = gdf[col].dtype
-                if dtype == 'object':
-                    pg_type = 'TEXT'
-                elif dtype in ['int64', 'int32']:
-                    pg_type = 'INTEGER'
-                elif dtype in ['float64', 'float32']:
-                    pg_type = 'DOUBLE PRECISION'
-                elif dtype == 'bool':
-                    pg_type = 'BOOLEAN'
-                else:
-                    pg_type = 'TEXT'
-                columns.append(f'"{col}" {pg_type}')
-        
-        columns.append(f'"{geometry_column}" geometry({geom_type}, {srid})')
-        
-        create_table_sql = f"""
-            CREATE TABLE IF NOT EXISTS "{schema}"."{table_name}" (
-                id SERIAL PRIMARY KEY,
-                {', '.join(columns)}
-            )
-        """
-        
-        if not table_exists or if_exists == "replace":
-            await conn.execute(create_table_sql)
-            logger.info(f"创建表: {schema}.{table_name}")
-        
-        # 插入数据
-        insert_count = 0
-        for idx, row in gdf.iterrows():
-            attrs = []
-            attr_cols = []
-            for col in gdf.columns:
-                if col != gdf.geometry.name:
-                    attr_cols.append(f'"{col}"')
-                    value = row[col]
-                    if pd.isna(value):
-                        attrs.append(None)
-                    else:
-                        attrs.append(value)
-            
-            geom_wkt = row.geometry.wkt if row.geometry is not None else None
-            
-            if geom_wkt:
-                placeholders = ', '.join([f'${i+1}' for i in range(len(attrs))])
-                insert_sql = f"""
-                    INSERT INTO "{schema}"."{table_name}" 
-                    ({', '.join(attr_cols)}, "{geometry_column}")
-                    VALUES ({placeholders}, ST_GeomFromText(${len(attrs)+1}, {srid}))
-                """
-                await conn.execute(insert_sql, *attrs, geom_wkt)
-                insert_count += 1
-        
-        # 创建空间索引
-        index_name = f"{table_name}_{geometry_column}_idx"
-        create_index_sql = f"""
-            CREATE INDEX IF NOT EXISTS "{index_name}"
-            ON "{schema}"."{table_name}"
-            USING GIST ("{geometry_column}")
-        """
-        await conn.execute(create_index_sql)
-        
-        result = {
-            "table_name": f"{schema}.{table_name}",
-            "geometry_type": geom_type,
-            "srid": srid,
-            "feature_count": insert_count,
-            "columns": list(gdf.columns),
-            "bounds": gdf.total_bounds.tolist()
-        }
-        
-        logger.info(f"成功导入 {insert_count} 个要素到 {schema}.{table_name}")
-        return result
         
     except Exception as e:
         logger.error(f"导入 GeoJSON 失败: {str(e)}")
         raise
-    finally:
-        await conn.close()
+
+
+# numpy 数据类型到 PostGIS 栅格像素类型编码(WKB 中的 pixtype)
+_RASTER_PIXEL_TYPES = {
+    "int8": 3,      # 8BSI
+    "uint8": 4,     # 8BUI
+    "int16": 5,     # 16BSI
+    "uint16": 6,    # 16BUI
+    "int32": 7,     # 32BSI
+    "uint32": 8,    # 32BUI
+    "float32": 10,  # 32BF
+    "float64": 11,  # 64BF
+}
+# 并行读取(及重投影)瓦片的线程数，GDAL 读取和重采样期间释放 GIL
+_RASTER_WORKERS = min(os.cpu_count() or 1, 8)
+# 每次 executemany 写入的瓦片数，平均分给各读取线程
+_RASTER_TILE_BATCH = 4 * _RASTER_WORKERS
+# 栅格 WKB 头: 字节序、版本、波段数、缩放/左上角/旋转、SRID、宽、高(小端)
+_RASTER_WKB_HEADER = struct.Struct("<BHHddddddiHH")
+
+
+def _raster_wkb(data: "np.ndarray", tile_transform, srid: int, nodata) -> bytes:
+    """
+    将一个瓦片的像元数组编码为 PostGIS 栅格 WKB
+    
+    像元数据以原始字节整体写入，数据库端用 ST_RastFromWKB 直接解析，
+    不需要逐像元构造 Python 对象或在服务端逐个设置像元值
+    
+    Args:
+        data: (波段, 行, 列) 像元数组
+        tile_transform: 瓦片的仿射变换
+        srid: 空间参考系统ID
+        nodata: 无数据值，None 表示没有
+        
+    Returns:
+        栅格 WKB
+    """
+    if str(data.dtype) not in _RASTER_PIXEL_TYPES:
+        data = data.astype(np.float64)
+    dtype = data.dtype.newbyteorder("<")
+    pixel_type = _RASTER_PIXEL_TYPES[str(data.dtype)]
+    
+    band_count, height, width = data.shape
+    parts = [_RASTER_WKB_HEADER.pack(
+        1, 0, band_count,
+        tile_transform.a, tile_transform.e,
+        tile_transform.c, tile_transform.f,
+        tile_transform.b, tile_transform.d,
+        srid, width, height
+    )]
+    # 波段标志: 低 4 位为像素类型，0x40 表示存在无数据值；无数据值字段总是写入
+    flags = bytes([pixel_type | (0x40 if nodata is not None else 0)])
+    nodata_bytes = np.array(0 if nodata is None else nodata, dtype=dtype).tobytes()
+    for band in data:
+        parts.append(flags)
+        parts.append(nodata_bytes)
+        parts.append(band.astype(dtype, copy=False).tobytes())
+    return b"".join(parts)
+
+
+def _read_raster_tile(dataset, window: "Window", srid: int, filename: str, nodata) -> tuple:
+    """
+    读取一个瓦片窗口并转换为写入参数
+    
+    Args:
+        dataset: rasterio 数据集(或重投影后的 WarpedVRT)
+        window: 瓦片窗口
+        srid: 空间参考系统ID
+        filename: 源文件名
+        nodata: 无数据值
+        
+    Returns:
+        (栅格 WKB, 文件名)
+    """
+    data = dataset.read(window=window)
+    tile_transform = window_transform(window, dataset.transform)
+    return (_raster_wkb(data, tile_transform, srid, nodata), filename)
+
+
+def _read_raster_tiles(
+    file_path: str,
+    crs: Optional[str],
+    windows: List["Window"],
+    srid: int,
+    filename: str,
+    nodata
+) -> List[tuple]:
+    """
+    在工作线程中读取一组瓦片(同步函数)
+    
+    rasterio 数据集不能跨线程共享，每个线程单独打开文件
+    
+    Args:
+        file_path: GeoTIFF 文件路径
+        crs: 需要重投影时的目标坐标系，None 表示不重投影
+        windows: 瓦片窗口列表
+        srid: 空间参考系统ID
+        filename: 源文件名
+        nodata: 无数据值
+        
+    Returns:
+        按 windows 顺序排列的写入参数列表
+    """
+    with rasterio.open(file_path) as src:
+        dataset = WarpedVRT(src, crs=crs) if crs else src
+        try:
+            return [
+                _read_raster_tile(dataset, window, srid, filename, nodata)
+                for window in windows
+            ]
+        finally:
+            if dataset is not src:
+                dataset.close()
 
 
 async def import_geotiff(
@@ -353,40 +457,162 @@ async def import_geotiff(
         table_name: 目标表名
         schema: 数据库模式名
         srid: 目标空间参考系统ID(如果为None则使用文件原始SRID)
-        tile_size: 瓦片大小
+        tile_size: 瓦片大小(像元)，按此分块读取和写入
         overview_levels: 概览层级
         
     Returns:
         导入结果信息
     """
-    conn = await get_db_connection()
-    try:
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"文件不存在: {file_path}")
-        
-        logger.info(f"正在读取 GeoTIFF: {file_path}")
+    async with db_config.acquire() as conn:
+        try:
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"文件不存在: {file_path}")
+            
+            logger.info(f"正在读取 GeoTIFF: {file_path}")
+            
+            with rasterio.open(file_path) as src:
+                # 获取栅格元数据
+                src_srid = src.crs.to_epsg() if src.crs else None
+                target_srid = srid if srid else src_srid
+                
+                if target_srid is None:
+                    raise ValueError("无法确定空间参考系统")
+                
+                # 建表、写入瓦片和建索引在同一事务中完成，只提交一次，失败时整体回滚
+                async with conn.transaction():
+                    # 创建栅格表
+                    create_table_sql = f"""
+                        CREATE TABLE IF NOT EXISTS "{schema}"."{table_name}" (
+                            rid SERIAL PRIMARY KEY,
+                            rast raster,
+                            filename TEXT
+                        )
+                    """
+                    await conn.execute(f'DROP TABLE IF EXISTS "{schema}"."{table_name}" CASCADE')
+                    await conn.execute(create_table_sql)
+                    
+                    # 需要重投影时通过 WarpedVRT 按窗口读取，像素在读取瓦片时才重投影
+                    crs = None
+                    if src_srid != target_srid:
+                        logger.info(f"重投影栅格从 EPSG:{src_srid} 到 EPSG:{target_srid}")
+                        crs = f'EPSG:{target_srid}'
+                    
+                    dataset = WarpedVRT(src, crs=crs) if crs else src
+                    try:
+                        dtype = dataset.dtypes[0]
+                        nodata = float(dataset.nodata) if dataset.nodata is not None else None
+                        transform = dataset.transform
+                        width, height = dataset.width, dataset.height
+                        bounds = dataset.bounds
+                        band_count = dataset.count
+                    finally:
+                        if dataset is not src:
+                            dataset.close()
+                    
+                    filename = os.path.basename(file_path)
+                    insert_sql = f"""
+                        INSERT INTO "{schema}"."{table_name}" (rast, filename)
+                        VALUES (ST_RastFromWKB($1), $2)
+                    """
+                    windows = [
+                        Window(
+                            col_off, row_off,
+                            min(tile_size, width - col_off),
+                            min(tile_size, height - row_off)
+                        )
+                        for row_off in range(0, height, tile_size)
+                        for col_off in range(0, width, tile_size)
+                    ]
+                    
+                    # 按批读取瓦片，每批分给多个线程并行读取，按原顺序写入；
+                    # 内存占用只与 tile_size 和批大小有关
+                    tile_count = 0
+                    loop = asyncio.get_running_loop()
+                    with ThreadPoolExecutor(max_workers=_RASTER_WORKERS) as executor:
+                        for start in range(0, len(windows), _RASTER_TILE_BATCH):
+                            batch = windows[start:start + _RASTER_TILE_BATCH]
+                            step = -(-len(batch) // _RASTER_WORKERS)
+                            chunks = await asyncio.gather(*(
+                                loop.run_in_executor(
+                                    executor, _read_raster_tiles, file_path, crs,
+                                    batch[i:i + step], target_srid, filename, nodata
+                                )
+                                for i in range(0, len(batch), step)
+                            ))
+                            records = [record for chunk in chunks for record in chunk]
+                            await conn.executemany(
+                                insert_sql, records, timeout=db_config.bulk_timeout
+                            )
+                            tile_count += len(records)
+                    
+                    pixel_size_x = transform[0]
+                    pixel_size_y = -transform[4]  # y方向通常是负的
+                    
+                    # 创建空间索引
+                    index_sql = f"""
+                        CREATE INDEX IF NOT EXISTS "{table_name}_rast_idx"
+                        ON "{schema}"."{table_name}"
+                        USING GIST (ST_ConvexHull(rast))
+                    """
+                    await conn.execute(index_sql, timeout=db_config.bulk_timeout)
+                
+                result = {
+                    "table_name": f"{schema}.{table_name}",
+                    "srid": target_srid,
+                    "width": width,
+                    "height": height,
+                    "bands": band_count,
+                    "dtype": str(dtype),
+                    "bounds": [bounds.left, bounds.bottom, bounds.right, bounds.top],
+                    "pixel_size": [pixel_size_x, pixel_size_y],
+                    "tile_count": tile_count
+                }
+                
+                logger.info(f"成功导入 GeoTIFF 到 {schema}.{table_name}: {tile_count} 个瓦片")
+                return result
+                
+        except Exception as e:
+            logger.error(f"导入 GeoTIFF 失败: {str(e)}")
+            raise
+
+
+async def import_png_as_georeferenced(
+    file_path: str,
+    table_name: str,
+    bounds: List[float],
+    schema: str = "public",
+    srid: int = 4326
+) -> Dict[str, Any]:
+    """
+    导入 PNG 图像作为地理配准栅格
+    
+    Args:
+        file_path: PNG 文件路径
+        table_name: 目标表名
+        bounds: 地理边界 [minx, miny, maxx, maxy]
+        schema: 数据库模式名
+        srid: 空间参考系统ID
         
-        with rasterio.open(file_path) as src:
-            # 获取栅格元数据
-            meta = src.meta.copy()
-            src_srid = src.crs.to_epsg() if src.crs else None
-            target_srid = srid if srid else src_srid
+    Returns:
+        导入结果信息
+    """
+    async with db_config.acquire() as conn:
+        try:
+            if not os.path.exists(file_path):
+                raise FileNotFoundError(f"文件不存在: {file_path}")
             
-            if target_srid is None:
-                raise ValueError("无法确定空间参考系统")
+            logger.info(f"正在读取 PNG: {file_path}")
             
-            # 如果需要重投影
-            if src_srid != target_srid:
-                logger.info(f"重投影栅格从 EPSG:{src_srid} 到 EPSG:{target_srid}")
-                transform, width, height = calculate_default_transform(
-                    src.crs, f'EPSG:{target_srid}', src.width, src.height, *src.bounds
-                )
-                meta.update({
-                    'crs': f'EPSG:{target_srid}',
-                    'transform': transform,
-                    'width': width,
-                    'height': height
-                })
+            # 使用 PIL 读取 PNG
+            img = Image.open(file_path)
+            img_array = np.array(img)
+            
+            width, height = img.size
+            minx, miny, maxx, maxy = bounds
+            
+            # 计算像素大小
+            pixel_size_x = (maxx - minx) / width
+            pixel_size_y = (maxy - miny) / height
             
             # 创建栅格表
             create_table_sql = f"""
@@ -399,55 +625,21 @@ async def import_geotiff(
             await conn.execute(f'DROP TABLE IF EXISTS "{schema}"."{table_name}" CASCADE')
             await conn.execute(create_table_sql)
             
-            # 读取栅格数据
-            if src_srid != target_srid:
-                # 需要重投影
-                data = np.empty((src.count, height, width), dtype=meta['dtype'])
-                for i in range(1, src.count + 1):
-                    reproject(
-                        source=rasterio.band(src, i),
-                        destination=data[i-1],
-                        src_transform=src.transform,
-                        src_crs=src.crs,
-                        dst_transform=transform,
-                        dst_crs=f'EPSG:{target_srid}',
-                        resampling=Resampling.bilinear
-                    )
-            else:
-                data = src.read()
-                transform = src.transform
-            
-            # 将栅格数据编码为 WKB 格式并插入
-            bounds = src.bounds
-            pixel_size_x = transform[0]
-            pixel_size_y = -transform[4]  # y方向通常是负的
-            
-            # 使用 ST_AddBand 构建栅格
-            bands_data = []
-            for band_idx in range(data.shape[0]):
-                band_data = data[band_idx].flatten().tolist()
-                bands_data.append(band_data)
-            
-            # 插入栅格(简化版本 - 实际应用中可能需要分块处理)
+            # 插入栅格数据
             insert_sql = f"""
                 INSERT INTO "{schema}"."{table_name}" (rast, filename)
                 VALUES (
-                    ST_AddBand(
-                        ST_MakeEmptyRaster(
-                            $1, $2, $3, $4, $5, $6, 0, 0, $7
-                        ),
-                        '8BUI'::text, 0, 0
-                    ),
+                    ST_MakeEmptyRaster($1, $2, $3, $4, $5, $6, 0, 0, $7),
                     $8
                 )
             """
             
             await conn.execute(
                 insert_sql,
-                meta['width'], meta['height'],
-                bounds.left, bounds.top,
-                pixel_size_x, pixel_size_y,
-                target_srid,
+                width, height,
+                minx, maxy,  # 左上角
+                pixel_size_x, -pixel_size_y,  # y方向是负的
+                srid,
                 os.path.basename(file_path)
             )
             
@@ -461,118 +653,49 @@ async def import_geotiff(
             
             result = {
                 "table_name": f"{schema}.{table_name}",
-                "srid": target_srid,
-                "width": meta['width'],
-                "height": meta['height'],
-                "bands": src.count,
-                "dtype": str(meta['dtype']),
-                "bounds": [bounds.left, bounds.bottom, bounds.right, bounds.top],
-                "pixel_size": [pixel_size_x, pixel_size_y]
+                "srid": srid,
+                "width": width,
+                "height": height,
+                "bounds": bounds,
+                "pixel_size": [pixel_size_x, pixel_size_y],
+                "mode": img.mode
             }
             
-            logger.info(f"成功导入 GeoTIFF 到 {schema}.{table_name}")
+            logger.info(f"成功导入 PNG 到 {schema}.{table_name}")
             return result
             
-    except Exception as e:
-        logger.error(f"导入 GeoTIFF 失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+        except Exception as e:
+            logger.error(f"导入 PNG 失败: {str(e)}")
+            raise
 
 
-async def import_png_as_georeferenced(
-    file_path: str,
-    table_name: str,
-    bounds: List[float],
-    schema: str = "public",
-    srid: int = 4326
-) -> Dict[str, Any]:
-    """
-    导入 PNG 图像作为地理配准栅格
-    
-    Args:
-        file_path: PNG 文件路径
-        table_name: 目标表名
-        bounds: 地理边界 [minx, miny, maxx, maxy]
-        schema: 数据库模式名
-        srid: 空间参考系统ID
-        
-    Returns:
-        导入结果信息
-    """
-    conn = await get_db_connection()
-    try:
-        if not os.path.exists(file_path):
-            raise FileNotFoundError(f"文件不存在: {file_path}")
-        
-        logger.info(f"正在读取 PNG: {file_path}")
-        
-        # 使用 PIL 读取 PNG
-        img = Image.open(file_path)
-        img_array = np.array(img)
-        
-        width, height = img.size
-        minx, miny, maxx, maxy = bounds
-        
-        # 计算像素大小
-        pixel_size_x = (maxx - minx) / width
-        pixel_size_y = (maxy - miny) / height
-        
-        # 创建栅格表
-        create_table_sql = f"""
-            CREATE TABLE IF NOT EXISTS "{schema}"."{table_name}" (
-                rid SERIAL PRIMARY KEY,
-                rast raster,
-                filename TEXT
-            )
-        """
-        await conn.execute(f'DROP TABLE IF EXISTS "{schema}"."{table_name}" CASCADE')
-        await conn.execute(create_table_sql)
-        
-        # 插入栅格数据
-        insert_sql = f"""
-            INSERT INTO "{schema}"."{table_name}" (rast, filename)
-            VALUES (
-                ST_MakeEmptyRaster($1, $2, $3, $4, $5, $6, 0, 0, $7),
-                $8
-            )
-        """
-        
-        await conn.execute(
-            insert_sql,
-            width, height,
-            minx, maxy,  # 左上角
-            pixel_size_x, -pixel_size_y,  # y方向是负的
-            srid,
-            os.path.basename(file_path)
-        )
-        
-        # 创建空间索引
-        index_sql = f"""
-            CREATE INDEX IF NOT EXISTS "{table_name}_rast_idx"
-            ON "{schema}"."{table_name}"
-            USING GIST (ST_ConvexHull(rast))
-        """
-        await conn.execute(index_sql)
-        
-        result = {
-            "table_name": f"{schema}.{table_name}",
-            "srid": srid,
-            "width": width,
-            "height": height,
-            "bounds": bounds,
-            "pixel_size": [pixel_size_x, pixel_size_y],
-            "mode": img.mode
+# 支持的导入格式(静态数据，只读)
+_SUPPORTED_FORMATS = {
+    "vector_formats": {
+        "shapefile": {
+            "extension": ".shp",
+            "description": "ESRI Shapefile",
+            "function": "import_shapefile"
+        },
+        "geojson": {
+            "extension": ".geojson, .json",
+            "description": "GeoJSON",
+            "function": "import_geojson"
         }
-        
-        logger.info(f"成功导入 PNG 到 {schema}.{table_name}")
-        return result
-        
-    except Exception as e:
-        logger.error(f"导入 PNG 失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    },
+    "raster_formats": {
+        "geotiff": {
+            "extension": ".tif, .tiff",
+            "description": "GeoTIFF",
+            "function": "import_geotiff"
+        },
+        "png": {
+            "extension": ".png",
+            "description": "PNG (需要地理配准信息)",
+            "function": "import_png_as_georeferenced"
+        }
+    }
+}
 
 
 async def list_supported_formats() -> Dict[str, Any]:
@@ -582,29 +705,4 @@ async def list_supported_formats() -> Dict[str, Any]:
     Returns:
         支持的格式列表
     """
-    return {
-        "vector_formats": {
-            "shapefile": {
-                "extension": ".shp",
-                "description": "ESRI Shapefile",
-                "function": "import_shapefile"
-            },
-            "geojson": {
-                "extension": ".geojson, .json",
-                "description": "GeoJSON",
-                "function": "import_geojson"
-            }
-        },
-        "raster_formats": {
-            "geotiff": {
-                "extension": ".tif, .tiff",
-                "description": "GeoTIFF",
-                "function": "import_geotiff"
-            },
-            "png": {
-                "extension": ".png",
-                "description": "PNG (需要地理配准信息)",
-                "function": "import_png_as_georeferenced"
-            }
-        }
-    }
\ No newline at end of file
+    return _SUPPORTED_FORMATS
\ No newline at end of file
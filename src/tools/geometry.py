@@ -2,87 +2,311 @@
 几何操作工具模块
 提供基于 PostGIS 的几何操作功能
 """
-from typing import Dict, Any, Optional
-import asyncpg
+from typing import Dict, Any, Optional, List
+from functools import lru_cache
 import logging
 
 from ..config import db_config
+from .srid import geography_srid
 
 logger = logging.getLogger(__name__)
 
+# Web Mercator，面积/长度计算统一投影到该坐标系(与数据库端 ST_Transform(g, 3857) 一致)
+WEB_MERCATOR_SRID = 3857
 
-async def get_db_connection() -> asyncpg.Connection:
+db_config.register_statement("geometry_area", """
+    SELECT ST_Area(ST_Transform(ST_GeomFromText($1, $2), 3857)) as area_sqm
+""")
+db_config.register_statement("geometry_length", """
+    SELECT ST_Length(ST_Transform(ST_GeomFromText($1, $2), 3857)) as length_m
+""")
+db_config.register_statement("geometry_transform", """
+    SELECT 
+        ST_AsText(ST_Transform(ST_GeomFromText($1, $2), $3)) as transformed_geom
+""")
+
+
+@lru_cache(maxsize=32)
+def _get_transformer(from_srid: int, to_srid: int):
+    """获取并缓存 pyproj 坐标转换器"""
+    from pyproj import Transformer
+    return Transformer.from_crs(f"EPSG:{from_srid}", f"EPSG:{to_srid}", always_xy=True)
+
+
+def load_local_geometry(geometry_wkt: str, to_srid: Optional[int] = None, srid: int = 4326):
+    """
+    在本进程内解析WKT(可选投影到目标坐标系)，避免一次数据库往返
+    
+    Args:
+        geometry_wkt: WKT格式的几何对象
+        to_srid: 目标空间参考系统ID，None 表示不投影
+        srid: 输入几何的空间参考系统ID
+        
+    Returns:
+        shapely 几何对象；shapely/pyproj 不可用或解析失败时返回 None，由数据库计算
+    """
+    try:
+        import numpy as np
+        import shapely
+        
+        geom = shapely.from_wkt(geometry_wkt)
+        if geom is None or geom.is_empty:
+            return None
+        if to_srid is None or to_srid == srid:
+            return geom
+        
+        transformer = _get_transformer(srid, to_srid)
+        return shapely.transform(
+            geom,
+            lambda coords: np.column_stack(transformer.transform(coords[:, 0], coords[:, 1]))
+        )
+    except Exception as e:
+        logger.debug(f"本地几何计算不可用，改由数据库计算: {str(e)}")
+        return None
+
+
+# 几何输出格式: wkt 为文本；twkb 为 base64 编码的 Tiny WKB，体积通常只有 WKT 的几分之一；
+# ewkb 为十六进制的 EWKB，无损且带 SRID
+_GEOMETRY_FORMATS = ("wkt", "twkb", "ewkb")
+
+
+async def geometry_output_sql(expr: str, geometry_format: str, srid: int) -> str:
     """
-    获取数据库连接
+    生成输出几何的SQL表达式
     
+    twkb 按坐标系保留约 1 厘米的精度: 地理坐标系保留 7 位小数，投影坐标系保留 2 位；
+    ewkb 为带 SRID 的二进制几何的十六进制文本，无损且 PostGIS 无需格式化坐标文本
+    
+    Args:
+        expr: 几何SQL表达式
+        geometry_format: wkt / twkb / ewkb
+        srid: 输出几何的空间参考系统ID
+        
     Returns:
-        数据库连接对象
-    """
-    conn = await asyncpg.connect(
-        host=db_config.host,
-        port=db_config.port,
-        database=db_config.database,
-        user=db_config.user,
-        password=db_config.password
+        SQL表达式
+    """
+    if geometry_format == "wkt":
+        return f"ST_AsText({expr})"
+    if geometry_format == "twkb":
+        digits = 7 if await geography_srid(srid) == srid else 2
+        return f"encode(ST_AsTWKB({expr}, {digits}), 'base64')"
+    if geometry_format == "ewkb":
+        return f"encode(ST_AsEWKB({expr}), 'hex')"
+    raise ValueError(
+        f"不支持的几何输出格式: {geometry_format}，可选: {', '.join(_GEOMETRY_FORMATS)}"
     )
-    return conn
+
+
+def wkt_to_wkb(geometries_wkt: List[str]) -> Optional[List[bytes]]:
+    """
+    在本进程内批量将WKT转换为WKB，以二进制参数传给数据库
+    
+    Args:
+        geometries_wkt: WKT格式的几何对象列表
+        
+    Returns:
+        WKB 列表；shapely 不可用或解析失败时返回 None
+    """
+    try:
+        import shapely
+        
+        return list(shapely.to_wkb(shapely.from_wkt(geometries_wkt)))
+    except Exception as e:
+        logger.debug(f"本地WKT转换不可用，改由数据库解析: {str(e)}")
+        return None
+
+
+def wkb_to_wkt(geometry_wkb) -> str:
+    """
+    在本进程内将(E)WKB 转换为 WKT，用于按需展示 ewkb 格式的结果
+    
+    Args:
+        geometry_wkb: WKB 字节串或其十六进制文本
+        
+    Returns:
+        WKT 字符串
+    """
+    import shapely
+    
+    return shapely.to_wkt(shapely.from_wkb(geometry_wkb))
+
+
+# create_buffer 策略阈值
+# 顶点数超过该值的线要素改为分段缓冲后合并(buffer-by-union)
+_COMPLEX_LINE_POINTS = 1000
+# 分段缓冲时每段的顶点数
+_BUFFER_CHUNK_POINTS = 500
+# 缓冲距离超过几何外包框尺寸该倍数时改为多次小距离缓冲(repeated buffer)
+_LARGE_BUFFER_RATIO = 100
+_REPEATED_BUFFER_PASSES = 4
+# 顶点数超过该值时，缓冲前自动以 distance/100 的容差简化
+_PRE_SIMPLIFY_POINTS = 5000
+
+_BUFFER_STRATEGIES = ("auto", "plain", "union", "repeated")
+
+
+def _choose_buffer_strategy(geom, distance: float) -> str:
+    """
+    根据几何复杂度选择缓冲策略
+    
+    Args:
+        geom: 投影到 3857 的 shapely 几何对象，None 时使用 plain
+        distance: 缓冲距离（米）
+        
+    Returns:
+        plain / union / repeated
+    """
+    if geom is None:
+        return "plain"
+    
+    import shapely
+    
+    if (
+        geom.geom_type in ("LineString", "MultiLineString")
+        and shapely.get_num_coordinates(geom) > _COMPLEX_LINE_POINTS
+    ):
+        return "union"
+    
+    min_x, min_y, max_x, max_y = geom.bounds
+    extent = max(max_x - min_x, max_y - min_y)
+    if extent > 0 and distance > _LARGE_BUFFER_RATIO * extent:
+        return "repeated"
+    
+    return "plain"
 
 
 async def create_buffer(
     geometry_wkt: str,
     distance: float,
-    srid: int = 4326
+    srid: int = 4326,
+    strategy: str = "auto",
+    pre_simplify_tolerance: Optional[float] = None,
+    geometry_format: str = "wkt"
 ) -> Dict[str, Any]:
     """
     创建几何缓冲区
     
+    复杂线要素直接 ST_Buffer 容易产生大量交织的曲线边，GEOS 耗时和内存会急剧上升，
+    因此按几何复杂度选择缓冲方式:
+    - plain: 直接 ST_Buffer
+    - union: 将线按顶点分段，分别缓冲后 ST_Union 合并(只适用于线，点、面回退为 plain)
+    - repeated: 分多次以较小距离缓冲，每次之间用 ST_SimplifyPreserveTopology 简化
+    
     Args:
         geometry_wkt: WKT格式的几何对象
         distance: 缓冲距离（米）
         srid: 空间参考系统ID
+        strategy: 缓冲策略 (auto, plain, union, repeated)，默认 auto 自动选择
+        pre_simplify_tolerance: 缓冲前 ST_SimplifyPreserveTopology 的容差（米）；
+                                None 表示顶点数超过 5000 时自动按 distance/100 简化，0 表示不简化
+        geometry_format: 输出几何格式 wkt、twkb(base64) 或 ewkb(十六进制)
         
     Returns:
         包含缓冲区几何的字典
     """
-    conn = await get_db_connection()
-    try:
-        query = """
+    if strategy not in _BUFFER_STRATEGIES:
+        raise ValueError(
+            f"不支持的缓冲策略: {strategy}，可选: {', '.join(_BUFFER_STRATEGIES)}"
+        )
+    
+    geom = None
+    if strategy in ("auto", "union") or pre_simplify_tolerance is None:
+        geom = load_local_geometry(geometry_wkt, WEB_MERCATOR_SRID, srid)
+    if strategy == "auto":
+        strategy = _choose_buffer_strategy(geom, distance)
+    elif (
+        strategy == "union" and geom is not None
+        and geom.geom_type not in ("LineString", "MultiLineString")
+    ):
+        # 分段只对线有意义，点、面直接缓冲
+        strategy = "plain"
+    if pre_simplify_tolerance is None:
+        pre_simplify_tolerance = 0
+        if geom is not None:
+            import shapely
+            
+            if shapely.get_num_coordinates(geom) > _PRE_SIMPLIFY_POINTS:
+                pre_simplify_tolerance = distance / 100
+    
+    source = "ST_Transform(ST_GeomFromText($1, $2), 3857)"
+    output = await geometry_output_sql("ST_Transform(geom, $2)", geometry_format, srid)
+    
+    if strategy == "union":
+        args = [geometry_wkt, srid, distance, _BUFFER_CHUNK_POINTS]
+    elif strategy == "repeated":
+        step = distance / _REPEATED_BUFFER_PASSES
+        args = [geometry_wkt, srid, step, step * 0.01]
+    else:
+        args = [geometry_wkt, srid, distance]
+    
+    if pre_simplify_tolerance:
+        args.append(pre_simplify_tolerance)
+        source = f"ST_SimplifyPreserveTopology({source}, ${len(args)})"
+    
+    if strategy == "union":
+        query = f"""
+            WITH src AS (
+                SELECT (ST_Dump({source})).geom AS line
+            ),
+            parts AS (
+                -- 本地无法解析几何时类型未经检查，非线部分不分段
+                SELECT CASE
+                    WHEN ST_Dimension(line) = 1
+                        THEN ST_LineSubstring(line, i::float8 / k, (i + 1)::float8 / k)
+                    ELSE line
+                END AS part
+                FROM src
+                CROSS JOIN LATERAL (
+                    SELECT CASE
+                        WHEN ST_Dimension(line) = 1
+                            THEN GREATEST(1, CEIL(ST_NPoints(line)::float8 / $4)::int)
+                        ELSE 1
+                    END AS k
+                ) c
+                CROSS JOIN LATERAL generate_series(0, c.k - 1) AS i
+            ),
+            buf AS (
+                SELECT ST_Union(ST_Buffer(part, $3)) AS geom FROM parts
+            )
             SELECT 
-                ST_AsText(
-                    ST_Transform(
-                        ST_Buffer(
-                            ST_Transform(ST_GeomFromText($1, $2), 3857),
-                            $3
-                        ),
-                        $2
-                    )
-                ) as buffer_geom,
-                ST_Area(
-                    ST_Transform(
-                        ST_Buffer(
-                            ST_Transform(ST_GeomFromText($1, $2), 3857),
-                            $3
-                        ),
-                        3857
-                    )
-                ) as area
+                {output} as buffer_geom,
+                ST_Area(geom) as area
+            FROM buf
         """
-        
-        row = await conn.fetchrow(query, geometry_wkt, srid, distance)
-        
-        result = {
-            "buffer_geometry": row["buffer_geom"],
-            "area_sqm": float(row["area"])
-        }
-        
-        logger.info(f"创建缓冲区成功，面积: {result['area_sqm']} 平方米")
-        return result
-        
-    except Exception as e:
-        logger.error(f"创建缓冲区失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    else:
+        if strategy == "repeated":
+            expr = source
+            for _ in range(_REPEATED_BUFFER_PASSES):
+                expr = f"ST_Buffer(ST_SimplifyPreserveTopology({expr}, $4), $3)"
+        else:
+            expr = f"ST_Buffer({source}, $3)"
+        query = f"""
+            WITH buf AS (
+                SELECT {expr} AS geom
+            )
+            SELECT 
+                {output} as buffer_geom,
+                ST_Area(geom) as area
+            FROM buf
+        """
+    
+    async with db_config.acquire() as conn:
+        try:
+            row = await conn.fetchrow(query, *args)
+            
+            result = {
+                "buffer_geometry": row["buffer_geom"],
+                "area_sqm": float(row["area"]),
+                "strategy": strategy,
+                "geometry_format": geometry_format
+            }
+            
+            logger.info(f"创建缓冲区成功({strategy})，面积: {result['area_sqm']} 平方米")
+            return result
+            
+        except Exception as e:
+            logger.error(f"创建缓冲区失败: {str(e)}")
+            raise
 
 
 async def calculate_area(
@@ -99,29 +323,32 @@ async def calculate_area(
     Returns:
         包含面积信息的字典
     """
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT 
-                ST_Area(ST_Transform(ST_GeomFromText($1, $2), 3857)) as area_sqm,
-                ST_Area(ST_Transform(ST_GeomFromText($1, $2), 3857)) / 1000000.0 as area_sqkm
-        """
-        
-        row = await conn.fetchrow(query, geometry_wkt, srid)
-        
-        result = {
-            "area_square_meters": float(row["area_sqm"]),
-            "area_square_kilometers": float(row["area_sqkm"])
+    geom = load_local_geometry(geometry_wkt, WEB_MERCATOR_SRID, srid)
+    if geom is not None:
+        area = float(geom.area)
+        return {
+            "area_square_meters": area,
+            "area_square_kilometers": area / 1000000.0
         }
-        
-        logger.info(f"计算面积: {result['area_square_meters']} 平方米")
-        return result
-        
-    except Exception as e:
-        logger.error(f"计算面积失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    
+    async with db_config.acquire() as conn:
+        try:
+            row = await db_config.run_statement(
+                conn, "geometry_area", geometry_wkt, srid, method="fetchrow"
+            )
+            
+            area = float(row["area_sqm"])
+            result = {
+                "area_square_meters": area,
+                "area_square_kilometers": area / 1000000.0
+            }
+            
+            logger.info(f"计算面积: {result['area_square_meters']} 平方米")
+            return result
+            
+        except Exception as e:
+            logger.error(f"计算面积失败: {str(e)}")
+            raise
 
 
 async def calculate_length(
@@ -138,29 +365,32 @@ async def calculate_length(
     Returns:
         包含长度信息的字典
     """
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT 
-                ST_Length(ST_Transform(ST_GeomFromText($1, $2), 3857)) as length_m,
-                ST_Length(ST_Transform(ST_GeomFromText($1, $2), 3857)) / 1000.0 as length_km
-        """
-        
-        row = await conn.fetchrow(query, geometry_wkt, srid)
-        
-        result = {
-            "length_meters": float(row["length_m"]),
-            "length_kilometers": float(row["length_km"])
+    geom = load_local_geometry(geometry_wkt, WEB_MERCATOR_SRID, srid)
+    if geom is not None:
+        length = float(geom.length)
+        return {
+            "length_meters": length,
+            "length_kilometers": length / 1000.0
         }
-        
-        logger.info(f"计算长度: {result['length_meters']} 米")
-        return result
-        
-    except Exception as e:
-        logger.error(f"计算长度失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    
+    async with db_config.acquire() as conn:
+        try:
+            row = await db_config.run_statement(
+                conn, "geometry_length", geometry_wkt, srid, method="fetchrow"
+            )
+            
+            length = float(row["length_m"])
+            result = {
+                "length_meters": length,
+                "length_kilometers": length / 1000.0
+            }
+            
+            logger.info(f"计算长度: {result['length_meters']} 米")
+            return result
+            
+        except Exception as e:
+            logger.error(f"计算长度失败: {str(e)}")
+            raise
 
 
 async def transform_geometry(
@@ -179,73 +409,164 @@ async def transform_geometry(
     Returns:
         包含转换后几何的字典
     """
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT 
-                ST_AsText(ST_Transform(ST_GeomFromText($1, $2), $3)) as transformed_geom
-        """
-        
-        row = await conn.fetchrow(query, geometry_wkt, from_srid, to_srid)
-        
-        result = {
-            "transformed_geometry": row["transformed_geom"],
-            "from_srid": from_srid,
-            "to_srid": to_srid
-        }
-        
-        logger.info(f"坐标系统转换成功: {from_srid} -> {to_srid}")
-        return result
-        
-    except Exception as e:
-        logger.error(f"坐标系统转换失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    async with db_config.acquire() as conn:
+        try:
+            row = await db_config.run_statement(
+                conn, "geometry_transform", geometry_wkt, from_srid, to_srid, method="fetchrow"
+            )
+            
+            result = {
+                "transformed_geometry": row["transformed_geom"],
+                "from_srid": from_srid,
+                "to_srid": to_srid
+            }
+            
+            logger.info(f"坐标系统转换成功: {from_srid} -> {to_srid}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"坐标系统转换失败: {str(e)}")
+            raise
+
+
+# simplify_geometry 支持的简化算法
+_SIMPLIFY_FUNCTIONS = {
+    "dp": "ST_Simplify",
+    "vw": "ST_SimplifyVW",
+    "preserve_topology": "ST_SimplifyPreserveTopology",
+}
 
 
 async def simplify_geometry(
     geometry_wkt: str,
     tolerance: float,
-    srid: int = 4326
+    srid: int = 4326,
+    algorithm: str = "dp",
+    geometry_format: str = "wkt"
 ) -> Dict[str, Any]:
     """
     简化几何对象
     
     Args:
         geometry_wkt: WKT格式的几何对象
-        tolerance: 简化容差
+        tolerance: 简化容差(vw 算法为面积容差，单位为坐标单位的平方)
         srid: 空间参考系统ID
+        algorithm: 简化算法 dp(Douglas-Peucker)、vw(Visvalingam-Whyatt)、
+                   preserve_topology(保持拓扑的 Douglas-Peucker)
+        geometry_format: 输出几何格式 wkt、twkb(base64) 或 ewkb(十六进制)
         
     Returns:
         包含简化后几何的字典
     """
-    conn = await get_db_connection()
-    try:
-        query = """
-            SELECT 
-                ST_AsText(ST_Simplify(ST_GeomFromText($1, $2), $3)) as simplified_geom,
-                ST_NPoints(ST_GeomFromText($1, $2)) as original_points,
-                ST_NPoints(ST_Simplify(ST_GeomFromText($1, $2), $3)) as simplified_points
-        """
-        
-        row = await conn.fetchrow(query, geometry_wkt, srid, tolerance)
-        
-        result = {
-            "simplified_geometry": row["simplified_geom"],
-            "original_point_count": row["original_points"],
-            "simplified_point_count": row["simplified_points"],
-            "reduction_ratio": 1 - (row["simplified_points"] / row["original_points"])
-        }
-        
-        logger.info(
-            f"简化几何成功: {result['original_point_count']} -> "
-            f"{result['simplified_point_count']} 点"
+    simplify_func = _SIMPLIFY_FUNCTIONS.get(algorithm)
+    if simplify_func is None:
+        raise ValueError(
+            f"不支持的简化算法: {algorithm}，可选: {', '.join(_SIMPLIFY_FUNCTIONS)}"
         )
-        return result
+    output = await geometry_output_sql("s", geometry_format, srid)
+    
+    async with db_config.acquire() as conn:
+        try:
+            query = f"""
+                WITH src AS (
+                    SELECT ST_GeomFromText($1, $2) AS g
+                ),
+                simplified AS (
+                    SELECT g, {simplify_func}(g, $3) AS s FROM src
+                )
+                SELECT 
+                    {output} as simplified_geom,
+                    ST_NPoints(g) as original_points,
+                    ST_NPoints(s) as simplified_points
+                FROM simplified
+            """
+            
+            row = await conn.fetchrow(query, geometry_wkt, srid, tolerance)
+            
+            result = {
+                "simplified_geometry": row["simplified_geom"],
+                "original_point_count": row["original_points"],
+                "simplified_point_count": row["simplified_points"],
+                "reduction_ratio": 1 - (row["simplified_points"] / row["original_points"]),
+                "algorithm": algorithm,
+                "geometry_format": geometry_format
+            }
+            
+            logger.info(
+                f"简化几何成功: {result['original_point_count']} -> "
+                f"{result['simplified_point_count']} 点"
+            )
+            return result
+            
+        except Exception as e:
+            logger.error(f"简化几何失败: {str(e)}")
+            raise
+
+# batch_geometry_ops 支持的操作: 操作名 -> SELECT 表达式
+# g 为原始几何, g_m 为投影到 3857 后的几何(米制)
+_BATCH_OPS = {
+    "area": "ST_Area(g_m) AS area",
+    "length": "ST_Length(g_m) AS length",
+    "perimeter": "ST_Perimeter(g_m) AS perimeter",
+    "centroid": "ST_AsText(ST_Centroid(g)) AS centroid",
+    "envelope": "ST_AsText(ST_Envelope(g)) AS envelope",
+    "npoints": "ST_NPoints(g) AS npoints",
+    "geometry_type": "GeometryType(g) AS geometry_type",
+    "is_valid": "ST_IsValid(g) AS is_valid",
+}
+
+
+async def batch_geometry_ops(
+    geometry_wkt: str,
+    ops: Optional[List[str]] = None,
+    srid: int = 4326
+) -> Dict[str, Any]:
+    """
+    在一次查询中对同一几何对象执行多个计算
+    
+    WKT 只解析一次，多个结果在同一次往返中返回
+    
+    Args:
+        geometry_wkt: WKT格式的几何对象
+        ops: 操作列表 (area, length, perimeter, centroid, envelope,
+             npoints, geometry_type, is_valid)，默认 area/length/centroid
+        srid: 空间参考系统ID
         
-    except Exception as e:
-        logger.error(f"简化几何失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
\ No newline at end of file
+    Returns:
+        操作名到结果的字典，面积单位为平方米，长度单位为米
+    """
+    ops = ops or ["area", "length", "centroid"]
+    unknown = [op for op in ops if op not in _BATCH_OPS]
+    if unknown:
+        raise ValueError(
+            f"不支持的操作: {', '.join(unknown)}，可选: {', '.join(_BATCH_OPS)}"
+        )
+    
+    # 去重并保持顺序，保证相同操作组合生成相同的SQL以复用预编译语句
+    ops = list(dict.fromkeys(ops))
+    select_list = ",\n                    ".join(_BATCH_OPS[op] for op in ops)
+    
+    async with db_config.acquire() as conn:
+        try:
+            query = f"""
+                SELECT 
+                    {select_list}
+                FROM (
+                    SELECT g, ST_Transform(g, 3857) AS g_m
+                    FROM (SELECT ST_GeomFromText($1, $2) AS g) src
+                ) t
+            """
+            
+            row = await conn.fetchrow(query, geometry_wkt, srid)
+            
+            result = {op: row[op] for op in ops}
+            for op in ("area", "length", "perimeter"):
+                if op in result and result[op] is not None:
+                    result[op] = float(result[op])
+            
+            logger.info(f"批量几何计算完成: {', '.join(ops)}")
+            return result
+            
+        except Exception as e:
+            logger.error(f"批量几何计算失败: {str(e)}")
+            raise
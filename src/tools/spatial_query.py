@@ -2,30 +2,160 @@
 空间查询工具模块
 提供基于 PostGIS 的空间查询功能
 """
-from typing import Dict, List, Any, Optional
-import asyncpg
+from typing import Dict, List, Any, Optional, AsyncIterator
+import json
 import logging
 
 from ..config import db_config
+from .cache import catalog_cache
+from .srid import geography_srid
 
 logger = logging.getLogger(__name__)
 
+# json_agg 返回的结果集可能很大，优先使用 orjson 解析
+try:
+    from orjson import loads as _json_loads
+except ImportError:
+    _json_loads = json.loads
 
-async def get_db_connection() -> asyncpg.Connection:
+db_config.register_statement("geometry_srid", """
+    SELECT srid
+    FROM geometry_columns
+    WHERE f_table_schema = $1 AND f_table_name = $2 AND f_geometry_column = $3
+""")
+db_config.register_statement("has_gist_index", """
+    SELECT EXISTS (
+        SELECT 1
+        FROM pg_index i
+        JOIN pg_class t ON t.oid = i.indrelid
+        JOIN pg_namespace n ON n.oid = t.relnamespace
+        JOIN pg_class ix ON ix.oid = i.indexrelid
+        JOIN pg_am am ON am.oid = ix.relam
+        JOIN pg_attribute a ON a.attrelid = t.oid AND a.attnum = ANY(i.indkey)
+        WHERE n.nspname = $1 AND t.relname = $2
+          AND a.attname = $3 AND am.amname = 'gist'
+    )
+""")
+
+
+@catalog_cache.cached
+async def has_gist_index(
+    table_name: str,
+    geometry_column: str = "geom",
+    schema: str = "public"
+) -> bool:
     """
-    获取数据库连接
+    检查几何列上是否存在 GiST 索引(KNN <-> 排序依赖该索引)
     
+    Args:
+        table_name: 表名
+        geometry_column: 几何列名
+        schema: 模式名
+        
     Returns:
-        数据库连接对象
-    """
-    conn = await asyncpg.connect(
-        host=db_config.host,
-        port=db_config.port,
-        database=db_config.database,
-        user=db_config.user,
-        password=db_config.password
+        是否存在 GiST 索引
+    """
+    async with db_config.acquire() as conn:
+        return await db_config.run_statement(
+            conn, "has_gist_index", schema, table_name, geometry_column, method="fetchval"
+        )
+
+
+async def fetch_json_rows(
+    conn,
+    query: str,
+    *args,
+    order_by: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    在数据库端用 json_agg 将查询结果聚合为一个 JSON 数组后一次取回
+    
+    避免逐行构造 Record 和 dict；几何列按 PostGIS 的 json 转换输出为 GeoJSON 对象
+    
+    Args:
+        conn: 数据库连接
+        query: 原始查询SQL
+        *args: 查询参数
+        order_by: 聚合时的排序列(结果列名)，None 表示保持子查询顺序
+        
+    Returns:
+        结果字典列表
+    """
+    order = f" ORDER BY t.{order_by}" if order_by else ""
+    payload = await conn.fetchval(
+        f"SELECT coalesce(json_agg(t{order}), '[]'::json) FROM ({query}) t",
+        *args
     )
-    return conn
+    return _json_loads(payload)
+
+
+async def fetch_json_statement(conn, name: str, *args) -> Any:
+    """
+    执行在数据库端聚合为单个 JSON 值的预编译模板并解析
+    
+    Args:
+        conn: 数据库连接
+        name: register_statement 登记的模板名称
+        *args: 查询参数
+        
+    Returns:
+        解析后的 JSON 值
+    """
+    payload = await db_config.run_statement(conn, name, *args, method="fetchval")
+    return _json_loads(payload)
+
+
+async def stream_rows(
+    conn,
+    query: str,
+    *args,
+    prefetch: int = 1000,
+    settings: Optional[Dict[str, str]] = None
+) -> AsyncIterator[Any]:
+    """
+    用服务端游标分批读取查询结果
+    
+    每次只从服务端取回 prefetch 行，内存占用与批大小而不是结果集大小成正比；
+    适合逐行转换的大结果集。游标必须位于事务中，迭代期间连接保持占用
+    
+    Args:
+        conn: 数据库连接
+        query: 查询SQL
+        *args: 查询参数
+        prefetch: 每批取回的行数
+        settings: 仅在本事务内生效的会话参数(SET LOCAL)，如 {"jit": "on"}
+        
+    Yields:
+        asyncpg.Record
+    """
+    async with conn.transaction():
+        for name, value in (settings or {}).items():
+            await conn.execute("SELECT set_config($1, $2, true)", name, value)
+        async for row in conn.cursor(query, *args, prefetch=prefetch):
+            yield row
+
+
+@catalog_cache.cached
+async def get_geometry_srid(
+    table_name: str,
+    geometry_column: str = "geom",
+    schema: str = "public"
+) -> Optional[int]:
+    """
+    从 geometry_columns 获取几何列的SRID
+    
+    Args:
+        table_name: 表名
+        geometry_column: 几何列名
+        schema: 模式名
+        
+    Returns:
+        SRID，表或列未在 geometry_columns 中登记时返回 None
+    """
+    async with db_config.acquire() as conn:
+        return await db_config.run_statement(
+            conn, "geometry_srid", schema, table_name, geometry_column, method="fetchval"
+        )
 
 
 async def query_nearby_features(
@@ -49,49 +179,52 @@ async def query_nearby_features(
         
     Returns:
         查询结果列表
-    """
-    conn = await get_db_connection()
-    try:
-        # 创建点几何
-        point_wkt = f"POINT({longitude} {latitude})"
         
-        # 构建查询SQL
-        query = f"""
-            SELECT 
-                *,
-                ST_Distance(
-                    ST_Transform({geometry_column}, 4326)::geography,
-                    ST_GeogFromText('SRID=4326;{point_wkt}')
-                ) as distance
-            FROM {table_name}
-            WHERE ST_DWithin(
-                ST_Transform({geometry_column}, 4326)::geography,
-                ST_GeogFromText('SRID=4326;{point_wkt}'),
-                $1
+    Note:
+        地理坐标系(如 WGS84、CGCS2000)表的 ST_DWithin 条件直接使用 {geometry_column}::geography，
+        可命中表达式索引: CREATE INDEX ... USING GIST (({geometry_column}::geography))
+    """
+    schema, _, bare_table = table_name.rpartition(".")
+    srid = await get_geometry_srid(bare_table, geometry_column, schema or "public")
+    target_srid = await geography_srid(srid)
+    if target_srid == srid:
+        geog_expr = f"{geometry_column}::geography"
+    else:
+        geog_expr = f"ST_Transform({geometry_column}, 4326)::geography"
+    point_expr = "ST_SetSRID(ST_MakePoint($1, $2), 4326)"
+    if target_srid != 4326:
+        point_expr = f"ST_Transform({point_expr}, {target_srid})"
+    
+    async with db_config.acquire() as conn:
+        try:
+            # 构建查询SQL，查询点以参数绑定，不经过文本拼接
+            query = f"""
+                SELECT 
+                    *,
+                    ST_Distance(
+                        {geog_expr},
+                        {point_expr}::geography
+                    ) as distance
+                FROM {table_name}
+                WHERE ST_DWithin(
+                    {geog_expr},
+                    {point_expr}::geography,
+                    $3
+                )
+                ORDER BY distance
+                LIMIT $4
+            """
+            
+            results = await fetch_json_rows(
+                conn, query, longitude, latitude, radius, limit, order_by="distance"
             )
-            ORDER BY distance
-            LIMIT $2
-        """
-        
-        rows = await conn.fetch(query, radius, limit)
-        
-        # 转换为字典列表
-        results = []
-        for row in rows:
-            result = dict(row)
-            # 处理几何字段
-            if geometry_column in result:
-                result[geometry_column] = str(result[geometry_column])
-            results.append(result)
-        
-        logger.info(f"查询到 {len(results)} 个附近要素")
-        return results
-        
-    except Exception as e:
-        logger.error(f"查询附近要素失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+            
+            logger.info(f"查询到 {len(results)} 个附近要素")
+            return results
+            
+        except Exception as e:
+            logger.error(f"查询附近要素失败: {str(e)}")
+            raise
 
 
 async def query_within_bbox(
@@ -118,38 +251,29 @@ async def query_within_bbox(
     Returns:
         查询结果列表
     """
-    conn = await get_db_connection()
-    try:
-        # 构建边界框
-        bbox = f"POLYGON(({min_x} {min_y}, {max_x} {min_y}, {max_x} {max_y}, {min_x} {max_y}, {min_x} {min_y}))"
-        
-        query = f"""
-            SELECT *
-            FROM {table_name}
-            WHERE ST_Intersects(
-                ST_Transform({geometry_column}, 4326),
-                ST_GeomFromText('SRID=4326;{bbox}')
-            )
-            LIMIT $1
-        """
-        
-        rows = await conn.fetch(query, limit)
-        
-        results = []
-        for row in rows:
-            result = dict(row)
-            if geometry_column in result:
-                result[geometry_column] = str(result[geometry_column])
-            results.append(result)
-        
-        logger.info(f"查询到 {len(results)} 个边界框内要素")
-        return results
-        
-    except Exception as e:
-        logger.error(f"查询边界框内要素失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
+    async with db_config.acquire() as conn:
+        try:
+            # 构建边界框
+            bbox = f"POLYGON(({min_x} {min_y}, {max_x} {min_y}, {max_x} {max_y}, {min_x} {max_y}, {min_x} {min_y}))"
+            
+            query = f"""
+                SELECT *
+                FROM {table_name}
+                WHERE ST_Intersects(
+                    ST_Transform({geometry_column}, 4326),
+                    ST_GeomFromText('SRID=4326;{bbox}')
+                )
+                LIMIT $1
+            """
+            
+            results = await fetch_json_rows(conn, query, limit)
+            
+            logger.info(f"查询到 {len(results)} 个边界框内要素")
+            return results
+            
+        except Exception as e:
+            logger.error(f"查询边界框内要素失败: {str(e)}")
+            raise
 
 
 async def query_by_attribute(
@@ -172,29 +296,20 @@ async def query_by_attribute(
     Returns:
         查询结果列表
     """
-    conn = await get_db_connection()
-    try:
-        query = f"""
-            SELECT *
-            FROM {table_name}
-            WHERE {attribute_name} = $1
-            LIMIT $2
-        """
-        
-        rows = await conn.fetch(query, attribute_value, limit)
-        
-        results = []
-        for row in rows:
-            result = dict(row)
-            if geometry_column in result:
-                result[geometry_column] = str(result[geometry_column])
-            results.append(result)
-        
-        logger.info(f"根据属性查询到 {len(results)} 个要素")
-        return results
-        
-    except Exception as e:
-        logger.error(f"根据属性查询要素失败: {str(e)}")
-        raise
-    finally:
-        await conn.close()
\ No newline at end of file
+    async with db_config.acquire() as conn:
+        try:
+            query = f"""
+                SELECT *
+                FROM {table_name}
+                WHERE {attribute_name} = $1
+                LIMIT $2
+            """
+            
+            results = await fetch_json_rows(conn, query, attribute_value, limit)
+            
+            logger.info(f"根据属性查询到 {len(results)} 个要素")
+            return results
+            
+        except Exception as e:
+            logger.error(f"根据属性查询要素失败: {str(e)}")
+            raise
\ No newline at end of file
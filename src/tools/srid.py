@@ -0,0 +1,100 @@
+"""
+空间参考系统元数据模块
+缓存 spatial_ref_sys 中的坐标系信息，用于在本地决定 geography 转换方式
+"""
+from typing import Dict, Any, Optional, Iterable
+import logging
+import re
+
+from ..config import db_config
+
+logger = logging.getLogger(__name__)
+
+db_config.register_statement(
+    "srid_meta",
+    "SELECT srid, proj4text, srtext FROM spatial_ref_sys WHERE srid = ANY($1::int[])"
+)
+
+_UNITS_RE = re.compile(r'\+units=(\S+)')
+
+# spatial_ref_sys 基本不会变化，元数据在进程内永久缓存
+# srid -> {"srid", "is_geographic", "units", "proj4"}，不存在的 SRID 缓存为 None
+_srid_meta: Dict[int, Optional[Dict[str, Any]]] = {}
+
+
+def _build_meta(srid: int, proj4text: Optional[str], srtext: Optional[str]) -> Dict[str, Any]:
+    """根据 proj4/WKT 定义构建坐标系元数据"""
+    proj4text = proj4text or ""
+    srtext = srtext or ""
+    is_geographic = (
+        "+proj=longlat" in proj4text
+        or "+proj=latlong" in proj4text
+        or srtext.startswith(("GEOGCS", "GEOGCRS"))
+    )
+    units_match = _UNITS_RE.search(proj4text)
+    if is_geographic:
+        units = "degree"
+    else:
+        units = units_match.group(1) if units_match else None
+    return {
+        "srid": srid,
+        "is_geographic": is_geographic,
+        "units": units,
+        "proj4": proj4text
+    }
+
+
+async def load_srid_meta(srids: Iterable[int]):
+    """
+    批量加载 SRID 元数据到缓存(一次查询)
+    
+    Args:
+        srids: SRID 列表
+    """
+    missing = sorted({int(srid) for srid in srids if srid is not None} - _srid_meta.keys())
+    if not missing:
+        return
+    
+    async with db_config.acquire() as conn:
+        rows = await db_config.run_statement(conn, "srid_meta", missing)
+    
+    for srid in missing:
+        _srid_meta[srid] = None
+    for row in rows:
+        _srid_meta[row["srid"]] = _build_meta(row["srid"], row["proj4text"], row["srtext"])
+
+
+async def get_srid_meta(srid: int) -> Optional[Dict[str, Any]]:
+    """
+    获取 SRID 元数据
+    
+    Args:
+        srid: 空间参考系统ID
+        
+    Returns:
+        元数据字典，SRID 不存在时返回 None
+    """
+    if srid not in _srid_meta:
+        await load_srid_meta([srid])
+    return _srid_meta.get(srid)
+
+
+async def geography_srid(srid: Optional[int]) -> int:
+    """
+    确定转换为 geography 时使用的SRID
+    
+    地理坐标系(如 4326、4490)的几何列可以直接 ::geography，从而使用
+    (geom::geography) 表达式索引；投影坐标系需要先 ST_Transform 到 4326
+    
+    Args:
+        srid: 几何列的SRID
+        
+    Returns:
+        地理坐标系返回其自身，否则返回 4326
+    """
+    if srid is None:
+        return 4326
+    meta = await get_srid_meta(srid)
+    if meta is not None and meta["is_geographic"]:
+        return srid
+    return 4326
@@ -2,32 +2,41 @@
 Text-to-SQL 工具模块
 提供自然语言到PostGIS SQL的转换功能
 """
-from typing import Dict, Any, Optional, List
-import asyncpg
+from typing import Dict, Any, Optional, List, Tuple
+import asyncio
 import logging
 import json
 import re
+import time
+import uuid
+import asyncpg
 
 from ..config import db_config
 
 logger = logging.getLogger(__name__)
 
+# nl_to_sql 生成SQL后的预取任务: token -> (过期时间, sql, task)
+_PREFETCH_TTL = 300
+_prefetched: Dict[str, Tuple[float, str, asyncio.Task]] = {}
 
-async def get_db_connection() -> asyncpg.Connection:
-    """
-    获取数据库连接
-    
-    Returns:
-        数据库连接对象
-    """
-    conn = await asyncpg.connect(
-        host=db_config.host,
-        port=db_config.port,
-        database=db_config.database,
-        user=db_config.user,
-        password=db_config.password
-    )
-    return conn
+# execute_generated_sql 游标每批预取的行数
+_CURSOR_PREFETCH = 256
+
+db_config.register_statement("table_geometry_column", """
+    SELECT 
+        f_geometry_column as geom_column,
+        type as geom_type,
+        srid
+    FROM geometry_columns
+    WHERE f_table_schema = $1 AND f_table_name = $2
+    LIMIT 1
+""")
+db_config.register_statement("table_columns", """
+    SELECT column_name, data_type
+    FROM information_schema.columns
+    WHERE table_schema = $1 AND table_name = $2
+    ORDER BY ordinal_position
+""")
 
 
 class NLQueryParser:
@@ -157,32 +166,18 @@ class SQLGenerator:
         Returns:
             表信息字典
         """
-        conn = await get_db_connection()
-        try:
-            query = """
-                SELECT 
-                    f_geometry_column as geom_column,
-                    type as geom_type,
-                    srid
-                FROM geometry_columns
-                WHERE f_table_schema = $1 AND f_table_name = $2
-                LIMIT 1
-            """
-            
-            row = await conn.fetchrow(query, schema, table_name)
+        async with db_config.acquire() as conn:
+            row = await db_config.run_statement(
+                conn, "table_geometry_column", schema, table_name, method="fetchrow"
+            )
             
             if not row:
                 raise ValueError(f"表 {schema}.{table_name} 不存在或不包含几何列")
             
             # 获取列信息
-            columns_query = """
-                SELECT column_name, data_type
-                FROM information_schema.columns
-                WHERE table_schema = $1 AND table_name = $2
-                ORDER BY ordinal_position
-            """
-            
-            columns = await conn.fetch(columns_query, schema, table_name)
+            columns = await db_config.run_statement(
+                conn, "table_columns", schema, table_name
+            )
             
             return {
                 'geom_column': row['geom_column'],
@@ -193,9 +188,6 @@ class SQLGenerator:
                     for col in columns
                 ]
             }
-            
-        finally:
-            await conn.close()
     
     @staticmethod
     def generate_nearby_query(
@@ -518,9 +510,62 @@ async def parse_nl_query(
         }
 
 
+def _apply_limit(sql: str, limit: Optional[int]) -> str:
+    """为未包含 LIMIT 的SQL追加结果数量限制"""
+    if limit and 'LIMIT' not in sql.upper():
+        return sql.rstrip(';') + f'\nLIMIT {limit};'
+    return sql
+
+
+async def _prepare_sql(sql: str):
+    """在连接池连接上预编译SQL，让服务器完成解析和语义检查"""
+    async with db_config.acquire() as conn:
+        await conn.prepare(sql)
+
+
+# 预编译失败时可以直接作为执行结果返回的错误: SQLSTATE 42 类(语法错误、表/列/函数不存在、
+# 权限不足)，重新执行结果相同；连接超时、连接重置等临时错误仍照常执行
+_PREPARE_DEFINITIVE_ERRORS = (asyncpg.exceptions.SyntaxOrAccessError,)
+
+
+def _discard_prefetch_result(task: asyncio.Task):
+    """读取预取任务的异常，避免未处理异常的告警"""
+    if not task.cancelled() and task.exception() is not None:
+        logger.debug(f"SQL预取失败: {str(task.exception())}")
+
+
+def prefetch_sql(sql: str, limit: Optional[int] = None) -> str:
+    """
+    在用户确认SQL期间后台预编译该语句
+    
+    语法或对象不存在等错误会在用户确认前就暴露出来，确认执行时可以直接返回，
+    不再借出连接执行。预编译使用单独借出的连接且不保留语句，不影响执行时的连接
+    
+    Args:
+        sql: SQL语句
+        limit: 执行时将使用的结果数量限制
+        
+    Returns:
+        预取令牌，传给 execute_generated_sql 使用
+    """
+    now = time.monotonic()
+    for key in [k for k, (expiry, _, _) in _prefetched.items() if expiry <= now]:
+        _, _, task = _prefetched.pop(key)
+        task.cancel()
+    
+    final_sql = _apply_limit(sql, limit)
+    task = asyncio.create_task(_prepare_sql(final_sql))
+    task.add_done_callback(_discard_prefetch_result)
+    
+    token = uuid.uuid4().hex
+    _prefetched[token] = (now + _PREFETCH_TTL, final_sql, task)
+    return token
+
+
 async def execute_generated_sql(
     sql: str,
-    limit: Optional[int] = None
+    limit: Optional[int] = None,
+    prefetch_token: Optional[str] = None
 ) -> Dict[str, Any]:
     """
     执行生成的SQL语句
@@ -528,41 +573,58 @@ async def execute_generated_sql(
     Args:
         sql: SQL语句
         limit: 结果数量限制
+        prefetch_token: prefetch_sql 返回的预取令牌(可选)
         
     Returns:
         执行结果
     """
-    conn = await get_db_connection()
-    try:
-        # 如果需要限制结果数量，修改SQL
-        if limit and 'LIMIT' not in sql.upper():
-            sql = sql.rstrip(';') + f'\nLIMIT {limit};'
-        
-        # 执行查询
-        rows = await conn.fetch(sql)
-        
-        # 转换结果
-        results = []
-        for row in rows:
-            result = dict(row)
-            # 转换几何对象为字符串
-            for key, value in result.items():
-                if value is not None and hasattr(value, '__class__'):
-                    if 'geometry' in value.__class__.__name__.lower():
-                        result[key] = str(value)
-            results.append(result)
-        
-        return {
-            "success": True,
-            "row_count": len(results),
-            "results": results
-        }
-        
-    except Exception as e:
-        logger.error(f"执行SQL失败: {str(e)}")
-        return {
-            "success": False,
-            "error": f"执行失败: {str(e)}"
-        }
-    finally:
-        await conn.close()
\ No newline at end of file
+    # 如果需要限制结果数量，修改SQL
+    sql = _apply_limit(sql, limit)
+    
+    entry = _prefetched.pop(prefetch_token, None) if prefetch_token else None
+    if entry is not None and entry[1] == sql:
+        task = entry[2]
+        if (
+            task.done() and not task.cancelled()
+            and isinstance(task.exception(), _PREPARE_DEFINITIVE_ERRORS)
+        ):
+            # 预编译已确定失败(语法、对象不存在等)，无需再访问数据库
+            return {
+                "success": False,
+                "error": f"执行失败: {str(task.exception())}"
+            }
+    
+    async with db_config.acquire() as conn:
+        try:
+            results = []
+            truncated = False
+            
+            # 在只读事务内用服务端游标分批取回，最多保留 limit 行，
+            # 即使SQL自带更大的 LIMIT 也不会一次性物化全部结果
+            async with conn.transaction(readonly=True):
+                async for row in conn.cursor(sql, prefetch=_CURSOR_PREFETCH):
+                    if limit and len(results) >= limit:
+                        truncated = True
+                        break
+                    
+                    result = dict(row)
+                    # 转换几何对象为字符串
+                    for key, value in result.items():
+                        if value is not None and hasattr(value, '__class__'):
+                            if 'geometry' in value.__class__.__name__.lower():
+                                result[key] = str(value)
+                    results.append(result)
+            
+            return {
+                "success": True,
+                "row_count": len(results),
+                "truncated": truncated,
+                "results": results
+            }
+            
+        except Exception as e:
+            logger.error(f"执行SQL失败: {str(e)}")
+            return {
+                "success": False,
+                "error": f"执行失败: {str(e)}"
+            }
\ No newline at end of file
@@ -0,0 +1,177 @@
+"""
+输入校验工具模块
+在发送到数据库之前于进程内校验 WKT，格式错误的输入不再消耗一次数据库往返；
+并提供 SQL 标识符引用，表名、列名不能作为绑定参数传递
+"""
+from typing import Any, Iterable
+import math
+import re
+
+# 单个 WKT 允许的最大顶点数，超出时拒绝，避免缓冲等操作在数据库端耗尽内存
+MAX_WKT_VERTICES = 1_000_000
+
+_WKT_TYPES = (
+    "POINT", "LINESTRING", "POLYGON", "MULTIPOINT", "MULTILINESTRING", "MULTIPOLYGON",
+    "GEOMETRYCOLLECTION", "CIRCULARSTRING", "COMPOUNDCURVE", "CURVEPOLYGON",
+    "MULTICURVE", "MULTISURFACE", "POLYHEDRALSURFACE", "TRIANGLE", "TIN",
+)
+_WKT_WORDS = frozenset(_WKT_TYPES + ("Z", "M", "ZM", "EMPTY"))
+# 坐标体中可以出现嵌套类型名的几何类型(如 CURVEPOLYGON(CIRCULARSTRING(...)))
+_NESTED_WKT_TYPES = frozenset((
+    "GEOMETRYCOLLECTION", "COMPOUNDCURVE", "CURVEPOLYGON", "MULTICURVE", "MULTISURFACE",
+))
+
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+
+# 可选的 EWKT 前缀 SRID=xxxx; + 几何类型 + 可选维度标记，随后为 EMPTY 或坐标体
+_HEADER_RE = re.compile(
+    rf"\s*(?:SRID=\d+\s*;)?\s*({'|'.join(_WKT_TYPES)})\s*(?:ZM|Z|M)?\s*(EMPTY\s*$|\()",
+    re.IGNORECASE
+)
+# 坐标体只允许出现数字、分隔符和括号；集合和曲线类型中还会出现嵌套的类型名
+_BODY_RE = re.compile(r"[\d\s.,()eE+\-]*")
+_COLLECTION_BODY_RE = re.compile(r"[\w\s.,()+\-]*")
+_WORD_RE = re.compile(r"[A-Za-z]+")
+# 坐标分量数不在 2~4 之间、空括号、多余逗号
+_BAD_COORD_RE = re.compile(
+    rf"[(,]\s*{_NUMBER}\s*[),]"
+    rf"|{_NUMBER}\s+{_NUMBER}\s+{_NUMBER}\s+{_NUMBER}\s+{_NUMBER}"
+    r"|\(\s*\)|\(\s*,|,\s*[,)]"
+)
+
+
+def validate_wkt(geometry_wkt: str, max_vertices: int = MAX_WKT_VERTICES) -> int:
+    """
+    校验 WKT 的基本结构并统计顶点数
+
+    只做词法和结构检查(几何类型、字符集、括号配对、坐标分量数)，
+    拓扑有效性仍由 PostGIS 判断
+
+    Args:
+        geometry_wkt: WKT(或带 SRID 前缀的 EWKT)格式的几何对象
+        max_vertices: 允许的最大顶点数
+
+    Returns:
+        顶点数(估计值)
+
+    Raises:
+        ValueError: WKT 格式错误或顶点数超出限制
+    """
+    if not isinstance(geometry_wkt, str) or not geometry_wkt.strip():
+        raise ValueError("无效的WKT: 几何为空")
+
+    header = _HEADER_RE.match(geometry_wkt)
+    if header is None:
+        raise ValueError(f"无效的WKT: 无法识别的几何类型: {geometry_wkt[:40]!r}")
+    if header.group(2).upper().startswith("EMPTY"):
+        return 0
+
+    body = geometry_wkt[header.end(2) - 1:]
+    if header.group(1).upper() in _NESTED_WKT_TYPES:
+        if _COLLECTION_BODY_RE.fullmatch(body) is None or any(
+            word.upper() not in _WKT_WORDS and word.lower() != "e"
+            for word in _WORD_RE.findall(body)
+        ):
+            raise ValueError("无效的WKT: 几何中包含非法字符")
+    elif _BODY_RE.fullmatch(body) is None:
+        raise ValueError("无效的WKT: 坐标中包含非法字符")
+
+    if body.count("(") != body.count(")") or not body.rstrip().endswith(")"):
+        raise ValueError("无效的WKT: 括号不匹配")
+
+    bad = _BAD_COORD_RE.search(body)
+    if bad is not None:
+        raise ValueError(f"无效的WKT: 坐标格式错误: {bad.group(0)[:40]!r}")
+
+    vertices = body.count(",") + 1
+    if vertices > max_vertices:
+        raise ValueError(f"无效的WKT: 顶点数 {vertices} 超过上限 {max_vertices}")
+    return vertices
+
+
+def validate_wkt_list(
+    geometries_wkt: Iterable[str],
+    max_vertices: int = MAX_WKT_VERTICES
+) -> int:
+    """
+    校验 WKT 列表，顶点数上限按整个列表合计
+
+    Args:
+        geometries_wkt: WKT格式的几何对象列表
+        max_vertices: 允许的最大顶点总数
+
+    Returns:
+        顶点总数(估计值)
+
+    Raises:
+        ValueError: 任一 WKT 格式错误或顶点总数超出限制
+    """
+    total = 0
+    for geometry_wkt in geometries_wkt:
+        total += validate_wkt(geometry_wkt, max_vertices - total)
+    return total
+
+
+def quote_ident(name: str) -> str:
+    """
+    引用 SQL 标识符(表名、列名、索引名等)
+
+    总是用双引号包裹并转义内部的双引号，保留字(如 order、user)和大小写混合的名称
+    都按原样解释
+
+    Args:
+        name: 标识符
+
+    Returns:
+        可直接拼入 SQL 的标识符
+
+    Raises:
+        ValueError: 标识符为空或包含 NUL 字符
+    """
+    if not isinstance(name, str) or not name or "\x00" in name:
+        raise ValueError(f"无效的标识符: {name!r}")
+    return '"' + name.replace('"', '""') + '"'
+
+
+def qualified_name(schema: str, table_name: str) -> str:
+    """
+    生成带模式名的表名
+
+    Args:
+        schema: 模式名
+        table_name: 表名
+
+    Returns:
+        schema.table 形式的已引用标识符
+    """
+    return f"{quote_ident(schema)}.{quote_ident(table_name)}"
+
+
+def quote_literal(value: Any) -> str:
+    """
+    将 Python 值转换为 SQL 字面量
+    
+    用于无法使用绑定参数的 DDL(如部分索引条件)；字符串单引号包裹并转义内部的单引号
+    
+    Args:
+        value: None、布尔、整数、有限浮点数或字符串
+        
+    Returns:
+        可直接拼入 SQL 的字面量
+        
+    Raises:
+        ValueError: 不支持的值类型、非有限浮点数或包含 NUL 字符的字符串
+    """
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, int):
+        return str(value)
+    if isinstance(value, float):
+        if not math.isfinite(value):
+            raise ValueError(f"无效的字面量: {value!r}")
+        return repr(value)
+    if isinstance(value, str) and "\x00" not in value:
+        return "'" + value.replace("'", "''") + "'"
+    raise ValueError(f"无效的字面量: {value!r}")
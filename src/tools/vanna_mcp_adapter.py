@@ -3,13 +3,481 @@ Vanna AI MCP工具适配器
 通过 REST API 调用 Vanna 服务,支持本地ChromaDB存储
 """
 import os
+import json
+import asyncio
+import time
+import hashlib
 import logging
+import sqlite3
+import threading
+from collections import OrderedDict
+from functools import lru_cache
 import aiohttp
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Optional, Tuple
 
 logger = logging.getLogger(__name__)
 
 
+class SQLResultCache:
+    """
+    生成SQL结果的精确匹配缓存(TTL + LRU)
+    
+    以 (问题, allow_llm_to_see_data) 的 SHA-256 为键，相同问题直接复用上次生成的SQL，
+    省去一次 LLM 调用。训练数据变化后应调用 clear() 清空
+    """
+    
+    def __init__(self, maxsize: int = 512, ttl: float = 3600):
+        """
+        初始化缓存
+        
+        Args:
+            maxsize: 最大条目数，超出时淘汰最久未使用的条目
+            ttl: 缓存有效期(秒)
+        """
+        self.maxsize = maxsize
+        self.ttl = ttl
+        # key -> (过期时间, 结果)
+        self._data: "OrderedDict[str, Tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+    
+    @staticmethod
+    def make_key(question: str, allow_llm_to_see_data: bool) -> str:
+        """生成缓存键"""
+        payload = json.dumps(
+            {"q": question, "d": allow_llm_to_see_data},
+            sort_keys=True,
+            ensure_ascii=False
+        )
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+    
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """
+        查找缓存
+        
+        Args:
+            key: 缓存键
+            
+        Returns:
+            缓存的结果，未命中或已过期时返回 None
+        """
+        entry = self._data.get(key)
+        if entry is None or entry[0] <= time.monotonic():
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def put(self, key: str, value: Dict[str, Any]):
+        """
+        写入缓存
+        
+        Args:
+            key: 缓存键
+            value: 生成结果
+        """
+        self._data[key] = (time.monotonic() + self.ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+    
+    def clear(self):
+        """清空缓存"""
+        self._data.clear()
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+        
+        Returns:
+            命中数、未命中数、命中率和当前条目数
+        """
+        total = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / total if total else 0.0,
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "ttl": self.ttl
+        }
+
+
+# 语义缓存使用的嵌入模型，写入持久化文件；更换模型后旧向量不再可比，加载时丢弃
+_EMBEDDING_MODEL = "all-MiniLM-L6-v2"
+
+
+@lru_cache(maxsize=1)
+def _get_embedder():
+    """加载并缓存嵌入模型(进程内只加载一次，约 90MB)"""
+    from chromadb.utils.embedding_functions import DefaultEmbeddingFunction
+    return DefaultEmbeddingFunction()
+
+
+class _EmbeddingPartition:
+    """
+    语义缓存的一个分区
+
+    嵌入向量量化为 int8 后按行存放在一块连续矩阵中(容量不足时翻倍扩容)，
+    相似度扫描只读取这块矩阵；float32 原始向量仅用于复核得分最高的一条
+    """
+
+    # 归一化向量的分量在 [-1, 1] 内，按 127 缩放后两个 int8 向量的点积再除以 127²
+    _SCALE = 127
+    _SCALE_SQ = float(_SCALE * _SCALE)
+
+    def __init__(self, dim: int, capacity: int = 64):
+        import numpy as np
+
+        self.codes = np.empty((capacity, dim), dtype=np.int8)
+        self.vectors: list = []
+        self.results: list = []
+        self.last_used: list = []
+        self.keys: list = []
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def _quantize(cls, vectors):
+        import numpy as np
+
+        return np.round(vectors * cls._SCALE).astype(np.int8)
+
+    def add(self, key: str, vector, result: Dict[str, Any], maxsize: int) -> Optional[str]:
+        """
+        写入一条记录，分区已满时覆盖最久未使用的条目
+
+        Returns:
+            被淘汰条目的键，未淘汰时为 None
+        """
+        import numpy as np
+
+        evicted = None
+        if len(self) >= maxsize:
+            slot = int(np.argmin(self.last_used))
+            evicted = self.keys[slot]
+            self.vectors[slot] = vector
+            self.results[slot] = result
+            self.last_used[slot] = time.monotonic()
+            self.keys[slot] = key
+        else:
+            slot = len(self)
+            if slot == len(self.codes):
+                codes = np.empty((max(slot * 2, 1), self.codes.shape[1]), dtype=np.int8)
+                codes[:slot] = self.codes
+                self.codes = codes
+            self.vectors.append(vector)
+            self.results.append(result)
+            self.last_used.append(time.monotonic())
+            self.keys.append(key)
+        self.codes[slot] = self._quantize(vector)
+        return evicted
+
+    def best(self, vector) -> Tuple[int, float]:
+        """
+        查找与给定向量最相似的条目
+
+        Returns:
+            (行号, float32 精确余弦相似度)
+        """
+        import numpy as np
+
+        query = self._quantize(vector).astype(np.int32)
+        scores = self.codes[:len(self)] @ query
+        best = int(np.argmax(scores))
+        return best, float(self.vectors[best] @ vector)
+
+    @property
+    def dim(self) -> int:
+        """向量维度"""
+        return self.codes.shape[1]
+
+
+class SemanticSQLCache:
+    """
+    生成SQL结果的语义缓存
+    
+    对问题做向量嵌入(与 Vanna 的 ChromaDB 存储相同的 all-MiniLM-L6-v2 模型)，
+    与已缓存问题的余弦相似度不低于阈值时复用其SQL，
+    用于措辞不同但含义相同的问题。嵌入模型不可用时自动停用。
+    
+    条目同时写入本地 SQLite 文件，服务重启后首次查找时加载，无需重新预热
+    """
+    
+    def __init__(self, threshold: float = 0.92, maxsize: int = 2048, path: Optional[str] = None):
+        """
+        初始化缓存
+        
+        Args:
+            threshold: 命中所需的最小余弦相似度
+            maxsize: 每个分区的最大条目数，超出时淘汰最久未使用的条目
+            path: SQLite 持久化文件路径，None 表示只在内存中缓存
+        """
+        self.threshold = threshold
+        self.maxsize = maxsize
+        self.path = path
+        self._available = True
+        # 等待嵌入的问题，同一时刻到达的问题合并为一次模型调用
+        self._pending: list = []
+        self._flush_task: Optional[asyncio.Task] = None
+        self._db: Optional[sqlite3.Connection] = None
+        self._loaded = False
+        # 嵌入计算和 SQLite 读写都在工作线程中进行，各用一把锁:
+        # 模型调用(首次还要加载模型)耗时较长，不能阻塞清空、写入持久化条目
+        self._embed_lock = threading.Lock()
+        self._db_lock = threading.Lock()
+        # allow_llm_to_see_data -> 分区
+        self._partitions: Dict[bool, _EmbeddingPartition] = {}
+        self.hits = 0
+        self.misses = 0
+    
+    def _load(self):
+        """首次使用时打开 SQLite 文件并加载已持久化的条目"""
+        self._loaded = True
+        if not self.path:
+            return
+        try:
+            import numpy as np
+            
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            self._db.execute("""
+                CREATE TABLE IF NOT EXISTS sql_cache (
+                    hash TEXT PRIMARY KEY,
+                    see_data INTEGER NOT NULL,
+                    question TEXT NOT NULL,
+                    embedding BLOB NOT NULL,
+                    result TEXT NOT NULL,
+                    ts REAL NOT NULL
+                )
+            """)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS cache_meta (key TEXT PRIMARY KEY, value TEXT NOT NULL)"
+            )
+            row = self._db.execute("SELECT value FROM cache_meta WHERE key = 'model'").fetchone()
+            if row is not None and row[0] != _EMBEDDING_MODEL:
+                logger.info(f"嵌入模型已从 {row[0]} 更换为 {_EMBEDDING_MODEL}，丢弃已持久化的语义缓存")
+                self._db.execute("DELETE FROM sql_cache")
+            self._db.execute(
+                "INSERT OR REPLACE INTO cache_meta VALUES ('model', ?)", (_EMBEDDING_MODEL,)
+            )
+            self._db.commit()
+            
+            for see_data in (False, True):
+                rows = self._db.execute(
+                    "SELECT hash, embedding, result FROM sql_cache WHERE see_data = ? "
+                    "ORDER BY ts DESC LIMIT ?",
+                    (int(see_data), self.maxsize)
+                ).fetchall()
+                if not rows:
+                    continue
+                # 以最新一条的维度为准，跳过维度不同的旧向量
+                dim = len(rows[0][1]) // 4
+                partition = _EmbeddingPartition(dim, len(rows))
+                for key, embedding, result in reversed(rows):
+                    vector = np.frombuffer(embedding, dtype=np.float32)
+                    if len(vector) != dim:
+                        continue
+                    partition.add(key, vector, json.loads(result), self.maxsize)
+                self._partitions[see_data] = partition
+            logger.info(
+                f"已加载 {sum(len(p) for p in self._partitions.values())} 条语义缓存"
+            )
+        except Exception as e:
+            logger.warning(f"语义缓存持久化不可用，仅使用内存缓存: {str(e)}")
+            self._db = None
+    
+    def _embed(self, questions: list) -> Optional[Any]:
+        """
+        批量计算问题的 L2 归一化嵌入向量(归一化后余弦相似度即点积)
+        
+        Args:
+            questions: 自然语言问题列表
+            
+        Returns:
+            float32 矩阵，每行对应一个问题；嵌入模型不可用时返回 None
+        """
+        if not self._loaded:
+            with self._db_lock:
+                if not self._loaded:
+                    self._load()
+        if not self._available:
+            return None
+        try:
+            import numpy as np
+            
+            with self._embed_lock:
+                vectors = np.asarray(_get_embedder()(questions), dtype=np.float32)
+            norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+            return vectors / np.where(norms == 0, 1, norms)
+        except Exception as e:
+            logger.warning(f"语义缓存不可用，已停用: {str(e)}")
+            self._available = False
+            return None
+    
+    async def _flush_pending(self):
+        """对当前等待中的问题做一次批量嵌入并分发结果"""
+        pending, self._pending = self._pending, []
+        try:
+            vectors = await asyncio.to_thread(self._embed, [q for q, _ in pending])
+        except Exception as e:
+            vectors = None
+            logger.warning(f"计算问题嵌入失败: {str(e)}")
+        for i, (_, future) in enumerate(pending):
+            if not future.done():
+                future.set_result(None if vectors is None else vectors[i])
+    
+    async def _embed_question(self, question: str):
+        """
+        计算单个问题的嵌入向量，与同时到达的其他问题合并计算
+        
+        Args:
+            question: 自然语言问题
+            
+        Returns:
+            float32 向量；嵌入模型不可用时返回 None
+        """
+        if not self._available:
+            return None
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((question, future))
+        if len(self._pending) == 1:
+            # 任务在下一轮事件循环才执行，期间到达的问题都会并入这一批
+            self._flush_task = asyncio.create_task(self._flush_pending())
+        return await future
+    
+    async def lookup(
+        self,
+        question: str,
+        allow_llm_to_see_data: bool
+    ) -> Tuple[Optional[Dict[str, Any]], Any]:
+        """
+        查找语义相近的已缓存问题
+        
+        Args:
+            question: 自然语言问题
+            allow_llm_to_see_data: 是否允许LLM查看数据(按该标志分区缓存)
+            
+        Returns:
+            (命中的结果及相似度, 问题的嵌入向量)；未命中时结果为 None
+        """
+        vector = await self._embed_question(question)
+        if vector is None:
+            return None, None
+        
+        partition = await self._partition(allow_llm_to_see_data, len(vector))
+        if partition is not None:
+            best, similarity = partition.best(vector)
+            if similarity >= self.threshold:
+                partition.last_used[best] = time.monotonic()
+                self.hits += 1
+                return {**partition.results[best], "similarity": similarity}, vector
+        
+        self.misses += 1
+        return None, vector
+    
+    async def _partition(self, see_data: bool, dim: int) -> Optional[_EmbeddingPartition]:
+        """
+        获取分区；已有分区的向量维度与当前模型不同(模型已更换)时丢弃该分区及其持久化条目
+        
+        Args:
+            see_data: 分区标志
+            dim: 当前嵌入向量的维度
+            
+        Returns:
+            可用的分区，不存在或已丢弃时为 None
+        """
+        partition = self._partitions.get(see_data)
+        if partition is None or partition.dim == dim:
+            return partition
+        logger.warning(f"语义缓存向量维度 {partition.dim} 与当前模型 {dim} 不一致，已丢弃旧条目")
+        del self._partitions[see_data]
+        await asyncio.to_thread(self._delete_persisted, see_data)
+        return None
+    
+    def _delete_persisted(self, see_data: Optional[bool] = None):
+        """删除持久化条目，see_data 为 None 时删除全部"""
+        if self._db is None:
+            return
+        with self._db_lock:
+            try:
+                if see_data is None:
+                    self._db.execute("DELETE FROM sql_cache")
+                else:
+                    self._db.execute("DELETE FROM sql_cache WHERE see_data = ?", (int(see_data),))
+                self._db.commit()
+            except Exception as e:
+                logger.warning(f"删除语义缓存失败: {str(e)}")
+    
+    def _persist(self, key: str, see_data: bool, vector, result: Dict[str, Any], evicted):
+        """写入(并淘汰)持久化条目"""
+        if self._db is None:
+            return
+        with self._db_lock:
+            try:
+                if evicted is not None:
+                    self._db.execute("DELETE FROM sql_cache WHERE hash = ?", (evicted,))
+                self._db.execute(
+                    "INSERT OR REPLACE INTO sql_cache VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        key, int(see_data), result.get("question", ""),
+                        vector.astype("float32").tobytes(),
+                        json.dumps(result, ensure_ascii=False), time.time()
+                    )
+                )
+                self._db.commit()
+            except Exception as e:
+                logger.warning(f"写入语义缓存失败: {str(e)}")
+    
+    async def put(self, key: str, vector, allow_llm_to_see_data: bool, result: Dict[str, Any]):
+        """
+        写入缓存
+        
+        Args:
+            key: 精确匹配缓存键，用作持久化主键
+            vector: lookup 返回的问题嵌入向量
+            allow_llm_to_see_data: 是否允许LLM查看数据
+            result: 生成结果
+        """
+        if vector is None:
+            return
+        
+        partition = await self._partition(allow_llm_to_see_data, len(vector))
+        if partition is None:
+            partition = _EmbeddingPartition(len(vector))
+            self._partitions[allow_llm_to_see_data] = partition
+        evicted = partition.add(key, vector, result, self.maxsize)
+        
+        await asyncio.to_thread(
+            self._persist, key, allow_llm_to_see_data, vector, result, evicted
+        )
+    
+    async def clear(self):
+        """清空缓存(包括持久化的条目)"""
+        self._partitions.clear()
+        await asyncio.to_thread(self._delete_persisted)
+    
+    def stats(self) -> Dict[str, Any]:
+        """
+        获取缓存统计
+        
+        Returns:
+            命中数、未命中数和当前条目数
+        """
+        return {
+            "enabled": self._available,
+            "persistent": self._db is not None,
+            "hits": self.hits,
+            "misses": self.misses,
+            "size": sum(len(p) for p in self._partitions.values()),
+            "threshold": self.threshold
+        }
+
+
 class VannaMCPAdapter:
     """
     Vanna AI MCP适配器
@@ -25,6 +493,39 @@ class VannaMCPAdapter:
         """
         self.base_url = base_url or os.getenv('VANNA_SERVICE_URL', 'http://localhost:5000')
         self._is_initialized = False
+        # 共享的 HTTP 会话，复用到 Vanna 服务的 keep-alive 连接
+        self._session: Optional[aiohttp.ClientSession] = None
+        # 生成SQL结果缓存
+        self.sql_cache = SQLResultCache(
+            maxsize=int(os.getenv('VANNA_SQL_CACHE_SIZE', '512')),
+            ttl=float(os.getenv('VANNA_SQL_CACHE_TTL', '3600'))
+        )
+        # 正在生成中的问题: 缓存键 -> 生成任务
+        self._inflight: Dict[str, asyncio.Future] = {}
+        # 精确匹配未命中时再按语义相似度查找
+        self.semantic_cache = SemanticSQLCache(
+            threshold=float(os.getenv('VANNA_SEMCACHE_THRESHOLD', '0.92')),
+            maxsize=int(os.getenv('VANNA_SEMCACHE_SIZE', '2048')),
+            path=os.getenv(
+                'VANNA_SEMCACHE_PATH',
+                os.path.join(os.path.expanduser('~'), '.cache', 'postgis_mcp', 'sql_cache.sqlite')
+            ) or None
+        )
+    
+    def _get_session(self) -> aiohttp.ClientSession:
+        """获取共享的 HTTP 会话，首次使用时在当前事件循环中创建"""
+        if self._session is None or self._session.closed:
+            self._session = aiohttp.ClientSession(
+                timeout=aiohttp.ClientTimeout(total=360),  # 增加到6分钟
+                connector=aiohttp.TCPConnector(limit=100, limit_per_host=20)
+            )
+        return self._session
+    
+    async def close(self):
+        """关闭共享的 HTTP 会话"""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
         
     async def _make_request(
         self,
@@ -46,21 +547,19 @@ class VannaMCPAdapter:
         url = f"{self.base_url}{endpoint}"
         
         try:
-            async with aiohttp.ClientSession() as session:
-                async with session.request(
-                    method=method,
-                    url=url,
-                    json=json_data,
-                    timeout=aiohttp.ClientTimeout(total=360)  # 增加到6分钟
-                ) as response:
-                    if response.status == 200:
-                        return await response.json()
-                    else:
-                        error_text = await response.text()
-                        return {
-                            "success": False,
-                            "error": f"HTTP {response.status}: {error_text}"
-                        }
+            async with self._get_session().request(
+                method=method,
+                url=url,
+                json=json_data
+            ) as response:
+                if response.status == 200:
+                    return await response.json()
+                else:
+                    error_text = await response.text()
+                    return {
+                        "success": False,
+                        "error": f"HTTP {response.status}: {error_text}"
+                    }
         except aiohttp.ClientError as e:
             logger.error(f"请求失败: {str(e)}")
             return {
@@ -203,11 +702,16 @@ class VannaMCPAdapter:
         if error:
             return error
         
-        return await self._make_request(
+        result = await self._make_request(
             method='POST',
             endpoint='/api/vanna/train/confirm',
             json_data={"session_id": session_id}
         )
+        if result.get('success'):
+            # 训练数据变化后，之前生成的SQL可能不再是最优结果
+            self.sql_cache.clear()
+            await self.semantic_cache.clear()
+        return result
     
     async def cancel_training(self, session_id: str) -> Dict[str, Any]:
         """
@@ -233,18 +737,64 @@ class VannaMCPAdapter:
         """
         生成SQL(带预览)
         
+        相同的问题命中缓存时直接返回上次生成的SQL，不再调用 LLM；
+        否则按语义相似度查找措辞不同的相同问题
+        
         Args:
             question: 自然语言问题
             allow_llm_to_see_data: 是否允许LLM查看数据
             
         Returns:
-            生成的SQL
+            生成的SQL，命中缓存时 cached 为 True，语义命中时附带 matched_question 和 similarity
         """
         error = self._ensure_initialized()
         if error:
             return error
         
-        return await self._make_request(
+        key = self.sql_cache.make_key(question, allow_llm_to_see_data)
+        cached = self.sql_cache.get(key)
+        if cached is not None:
+            return {**cached, "cached": True}
+        
+        # 相同问题的并发请求共用同一次生成(single-flight)
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.ensure_future(
+                self._generate_sql(key, question, allow_llm_to_see_data)
+            )
+            self._inflight[key] = task
+            task.add_done_callback(lambda _: self._inflight.pop(key, None))
+        # shield: 某个调用方被取消时不影响其他等待同一结果的调用方
+        return dict(await asyncio.shield(task))
+    
+    async def _generate_sql(
+        self,
+        key: str,
+        question: str,
+        allow_llm_to_see_data: bool
+    ) -> Dict[str, Any]:
+        """
+        精确缓存未命中时生成SQL: 先查语义缓存，再调用 Vanna 服务
+        
+        Args:
+            key: 精确匹配缓存键
+            question: 自然语言问题
+            allow_llm_to_see_data: 是否允许LLM查看数据
+            
+        Returns:
+            生成的SQL
+        """
+        similar, vector = await self.semantic_cache.lookup(question, allow_llm_to_see_data)
+        if similar is not None:
+            result = {
+                **similar,
+                "question": question,
+                "matched_question": similar.get("question")
+            }
+            self.sql_cache.put(key, result)
+            return {**result, "cached": True}
+        
+        result = await self._make_request(
             method='POST',
             endpoint='/api/vanna/generate_sql',
             json_data={
@@ -252,6 +802,10 @@ class VannaMCPAdapter:
                 "allow_llm_to_see_data": allow_llm_to_see_data
             }
         )
+        if result.get('success') and result.get('generated_sql'):
+            self.sql_cache.put(key, result)
+            await self.semantic_cache.put(key, vector, allow_llm_to_see_data, result)
+        return result
     
     async def execute_sql(
         self,
@@ -311,10 +865,14 @@ class VannaMCPAdapter:
         if error:
             return error
         
-        return await self._make_request(
+        result = await self._make_request(
             method='DELETE',
             endpoint=f'/api/vanna/training_data/{id}'
         )
+        if result.get('success'):
+            self.sql_cache.clear()
+            await self.semantic_cache.clear()
+        return result
 
 
 # Vanna 可用性标志
@@ -329,4 +887,10 @@ def get_vanna_mcp_adapter() -> VannaMCPAdapter:
     global _vanna_mcp_adapter
     if _vanna_mcp_adapter is None:
         _vanna_mcp_adapter = VannaMCPAdapter()
-    return _vanna_mcp_adapter
\ No newline at end of file
+    return _vanna_mcp_adapter
+
+
+async def close_vanna_mcp_adapter():
+    """关闭全局Vanna MCP适配器的HTTP会话(如已创建)"""
+    if _vanna_mcp_adapter is not None:
+        await _vanna_mcp_adapter.close()
\ No newline at end of file
@@ -101,6 +101,72 @@ async def test_import_png_file_not_found():
         )
 
 
+class TestPgType:
+    """测试属性列类型映射"""
+    
+    def test_numeric_and_bool(self):
+        import numpy as np
+        from src.tools.data_import import _pg_type
+        
+        assert _pg_type(np.dtype("int64")) == "BIGINT"
+        assert _pg_type(np.dtype("int16")) == "BIGINT"
+        assert _pg_type(np.dtype("uint32")) == "BIGINT"
+        assert _pg_type(np.dtype("float32")) == "DOUBLE PRECISION"
+        assert _pg_type(np.dtype("bool")) == "BOOLEAN"
+    
+    def test_temporal_and_text(self):
+        import numpy as np
+        import pandas as pd
+        from src.tools.data_import import _pg_type
+        
+        assert _pg_type(np.dtype("datetime64[ns]")) == "TIMESTAMP"
+        assert _pg_type(pd.DatetimeTZDtype(tz="UTC")) == "TIMESTAMPTZ"
+        assert _pg_type(np.dtype("timedelta64[ns]")) == "INTERVAL"
+        assert _pg_type(np.dtype("object")) == "TEXT"
+        assert _pg_type(pd.StringDtype()) == "TEXT"
+
+
+class TestRasterWKB:
+    """测试栅格瓦片 WKB 编码"""
+    
+    def test_header_and_bands(self):
+        import struct
+        import numpy as np
+        from rasterio.transform import Affine
+        from src.tools.data_import import _raster_wkb
+        
+        data = np.arange(12, dtype=np.uint8).reshape(2, 2, 3)
+        transform = Affine(0.5, 0, 100.0, 0, -0.25, 40.0)
+        wkb = _raster_wkb(data, transform, 4326, 255)
+        
+        header = struct.unpack_from("<BHHddddddiHH", wkb)
+        assert header == (1, 0, 2, 0.5, -0.25, 100.0, 40.0, 0.0, 0.0, 4326, 3, 2)
+        
+        offset = struct.calcsize("<BHHddddddiHH")
+        for band in data:
+            # 8BUI 编码为 4，0x40 表示有无数据值
+            assert wkb[offset] == 4 | 0x40
+            assert wkb[offset + 1] == 255
+            assert wkb[offset + 2:offset + 8] == band.tobytes()
+            offset += 8
+        assert offset == len(wkb)
+    
+    def test_pixel_types(self):
+        import numpy as np
+        from rasterio.transform import Affine
+        from src.tools.data_import import _raster_wkb
+        
+        transform = Affine(1, 0, 0, 0, -1, 0)
+        flag_offset = 61  # 头部长度
+        for dtype, code in (("int16", 5), ("uint16", 6), ("float32", 10), ("float64", 11)):
+            wkb = _raster_wkb(np.zeros((1, 1, 1), dtype=dtype), transform, 3857, None)
+            assert wkb[flag_offset] == code
+        
+        # 不支持的类型转换为 64BF
+        wkb = _raster_wkb(np.zeros((1, 1, 1), dtype=np.int64), transform, 3857, None)
+        assert wkb[flag_offset] == 11
+
+
 # 集成测试示例（需要实际文件和数据库）
 @pytest.mark.skip(reason="需要实际的测试文件和数据库连接")
 @pytest.mark.asyncio
@@ -171,6 +171,28 @@ class TestSQLGenerator:
         assert "feature_count" in sql
 
 
+class TestApplyLimit:
+    """测试结果数量限制"""
+    
+    def test_appends_limit(self):
+        from src.tools.text_to_sql import _apply_limit
+        
+        assert _apply_limit("SELECT * FROM roads;", 10) == "SELECT * FROM roads\nLIMIT 10;"
+    
+    def test_keeps_existing_limit(self):
+        from src.tools.text_to_sql import _apply_limit
+        
+        sql = "SELECT * FROM roads limit 5"
+        assert _apply_limit(sql, 10) == sql
+    
+    def test_no_limit(self):
+        from src.tools.text_to_sql import _apply_limit
+        
+        sql = "SELECT * FROM roads"
+        assert _apply_limit(sql, None) == sql
+        assert _apply_limit(sql, 0) == sql
+
+
 class TestIntegration:
     """集成测试"""
     
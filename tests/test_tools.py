@@ -402,6 +402,37 @@ async def test_convex_hull():
         pytest.skip("需要配置数据库连接或表不存在")
 
 
+class TestPartialIndexPredicate:
+    """测试部分索引条件生成(无需数据库)"""
+    
+    def test_conditions(self):
+        from src.tools.admin import _partial_index_predicate
+        
+        assert _partial_index_predicate([
+            {"column": "status", "op": "=", "value": "active"},
+            {"column": "deleted_at", "op": "is null"},
+            {"column": "kind", "op": "IN", "value": [1, 2]},
+        ]) == """WHERE "status" = 'active' AND "deleted_at" IS NULL AND "kind" IN (1, 2)"""
+    
+    def test_values_are_escaped(self):
+        from src.tools.admin import _partial_index_predicate
+        
+        where = _partial_index_predicate({"column": "name", "value": "x'; DROP TABLE t; --"})
+        assert where == """WHERE "name" = 'x''; DROP TABLE t; --'"""
+    
+    def test_rejects_unknown_operator(self):
+        from src.tools.admin import _partial_index_predicate
+        
+        for condition in (
+            {"column": "a", "op": "= 1; DROP TABLE t; --", "value": 1},
+            {"column": "a", "op": "=", "value": None},
+            {"column": "a", "op": "IN", "value": []},
+            {"op": "=", "value": 1},
+        ):
+            with pytest.raises(ValueError):
+                _partial_index_predicate([condition])
+
+
 if __name__ == "__main__":
     # 运行测试
     # pytest tests/test_tools.py -v
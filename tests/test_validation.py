@@ -0,0 +1,116 @@
+"""
+输入校验与SQL标识符/字面量引用测试(无需数据库)
+"""
+import pytest
+from src.tools.validation import (
+    validate_wkt,
+    validate_wkt_list,
+    quote_ident,
+    quote_literal,
+    qualified_name,
+)
+
+
+class TestQuoteIdent:
+    """测试标识符引用"""
+
+    def test_plain_name(self):
+        """普通小写名称同样加双引号"""
+        assert quote_ident("roads") == '"roads"'
+
+    def test_reserved_words(self):
+        """保留字必须加引号，否则SQL语法错误"""
+        for name in ("order", "user", "group", "select", "limit", "table"):
+            assert quote_ident(name) == f'"{name}"'
+
+    def test_mixed_case(self):
+        """大小写混合的名称保持原样"""
+        assert quote_ident("MyTable") == '"MyTable"'
+
+    def test_embedded_quote(self):
+        """内部双引号被转义"""
+        assert quote_ident('a"b') == '"a""b"'
+
+    def test_invalid(self):
+        """空名称和 NUL 字符被拒绝"""
+        for name in ("", "a\x00b", None):
+            with pytest.raises(ValueError):
+                quote_ident(name)
+
+    def test_qualified_name(self):
+        """模式名与表名分别引用"""
+        assert qualified_name("public", "Order") == '"public"."Order"'
+
+
+class TestQuoteLiteral:
+    """测试字面量转义"""
+
+    def test_scalars(self):
+        assert quote_literal(None) == "NULL"
+        assert quote_literal(True) == "TRUE"
+        assert quote_literal(False) == "FALSE"
+        assert quote_literal(42) == "42"
+        assert quote_literal(1.5) == "1.5"
+
+    def test_string_escaping(self):
+        """单引号被转义，注入片段只是字符串的一部分"""
+        assert quote_literal("it's") == "'it''s'"
+        assert quote_literal("x'; DROP TABLE t; --") == "'x''; DROP TABLE t; --'"
+
+    def test_invalid(self):
+        for value in (float("nan"), float("inf"), "a\x00b", [1], {"a": 1}):
+            with pytest.raises(ValueError):
+                quote_literal(value)
+
+
+class TestValidateWKT:
+    """测试 WKT 校验"""
+
+    def test_valid_geometries(self):
+        assert validate_wkt("POINT(120 30)") == 1
+        assert validate_wkt("LINESTRING(0 0, 1 1, 2 2)") == 3
+        assert validate_wkt("POLYGON((0 0, 1 0, 1 1, 0 0))") == 4
+        assert validate_wkt("SRID=4326;POINT Z (1 2 3)") == 1
+        assert validate_wkt("POINT EMPTY") == 0
+        assert validate_wkt("GEOMETRYCOLLECTION(POINT(1 2), LINESTRING(0 0, 1 1))") == 3
+
+    def test_valid_curved_geometries(self):
+        """曲线类型的坐标体中可以嵌套类型名"""
+        assert validate_wkt("CIRCULARSTRING(0 0, 1 1, 2 0)") == 3
+        assert validate_wkt("CURVEPOLYGON(CIRCULARSTRING(0 0, 4 0, 4 4, 0 4, 0 0))") == 5
+        assert validate_wkt("COMPOUNDCURVE(CIRCULARSTRING(0 0, 1 1, 1 0),(1 0, 0 1))") == 5
+        assert validate_wkt(
+            "MULTICURVE((0 0, 5 5), CIRCULARSTRING(4 0, 4 4, 8 4))"
+        ) == 5
+        assert validate_wkt(
+            "MULTISURFACE(CURVEPOLYGON(CIRCULARSTRING(0 0, 4 0, 4 4, 0 4, 0 0)),"
+            " ((10 10, 14 12, 11 10, 10 10)))"
+        ) == 9
+
+    def test_invalid_geometries(self):
+        for wkt in (
+            "",
+            "CIRCLE(0 0)",
+            "POINT(1)",
+            "POINT(1 2 3 4 5)",
+            "LINESTRING(0 0, 1 1",
+            "POINT(1 2); DROP TABLE t",
+            "CURVEPOLYGON(CIRCULARSTRING(0 0, 4 0, 4 4, 0 4, 0 0)); DROP TABLE t",
+            "POLYGON(())",
+            "LINESTRING(0 0,, 1 1)",
+        ):
+            with pytest.raises(ValueError):
+                validate_wkt(wkt)
+
+    def test_vertex_limit(self):
+        with pytest.raises(ValueError):
+            validate_wkt("LINESTRING(0 0, 1 1, 2 2)", max_vertices=2)
+
+    def test_list_limit_is_cumulative(self):
+        assert validate_wkt_list(["POINT(0 0)", "POINT(1 1)"], max_vertices=2) == 2
+        with pytest.raises(ValueError):
+            validate_wkt_list(["POINT(0 0)", "LINESTRING(0 0, 1 1)"], max_vertices=2)
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])
@@ -0,0 +1,118 @@
+"""
+Vanna 适配器缓存测试(无需 Vanna 服务)
+"""
+import sqlite3
+
+import numpy as np
+import pytest
+from src.tools.vanna_mcp_adapter import SQLResultCache, SemanticSQLCache
+
+
+class TestSQLResultCache:
+    """测试生成SQL的精确匹配缓存"""
+    
+    def test_key_depends_on_question_and_flag(self):
+        key = SQLResultCache.make_key("查询所有道路", False)
+        assert key == SQLResultCache.make_key("查询所有道路", False)
+        assert key != SQLResultCache.make_key("查询所有道路", True)
+        assert key != SQLResultCache.make_key("查询所有河流", False)
+    
+    def test_hit_and_miss(self):
+        cache = SQLResultCache(maxsize=4, ttl=60)
+        assert cache.get("a") is None
+        cache.put("a", {"sql": "SELECT 1"})
+        assert cache.get("a") == {"sql": "SELECT 1"}
+        
+        stats = cache.stats()
+        assert stats["hits"] == 1
+        assert stats["misses"] == 1
+        assert stats["size"] == 1
+    
+    def test_ttl_expiry(self):
+        cache = SQLResultCache(maxsize=4, ttl=0)
+        cache.put("a", {"sql": "SELECT 1"})
+        assert cache.get("a") is None
+        assert cache.stats()["size"] == 0
+    
+    def test_lru_eviction(self):
+        cache = SQLResultCache(maxsize=2, ttl=60)
+        cache.put("a", {"sql": "a"})
+        cache.put("b", {"sql": "b"})
+        # 访问 a 后 b 成为最久未使用的条目
+        assert cache.get("a") is not None
+        cache.put("c", {"sql": "c"})
+        
+        assert cache.get("b") is None
+        assert cache.get("a") == {"sql": "a"}
+        assert cache.get("c") == {"sql": "c"}
+    
+    def test_clear(self):
+        cache = SQLResultCache()
+        cache.put("a", {"sql": "a"})
+        cache.clear()
+        assert cache.get("a") is None
+
+
+
+def _unit(dim: int, index: int = 0):
+    """第 index 维为 1 的单位向量"""
+    vector = np.zeros(dim, dtype=np.float32)
+    vector[index] = 1
+    return vector
+
+
+class TestSemanticSQLCache:
+    """测试语义缓存在嵌入模型更换后的处理(不加载嵌入模型)"""
+    
+    async def test_dimension_change_drops_partition(self, tmp_path):
+        cache = SemanticSQLCache(path=str(tmp_path / "cache.db"))
+        cache._load()
+        await cache.put("a", _unit(4), False, {"sql": "SELECT 1"})
+        
+        # 维度不同的向量视为未命中并丢弃旧分区，而不是抛出形状不匹配错误
+        assert await cache._partition(False, 8) is None
+        assert cache.stats()["size"] == 0
+        assert cache._db.execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0] == 0
+        
+        await cache.put("b", _unit(8), False, {"sql": "SELECT 2"})
+        best, similarity = (await cache._partition(False, 8)).best(_unit(8))
+        assert similarity == pytest.approx(1.0)
+    
+    async def test_model_change_discards_persisted_rows(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        cache = SemanticSQLCache(path=path)
+        cache._load()
+        await cache.put("a", _unit(4), True, {"sql": "SELECT 1"})
+        
+        db = sqlite3.connect(path)
+        db.execute("UPDATE cache_meta SET value = 'other-model' WHERE key = 'model'")
+        db.commit()
+        db.close()
+        
+        reloaded = SemanticSQLCache(path=path)
+        reloaded._load()
+        assert reloaded.stats()["size"] == 0
+    
+    async def test_clear(self, tmp_path):
+        cache = SemanticSQLCache(path=str(tmp_path / "cache.db"))
+        cache._load()
+        await cache.put("a", _unit(4), False, {"sql": "SELECT 1"})
+        await cache.clear()
+        assert cache.stats()["size"] == 0
+        assert cache._db.execute("SELECT COUNT(*) FROM sql_cache").fetchone()[0] == 0
+    
+    async def test_reload_same_model(self, tmp_path):
+        path = str(tmp_path / "cache.db")
+        cache = SemanticSQLCache(path=path)
+        cache._load()
+        await cache.put("a", _unit(4, 1), False, {"sql": "SELECT 1"})
+        
+        reloaded = SemanticSQLCache(path=path)
+        reloaded._load()
+        partition = await reloaded._partition(False, 4)
+        best, similarity = partition.best(_unit(4, 1))
+        assert partition.results[best] == {"sql": "SELECT 1"}
+
+
+if __name__ == "__main__":
+    pytest.main([__file__, "-v"])